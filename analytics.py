@@ -0,0 +1,186 @@
+# analytics.py
+# Cohort-level statistics computed in SQL (aggregation and window functions) instead of
+# building Student objects per student.
+
+import datetime
+import heapq
+import math
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Sequence
+
+from database import Database
+from model import DEFAULT_PROGRAM, Status, StudyProgram, DeadlineGoal
+from parsing import sql_iso_date
+
+# Whole months between a student's start date and the evaluation month (:as_of_year, :as_of_month),
+# with the calendar-month arithmetic of Student._months_since_start (without the clamping).
+# Start dates may be stored as ISO strings or day ordinals (see parsing.py).
+_MONTHS_SQL = f"""
+    ((:as_of_year - CAST(substr({sql_iso_date("s.start_date")}, 1, 4) AS INTEGER)) * 12
+     + :as_of_month - CAST(substr({sql_iso_date("s.start_date")}, 6, 2) AS INTEGER))
+"""
+
+# Earned ECTS and months since start per student, one row per student. Earned ECTS are aggregated
+# in one grouped pass over the enrollments instead of a subquery per student.
+_PROGRESS_SQL = f"""
+    SELECT
+      s.student_id,
+      s.name,
+      s.program_id,
+      COALESCE(earned.ects, 0) AS earned_ects,
+      {_MONTHS_SQL} AS months
+    FROM student s
+    LEFT JOIN (
+      SELECT e.student_id, SUM(m.ects) AS ects
+      FROM enrollment e JOIN module m ON m.module_id = e.module_id
+      WHERE e.date_passed IS NOT NULL
+      GROUP BY e.student_id
+    ) earned ON earned.student_id = s.student_id
+"""
+
+@dataclass(frozen=True)
+# One bin of a grade histogram: grades in [lower, upper)
+class HistogramBin:
+    lower: float
+    upper: float
+    count: int
+
+@dataclass(frozen=True)
+# A student ranked by how far DeadlineGoal is behind (delta = CP progress - time progress)
+class AtRiskStudent:
+    student_id: str
+    name: str
+    time_percent: float
+    cp_percent: float
+    delta: float
+    status: Status
+
+@dataclass
+# Cohort analytics next to DashboardService; reads the database directly with set-based queries.
+class CohortAnalyticsService:
+    database: Database
+    # Program used for students without a (known) program link, as in DashboardService
+    default_program: StudyProgram = DEFAULT_PROGRAM
+    # Results per query (least recently used first), valid as long as the database change counter
+    # is unchanged; at most result_cache_size entries are kept
+    result_cache_size: int = 64
+    _results: "OrderedDict[tuple, tuple[int, Any]]" = field(default_factory=OrderedDict, init=False, repr=False)
+
+    # Grade histograms per module (only graded enrollments). Bins start at grade_min with width bin_width.
+    def grade_histograms(self, module_id: Optional[str] = None, bin_width: float = 0.5, grade_min: float = 1.0) -> dict[str, List[HistogramBin]]:
+        if bin_width <= 0:
+            raise ValueError("bin_width must be > 0")
+        return self._cached(("histograms", module_id, bin_width, grade_min), lambda: self._grade_histograms(module_id, bin_width, grade_min))
+
+    def _grade_histograms(self, module_id: Optional[str], bin_width: float, grade_min: float) -> dict[str, List[HistogramBin]]:
+        cursor = self._cursor()
+        cursor.execute(
+            """
+            SELECT module_id, CAST((grade - :grade_min) / :width AS INTEGER) AS bucket, COUNT(*)
+            FROM enrollment
+            WHERE grade IS NOT NULL AND (:module_id IS NULL OR module_id = :module_id)
+            GROUP BY module_id, bucket
+            ORDER BY module_id, bucket
+            """,
+            {"grade_min": grade_min, "width": bin_width, "module_id": module_id},
+        )
+        out: dict[str, List[HistogramBin]] = {}
+        for mid, bucket, count in cursor:
+            lower = grade_min + bucket * bin_width
+            out.setdefault(mid, []).append(HistogramBin(lower=lower, upper=lower + bin_width, count=int(count)))
+        return out
+
+    # Nearest-rank percentiles of ECTS per month over all students. The window function ranks the
+    # students by pace; only the requested ranks are returned to Python.
+    def ects_per_month_percentiles(
+        self,
+        percentiles: Sequence[float] = (10, 25, 50, 75, 90),
+        as_of: Optional[datetime.date] = None,
+    ) -> dict[float, float]:
+        as_of = as_of or datetime.date.today()
+        return self._cached(("percentiles", tuple(percentiles), as_of), lambda: self._ects_per_month_percentiles(percentiles, as_of))
+
+    def _ects_per_month_percentiles(self, percentiles: Sequence[float], as_of: datetime.date) -> dict[float, float]:
+        cursor = self._cursor()
+        (count,) = cursor.execute("SELECT COUNT(*) FROM student").fetchone()
+        if count == 0:
+            return {}
+        ranks = {p: min(count, max(1, math.ceil(p / 100.0 * count))) for p in percentiles}
+        wanted = sorted(set(ranks.values()))
+        cursor.execute(
+            f"""
+            WITH progress AS ({_PROGRESS_SQL}),
+            ranked AS (
+              SELECT earned_ects * 1.0 / MAX(1, months) AS pace,
+                     ROW_NUMBER() OVER (ORDER BY earned_ects * 1.0 / MAX(1, months)) AS rn
+              FROM progress
+            )
+            SELECT rn, pace FROM ranked WHERE rn IN ({",".join(f":rank{i}" for i in range(len(wanted)))})
+            """,
+            {**self._as_of(as_of), **{f"rank{i}": r for i, r in enumerate(wanted)}},
+        )
+        pace_by_rank = dict(cursor.fetchall())
+        return {p: float(pace_by_rank[r]) for p, r in ranks.items()}
+
+    # The k students whose DeadlineGoal is furthest behind. Rows are streamed from SQLite and
+    # selected with a bounded heap (O(n log k)) instead of sorting the whole cohort.
+    def most_at_risk(self, k: int = 10, as_of: Optional[datetime.date] = None) -> List[AtRiskStudent]:
+        as_of = as_of or datetime.date.today()
+        return self._cached(("at_risk", k, as_of), lambda: self._most_at_risk(k, as_of))
+
+    def _most_at_risk(self, k: int, as_of: datetime.date) -> List[AtRiskStudent]:
+        cursor = self._cursor()
+        cursor.execute(
+            f"""
+            WITH progress AS ({_PROGRESS_SQL})
+            SELECT
+              p.student_id,
+              p.name,
+              CASE WHEN CAST(g.value AS INTEGER) > 0 THEN MIN(100.0, (MAX(0, p.months) * 1.0 / CAST(g.value AS INTEGER)) * 100.0) ELSE 0.0 END AS time_percent,
+              CASE WHEN COALESCE(pr.total_ects, :default_total) > 0
+                   THEN MIN(100.0, (p.earned_ects * 1.0 / COALESCE(pr.total_ects, :default_total)) * 100.0)
+                   ELSE 0.0 END AS cp_percent
+            FROM progress p
+            JOIN student_goals g ON g.student_id = p.student_id AND g.goal_type = 'DeadlineGoal'
+            LEFT JOIN program pr ON pr.program_id = p.program_id
+            """,
+            {**self._as_of(as_of), "default_total": self.default_program.total_ects},
+        )
+        rows = heapq.nsmallest(k, cursor, key=lambda r: r[3] - r[2])
+        classify = DeadlineGoal.classify
+        return [
+            AtRiskStudent(
+                student_id=sid,
+                name=name,
+                time_percent=time_percent,
+                cp_percent=cp_percent,
+                delta=cp_percent - time_percent,
+                status=classify(cp_percent - time_percent, 0.0),
+            )
+            for sid, name, time_percent, cp_percent in rows
+        ]
+
+    # Return the memoized result while the database is unchanged (file change counter), otherwise
+    # recompute it. Without a change counter (in-memory/WAL databases) nothing is memoized.
+    def _cached(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        stamp = self.database.change_counter()
+        cached = self._results.get(key)
+        if stamp is not None and cached is not None and cached[0] == stamp:
+            self._results.move_to_end(key)
+            return cached[1]
+        result = compute()
+        if stamp is not None:
+            self._results[key] = (stamp, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
+        return result
+
+    def _as_of(self, as_of: datetime.date) -> dict[str, int]:
+        return {"as_of_year": as_of.year, "as_of_month": as_of.month}
+
+    def _cursor(self):
+        if self.database.conn is None:
+            raise RuntimeError("Database not connected")
+        return self.database.conn.cursor()
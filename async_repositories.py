@@ -0,0 +1,245 @@
+# async_repositories.py
+# asyncio-native repository variants for headless/reporting consumers.
+#
+# SQLite connections are bound to the thread that created them, so all database work runs on
+# dedicated threads: a pool of reader threads (each with its own read-only connection) and one
+# writer thread. Readers share a queue and never wait for each other; the writer collects all
+# writes arriving within a short time window and commits them in one transaction.
+
+import asyncio
+import datetime
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from database import Database, is_busy_error
+from model import Student, Enrollment, Goal
+from repositories import StudentRepository, ModuleRepository, EnrollmentRepository
+
+# Synchronous repositories bound to one worker thread's connection.
+class _Repositories(NamedTuple):
+    database: Database
+    students: StudentRepository
+    modules: ModuleRepository
+    enrollments: EnrollmentRepository
+
+# Unit of work queued for a database thread: fn(repositories) resolved into an asyncio future.
+class _Job(NamedTuple):
+    fn: Callable[[_Repositories], Any]
+    future: asyncio.Future
+    loop: asyncio.AbstractEventLoop
+
+_STOP = None
+
+def _resolve(job: _Job, result: Any = None, error: Optional[BaseException] = None) -> None:
+    def apply() -> None:
+        if job.future.done():
+            return
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+    job.loop.call_soon_threadsafe(apply)
+
+@dataclass
+# Executes repository calls on dedicated database threads for asyncio callers.
+class AsyncDatabase:
+    db_path: str = "dashboard.db"
+    readers: int = 4
+    # Maximum number of queued or running jobs; further callers wait (backpressure).
+    queue_size: int = 256
+    # Writes arriving within this window (seconds) are committed together.
+    batch_window: float = 0.005
+    max_batch: int = 500
+
+    _read_queue: "queue.Queue[Optional[_Job]]" = field(default_factory=queue.Queue, init=False, repr=False)
+    _write_queue: "queue.Queue[Optional[_Job]]" = field(default_factory=queue.Queue, init=False, repr=False)
+    _threads: List[threading.Thread] = field(default_factory=list, init=False, repr=False)
+    _slots: Optional[asyncio.Semaphore] = field(default=None, init=False, repr=False)
+
+    # Start the database threads and wait until all of them have opened their connection. If one
+    # fails, the others are stopped and its error is raised, so no job is queued to a dead thread.
+    def start(self) -> None:
+        if self._threads:
+            return
+        ready: "queue.Queue[Optional[BaseException]]" = queue.Queue()
+        for i in range(self.readers):
+            self._threads.append(threading.Thread(target=self._read_loop, args=(ready,), name=f"db-reader-{i}", daemon=True))
+        self._threads.append(threading.Thread(target=self._write_loop, args=(ready,), name="db-writer", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        errors = [error for error in (ready.get() for _ in self._threads) if error is not None]
+        if errors:
+            for _ in range(self.readers):
+                self._read_queue.put(_STOP)
+            self._write_queue.put(_STOP)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+            # Threads that failed to open did not consume their stop marker
+            self._read_queue, self._write_queue = queue.Queue(), queue.Queue()
+            raise errors[0]
+        self._slots = asyncio.Semaphore(self.queue_size)
+        logging.info("Async database started: %d readers, 1 writer.", self.readers)
+
+    async def read(self, fn: Callable[[_Repositories], Any]) -> Any:
+        return await self._submit(self._read_queue, fn)
+
+    async def write(self, fn: Callable[[_Repositories], Any]) -> Any:
+        return await self._submit(self._write_queue, fn)
+
+    # Stop all database threads after the queued jobs are done and close their connections.
+    async def close(self) -> None:
+        if not self._threads:
+            return
+        for _ in range(self.readers):
+            self._read_queue.put(_STOP)
+        self._write_queue.put(_STOP)
+        threads, self._threads = self._threads, []
+        await asyncio.get_running_loop().run_in_executor(None, lambda: [t.join() for t in threads])
+        logging.info("Async database closed.")
+
+    async def __aenter__(self) -> "AsyncDatabase":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _submit(self, jobs: "queue.Queue[Optional[_Job]]", fn: Callable[[_Repositories], Any]) -> Any:
+        if self._slots is None:
+            raise RuntimeError("Async database not started")
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            jobs.put(_Job(fn, future, loop))
+            return await future
+
+    def _open(self, read_only: bool) -> _Repositories:
+        database = Database(db_path=self.db_path, read_only=read_only)
+        database.connect()
+        return _Repositories(
+            database=database,
+            students=StudentRepository(database=database),
+            modules=ModuleRepository(database=database),
+            enrollments=EnrollmentRepository(database=database),
+        )
+
+    # Open the connection of a database thread and report the outcome to start().
+    def _open_reporting(self, read_only: bool, ready: "queue.Queue[Optional[BaseException]]") -> Optional[_Repositories]:
+        try:
+            repos = self._open(read_only=read_only)
+        except Exception as e:
+            logging.error(f"Database thread could not open {self.db_path}: {e}")
+            ready.put(e)
+            return None
+        ready.put(None)
+        return repos
+
+    def _read_loop(self, ready: "queue.Queue[Optional[BaseException]]") -> None:
+        repos = self._open_reporting(True, ready)
+        if repos is None:
+            return
+        try:
+            while (job := self._read_queue.get()) is not _STOP:
+                try:
+                    _resolve(job, job.fn(repos))
+                except Exception as e:
+                    _resolve(job, error=e)
+        finally:
+            repos.database.close()
+
+    def _write_loop(self, ready: "queue.Queue[Optional[BaseException]]") -> None:
+        repos = self._open_reporting(False, ready)
+        if repos is None:
+            return
+        try:
+            stopping = False
+            while not stopping:
+                job = self._write_queue.get()
+                if job is _STOP:
+                    break
+                batch = [job]
+                deadline = time.monotonic() + self.batch_window
+                while len(batch) < self.max_batch:
+                    try:
+                        job = self._write_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if job is _STOP:
+                        stopping = True
+                        break
+                    batch.append(job)
+                self._run_batch(repos, batch)
+        finally:
+            repos.database.close()
+
+    # Commit a batch in one transaction, retried while another connection holds the lock. If it
+    # fails otherwise, the jobs are replayed one by one so that only the offending write reports an
+    # error; if the database stays locked, all jobs of the batch report the lock error.
+    def _run_batch(self, repos: _Repositories, batch: List[_Job]) -> None:
+        def write_all() -> List[Any]:
+            with repos.database.transaction():
+                return [job.fn(repos) for job in batch]
+
+        try:
+            results = repos.database.run_with_retry(write_all)
+        except Exception as e:
+            if len(batch) == 1 or (isinstance(e, sqlite3.OperationalError) and is_busy_error(e)):
+                for job in batch:
+                    _resolve(job, error=e)
+                return
+            logging.warning(f"Write batch of {len(batch)} failed ({e}), retrying individually.")
+            for job in batch:
+                self._run_batch(repos, [job])
+            return
+        for job, result in zip(batch, results):
+            _resolve(job, result)
+
+@dataclass
+# asyncio counterpart of StudentRepository.
+class AsyncStudentRepository:
+    executor: AsyncDatabase
+
+    # Returns the new version of the row; expected_version makes it a compare-and-swap write.
+    async def upsert(self, student: Student, expected_version: Optional[int] = None) -> int:
+        return await self.executor.write(lambda r: r.students.upsert(student, expected_version))
+
+    async def get_aggregate_by_id(self, student_id: str) -> Student | None:
+        return await self.executor.read(lambda r: r.students.get_aggregate_by_id(student_id))
+
+    async def list_aggregates(self, id_from: Optional[str] = None, id_to: Optional[str] = None) -> List[Student]:
+        return await self.executor.read(lambda r: r.students.list_aggregates(id_from, id_to))
+
+    async def save_goals(self, student_id: str, goals: List[Goal]) -> None:
+        await self.executor.write(lambda r: r.students.save_goals(student_id, goals))
+
+    async def list_ids(self) -> List[str]:
+        return await self.executor.read(lambda r: r.students.list_ids())
+
+    async def list_all(self) -> List[Student]:
+        return await self.executor.read(lambda r: r.students.list_all())
+
+@dataclass
+# asyncio counterpart of EnrollmentRepository.
+class AsyncEnrollmentRepository:
+    executor: AsyncDatabase
+
+    async def upsert(
+        self,
+        student_id: str,
+        module_id: str,
+        grade: Optional[float],
+        date_passed: Optional[datetime.date],
+        expected_version: Optional[int] = None,
+    ) -> int:
+        return await self.executor.write(
+            lambda r: r.enrollments.upsert(student_id, module_id, grade, date_passed, expected_version)
+        )
+
+    async def list_by_student(self, student_id: str) -> List[Enrollment]:
+        return await self.executor.read(lambda r: r.enrollments.list_by_student(student_id))
@@ -0,0 +1,368 @@
+# benchmarks.py
+# Performance benchmarks for the Dashboard application.
+# Usage: python benchmarks.py <benchmark> [options]; see --help for the available benchmarks.
+
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Callable, List
+
+# Run a callable `repeat` times and return the best wall time in seconds.
+def _best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# Scaling benchmark for the process-pool cohort evaluation (1..max_workers cores).
+def bench_parallel_scaling(db_path: str, max_workers: int, chunk_size: int, repeat: int = 3) -> None:
+    from parallel import evaluate_cohort_parallel
+    from database import Database
+    from repositories import StudentRepository, ModuleRepository, EnrollmentRepository, ProgramRepository
+    from services import DashboardService
+
+    database = Database(db_path=db_path, read_only=True)
+    database.connect()
+    service = DashboardService(
+        student_repository=StudentRepository(database=database),
+        module_repository=ModuleRepository(database=database),
+        enrollment_repository=EnrollmentRepository(database=database),
+        program_repository=ProgramRepository(database=database),
+    )
+    baseline = _best_of(service.evaluate_all_students, repeat)
+    students = len(service.student_repository.list_ids())
+    database.close()
+
+    print(f"students={students} chunk_size={chunk_size}")
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+    print(f"{'serial':>8} {baseline:>10.3f} {1.0:>8.2f}")
+    for workers in range(1, max_workers + 1):
+        elapsed = _best_of(lambda: evaluate_cohort_parallel(db_path, workers=workers, chunk_size=chunk_size), repeat)
+        print(f"{workers:>8} {elapsed:>10.3f} {baseline / elapsed:>8.2f}")
+
+# Concurrency benchmark for the asyncio repositories: sequential synchronous calls against
+# concurrent async reads (reader pool) and concurrent async writes (batched commits).
+# Runs on a temporary copy of the database, so the original file is not modified.
+def bench_async_repositories(db_path: str, readers: int, concurrency: int, operations: int) -> None:
+    from database import Database
+    from repositories import StudentRepository
+    from async_repositories import AsyncDatabase, AsyncStudentRepository
+    from model import Student
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        shutil.copy(db_path, path)
+
+        database = Database(db_path=path)
+        database.connect()
+        sync_repo = StudentRepository(database=database)
+        ids = sync_repo.list_ids()
+        if not ids:
+            print("database has no students")
+            return
+        read_ids = [ids[i % len(ids)] for i in range(operations)]
+        start_date = datetime.date(2024, 10, 1)
+        new_students = [Student(f"BENCH-{i:07d}", "Benchmark", start_date) for i in range(operations)]
+
+        start = time.perf_counter()
+        for student_id in read_ids:
+            sync_repo.get_aggregate_by_id(student_id)
+        sync_reads = time.perf_counter() - start
+        start = time.perf_counter()
+        for student in new_students:
+            sync_repo.upsert(student)
+        sync_writes = time.perf_counter() - start
+        database.close()
+
+        async def run() -> tuple[float, float]:
+            async with AsyncDatabase(db_path=path, readers=readers, queue_size=concurrency) as executor:
+                repo = AsyncStudentRepository(executor)
+                start = time.perf_counter()
+                await asyncio.gather(*(repo.get_aggregate_by_id(sid) for sid in read_ids))
+                reads = time.perf_counter() - start
+                start = time.perf_counter()
+                await asyncio.gather(*(repo.upsert(s) for s in new_students))
+                return reads, time.perf_counter() - start
+
+        async_reads, async_writes = asyncio.run(run())
+
+    print(f"operations={operations} readers={readers} concurrency={concurrency}")
+    print(f"{'':>8} {'sync ops/s':>12} {'async ops/s':>12}")
+    print(f"{'reads':>8} {operations / sync_reads:>12.0f} {operations / async_reads:>12.0f}")
+    print(f"{'writes':>8} {operations / sync_writes:>12.0f} {operations / async_writes:>12.0f}")
+
+# Micro-benchmark for the shared metrics context: derives the goal metrics of many students the
+# way the goals did before (one Student method call per metric, today() per call) and through
+# one StudentMetrics per evaluation, and times full evaluate_all_goals calls.
+def bench_metrics(students: int, enrollments: int, repeat: int = 3, seed: int = 1) -> None:
+    from model import Student, Module, Enrollment, StudyProgram, GradeAverageGoal, DeadlineGoal, CpPaceGoal
+
+    rng = random.Random(seed)
+    program = StudyProgram(name="Benchmark", total_ects=180, duration_months=48, program_id="BENCH")
+    modules = [Module(module_id=f"M{i:03d}", title=f"Modul {i}", ects=rng.choice((5, 5, 10))) for i in range(max(enrollments, 1))]
+    cohort = []
+    for i in range(students):
+        start = datetime.date(2020, 1, 1) + datetime.timedelta(days=rng.randrange(1500))
+        cohort.append(
+            Student(
+                student_id=f"S{i:07d}",
+                name="Benchmark",
+                start_date=start,
+                enrollments=[
+                    Enrollment(module=m, grade=rng.choice((None, 1.0, 1.7, 2.3, 3.0, 4.0)), date_passed=start if rng.random() < 0.7 else None)
+                    for m in rng.sample(modules, enrollments)
+                ],
+                goals=[GradeAverageGoal(2.0), DeadlineGoal(48), CpPaceGoal(3.75)],
+            )
+        )
+
+    def reference() -> None:
+        for s in cohort:
+            s.get_average_grade()
+            s.get_time_progress_percentage(48)
+            s.get_cp_progress_percentage(program.total_ects)
+            s.get_cp_per_month()
+
+    def shared() -> None:
+        as_of = datetime.date.today()
+        for s in cohort:
+            s._metrics_cache = None
+            m = s.metrics(as_of)
+            m.average_grade
+            m.time_progress_percentage(48)
+            m.cp_progress_percentage(program.total_ects)
+            m.cp_per_month()
+
+    def evaluate() -> None:
+        as_of = datetime.date.today()
+        for s in cohort:
+            s.evaluate_all_goals(program, as_of)
+
+    t_reference = _best_of(reference, repeat)
+    t_shared = _best_of(shared, repeat)
+    t_evaluate = _best_of(evaluate, repeat)
+    print(f"students={students} enrollments/student={enrollments} goals/student=3")
+    print(f"{'per-metric Student methods':>32} {t_reference * 1e6 / students:>8.2f} us/student")
+    print(f"{'shared StudentMetrics (cold)':>32} {t_shared * 1e6 / students:>8.2f} us/student  ({t_reference / t_shared:.2f}x)")
+    print(f"{'evaluate_all_goals (memoized)':>32} {t_evaluate * 1e6 / students:>8.2f} us/student")
+
+# Online backup: throughput of the paged backup and its effect on the latency of concurrent
+# get_aggregate_by_id calls (p50/p95/max), compared with the same reads without a running backup.
+# Runs on a temporary copy of the database.
+def bench_backup(db_path: str, pages: int, compress: bool, reads: int) -> None:
+    import threading
+    from database import Database
+    from repositories import StudentRepository
+    from backup import backup_database
+
+    def percentile(samples: List[float], p: float) -> float:
+        return sorted(samples)[min(len(samples) - 1, int(p * len(samples)))] * 1000.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        shutil.copy(db_path, path)
+        database = Database(db_path=path)
+        database.connect()
+        database.init_db()
+        repo = StudentRepository(database=database)
+        ids = repo.list_ids()
+        if not ids:
+            print("database has no students")
+            return
+        rng = random.Random(1)
+
+        def read_once(samples: List[float]) -> None:
+            student_id = ids[rng.randrange(len(ids))]
+            start = time.perf_counter()
+            repo.get_aggregate_by_id(student_id)
+            samples.append(time.perf_counter() - start)
+
+        idle: List[float] = []
+        for _ in range(reads):
+            read_once(idle)
+        results = []
+        worker = threading.Thread(target=lambda: results.append(backup_database(path, os.path.join(tmp, "backups"), pages=pages, compress=compress)))
+        during: List[float] = []
+        worker.start()
+        while worker.is_alive():
+            read_once(during)
+        worker.join()
+        database.close()
+
+    result = results[0]
+    print(f"backup: {result.database_bytes / 1e6:.1f} MB -> {result.bytes / 1e6:.1f} MB in {result.seconds:.2f}s "
+          f"({result.mb_per_second:.1f} MB/s), pages/step={pages}, compress={compress}")
+    print(f"{'get_aggregate_by_id':>20} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'reads':>7}")
+    for label, samples in (("idle", idle), ("during backup", during)):
+        if not samples:
+            continue
+        print(f"{label:>20} {percentile(samples, 0.5):>8.2f} {percentile(samples, 0.95):>8.2f} {max(samples) * 1000:>8.2f} {len(samples):>7}")
+
+# Date conversion: parses `rows` database date values the way the repositories did before
+# (fromisoformat per row) and through parsing.parse_db_date for ISO and ordinal storage, and user
+# input through the former strptime/exception chain and parsing.parse_user_date. The caches are
+# cleared before every run, so the times include the misses of the distinct dates.
+def bench_parsing(rows: int, distinct: int, repeat: int = 3, seed: int = 1) -> None:
+    import parsing
+
+    rng = random.Random(seed)
+    domain = [datetime.date(2018, 1, 1) + datetime.timedelta(days=rng.randrange(3000)) for _ in range(distinct)]
+    dates = [rng.choice(domain) for _ in range(rows)]
+    iso = [d.isoformat() for d in dates]
+    ordinals = [str(d.toordinal()) for d in dates]
+    german = [d.strftime("%d.%m.%Y") for d in dates]
+
+    def strptime_chain(text: str) -> datetime.date:
+        for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y"):
+            try:
+                return datetime.datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+        raise ValueError(text)
+
+    def cached(fn: Callable[[str], object], values: List[str]) -> Callable[[], None]:
+        def run() -> None:
+            parsing._date_from_text.cache_clear()
+            parsing._date_from_ordinal.cache_clear()
+            parsing._parse_user_date.cache_clear()
+            for v in values:
+                fn(v)
+        return run
+
+    cases = [
+        ("fromisoformat per row", lambda: [datetime.date.fromisoformat(v) for v in iso]),
+        ("parse_db_date (ISO)", cached(parsing.parse_db_date, iso)),
+        ("parse_db_date (ordinal)", cached(parsing.parse_db_date, ordinals)),
+        ("strptime chain (German)", lambda: [strptime_chain(v) for v in german]),
+        ("parse_user_date (German)", cached(parsing.parse_user_date, german)),
+    ]
+    print(f"rows={rows} distinct dates={distinct}")
+    for label, fn in cases:
+        print(f"{label:>26} {_best_of(fn, repeat) * 1e9 / rows:>8.0f} ns/value")
+
+# Repository latencies (p50/p95 per call) with the file-backed database and in in-memory mode,
+# plus the load time and the cost of one persist. Runs on a temporary copy of the database.
+def bench_in_memory(db_path: str, calls: int, seed: int = 1) -> None:
+    from database import Database
+    from repositories import StudentRepository, ModuleRepository, EnrollmentRepository
+
+    def percentile(samples: List[float], p: float) -> float:
+        return sorted(samples)[min(len(samples) - 1, int(p * len(samples)))] * 1000.0
+
+    # The copy is placed next to the database, so the file-backed numbers include the same disk
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(db_path))) as tmp:
+        path = os.path.join(tmp, "bench.db")
+        shutil.copy(db_path, path)
+        setup = Database(db_path=path)
+        setup.connect()
+        setup.init_db()
+        setup.close()
+
+        results: dict[str, dict[str, List[float]]] = {}
+        for mode in ("file", "memory"):
+            started = time.perf_counter()
+            database = Database(db_path=path, in_memory=mode == "memory", persist_interval=None)
+            database.connect()
+            connect_seconds = time.perf_counter() - started
+            students = StudentRepository(database=database)
+            modules = ModuleRepository(database=database)
+            enrollments = EnrollmentRepository(database=database)
+            ids = students.list_ids()
+            module_ids = [m.module_id for m in modules.list_all()]
+            if not ids or not module_ids:
+                print("database has no students or modules")
+                return
+            rng = random.Random(seed)
+            sample = students.get_aggregate_by_id(ids[0])
+
+            def hundred_aggregates() -> List[object]:
+                i = rng.randrange(max(1, len(ids) - 100))
+                return students.list_aggregates(ids[i], ids[min(len(ids), i + 100) - 1])
+
+            operations: dict[str, Callable[[], object]] = {
+                "get_aggregate_by_id": lambda: students.get_aggregate_by_id(rng.choice(ids)),
+                "list_aggregates (100)": hundred_aggregates,
+                "module list_all": modules.list_all,
+                "student upsert": lambda: students.upsert(sample),
+                "enrollment upsert": lambda: enrollments.upsert(rng.choice(ids), rng.choice(module_ids), 2.0, datetime.date(2026, 1, 15)),
+            }
+            timings: dict[str, List[float]] = {}
+            for name, operation in operations.items():
+                samples = timings.setdefault(name, [])
+                for _ in range(calls if name != "list_aggregates (100)" else max(1, calls // 20)):
+                    start = time.perf_counter()
+                    operation()
+                    samples.append(time.perf_counter() - start)
+            results[mode] = timings
+            started = time.perf_counter()
+            database.close()
+            print(f"{mode:>6}: connect {connect_seconds * 1000:.0f} ms, close {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    print(f"{'operation':>24} {'file p50':>9} {'p95':>7} {'memory p50':>11} {'p95':>7} {'speedup':>8}")
+    for name in results["file"]:
+        f, m = results["file"][name], results["memory"][name]
+        print(f"{name:>24} {percentile(f, 0.5):>9.3f} {percentile(f, 0.95):>7.3f} "
+              f"{percentile(m, 0.5):>11.3f} {percentile(m, 0.95):>7.3f} {percentile(f, 0.5) / percentile(m, 0.5):>7.1f}x")
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Dashboard performance benchmarks")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    p = sub.add_parser("parallel", help="scaling of the process-pool cohort evaluation")
+    p.add_argument("--db", default="dashboard.db")
+    p.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--chunk-size", type=int, default=500)
+    p.add_argument("--repeat", type=int, default=3)
+
+    p = sub.add_parser("async", help="concurrent reads/writes through the asyncio repositories")
+    p.add_argument("--db", default="dashboard.db")
+    p.add_argument("--readers", type=int, default=4)
+    p.add_argument("--concurrency", type=int, default=64)
+    p.add_argument("--operations", type=int, default=2000)
+
+    p = sub.add_parser("metrics", help="shared metrics context vs. per-metric computation")
+    p.add_argument("--students", type=int, default=20000)
+    p.add_argument("--enrollments", type=int, default=30)
+    p.add_argument("--repeat", type=int, default=3)
+
+    p = sub.add_parser("backup", help="online backup throughput and concurrent read latency")
+    p.add_argument("--db", default="dashboard.db")
+    p.add_argument("--pages", type=int, default=256)
+    p.add_argument("--compress", action="store_true")
+    p.add_argument("--reads", type=int, default=2000)
+
+    p = sub.add_parser("parsing", help="cached date parsing vs. per-row conversion")
+    p.add_argument("--rows", type=int, default=200000)
+    p.add_argument("--distinct", type=int, default=1500)
+    p.add_argument("--repeat", type=int, default=3)
+
+    p = sub.add_parser("memory", help="repository latencies, file-backed vs. in-memory database")
+    p.add_argument("--db", default="dashboard.db")
+    p.add_argument("--calls", type=int, default=500)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.benchmark == "parallel":
+        bench_parallel_scaling(args.db, args.max_workers, args.chunk_size, args.repeat)
+    elif args.benchmark == "async":
+        bench_async_repositories(args.db, args.readers, args.concurrency, args.operations)
+    elif args.benchmark == "metrics":
+        bench_metrics(args.students, args.enrollments, args.repeat)
+    elif args.benchmark == "backup":
+        bench_backup(args.db, args.pages, args.compress, args.reads)
+    elif args.benchmark == "parsing":
+        bench_parsing(args.rows, args.distinct, args.repeat)
+    elif args.benchmark == "memory":
+        bench_in_memory(args.db, args.calls)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 # controller.py
 import datetime
 from dataclasses import dataclass
-from typing import List, Optional, Protocol
+from typing import Callable, List, Optional, Protocol
 
-from model import Student, Module, GoalEvaluation
+from model import Student, Module, Enrollment, StudyProgram, GoalEvaluation
+from write_behind import FlushResult
+from planner import ModulePlan
 
 # --- INTERFACE DEFINITION (DIP) ---
 class IDashboardService(Protocol):
@@ -11,10 +13,17 @@ class IDashboardService(Protocol):
     def get_student_aggregate(self, student_id: str) -> Student: ...
     def add_module_to_catalogue(self, module: Module) -> None: ...
     def update_study_progress(self, student_id: str, module_id: str, grade: Optional[float], date_passed: Optional[datetime.date]) -> None: ...
+    def update_study_progress_many(self, rows: List[tuple[str, str, Optional[float], Optional[datetime.date]]]) -> None: ...
+    def list_module_enrollments(self, module_id: str) -> List[tuple[str, Enrollment]]: ...
     def evaluate_student_goals(self, student: Student) -> List[GoalEvaluation]: ...
+    def plan_student_modules(self, student_id: str, as_of: Optional[datetime.date] = None) -> ModulePlan: ...
     def list_students(self) -> List[Student]: ...
     def list_modules(self) -> List[Module]: ...
+    def list_programs(self) -> List[StudyProgram]: ...
     def update_student_goals(self, student_id: str, duration_months: int, target_avg: float, target_cp_per_month: float) -> None: ...
+    def flush_writes(self, force: bool = True) -> FlushResult: ...
+    def check_external_changes(self) -> bool: ...
+    def add_invalidation_listener(self, listener: Callable[[set[str]], None]) -> None: ...
     def close(self) -> None: ...
 
 @dataclass
@@ -40,6 +49,10 @@ class DashboardController:
     ) -> None:
         self.dashboard_service.update_study_progress(student.student_id, module.module_id, grade, date)
 
+    # Save the rows of the bulk entry grid, (student_id, module_id, grade, date_passed), in one transaction.
+    def process_enrollment_batch(self, rows: List[tuple[str, str, Optional[float], Optional[datetime.date]]]) -> None:
+        self.dashboard_service.update_study_progress_many(rows)
+
     def process_goal_data(self, student_id: str, target_duration: int, target_avg: float, target_cp: float) -> None:
         if target_duration <= 0:
             raise ValueError("Dauer in Monaten muss > 0 sein.")
@@ -54,6 +67,27 @@ class DashboardController:
     def refresh_dashboard_stats(self, student: Student) -> List[GoalEvaluation]:
         return self.dashboard_service.evaluate_student_goals(student)
 
+    # Load a student and evaluate the goals in one call (used by the prefetch of the overview tab).
+    def evaluate_student(self, student_id: str) -> List[GoalEvaluation]:
+        return self.dashboard_service.evaluate_student_goals(self.dashboard_service.get_student_aggregate(student_id))
+
+    # Modules recommended to get the student's deadline and pace goals back on track.
+    def plan_student_modules(self, student_id: str, as_of: Optional[datetime.date] = None) -> ModulePlan:
+        return self.dashboard_service.plan_student_modules(student_id, as_of)
+
+    # Register a callback receiving the IDs of students whose data changed, e.g. to drop cached views.
+    def add_invalidation_listener(self, listener: Callable[[set[str]], None]) -> None:
+        self.dashboard_service.add_invalidation_listener(listener)
+
+    # Flush pending UI writes (periodically when due, or forced e.g. before shutdown) and
+    # return what was written and which rows were rejected.
+    def flush_pending_writes(self, force: bool = False) -> FlushResult:
+        return self.dashboard_service.flush_writes(force=force)
+
+    # Returns True if another dashboard instance changed the shared database since the last check.
+    def check_external_changes(self) -> bool:
+        return self.dashboard_service.check_external_changes()
+
     # Method to gracefully shutdown the application, e.g. close database connections if needed.
     def shutdown(self) -> None:
         self.dashboard_service.close()
@@ -66,6 +100,14 @@ class DashboardController:
     def get_student_aggregate(self, student_id: str) -> Student:
         return self.dashboard_service.get_student_aggregate(student_id)
 
+    # Additional helper method to retrieve the enrollments of a module as (student_id, Enrollment) pairs.
+    def get_module_enrollments(self, module_id: str) -> List[tuple[str, Enrollment]]:
+        return self.dashboard_service.list_module_enrollments(module_id)
+
     # Additional helper method to retrieve the list of modules for module management.
     def refresh_module_list(self) -> List[Module]:
-        return self.dashboard_service.list_modules()
\ No newline at end of file
+        return self.dashboard_service.list_modules()
+
+    # Additional helper method to retrieve the list of study programs for the program dropdown.
+    def refresh_program_list(self) -> List[StudyProgram]:
+        return self.dashboard_service.list_programs()
\ No newline at end of file
@@ -0,0 +1,409 @@
+# dashboard.py
+# Headless command line interface for batch operations (nightly jobs, servers without display).
+# Reuses Database, the repositories and DashboardService; tkinter is never imported.
+# Usage: python -m dashboard [--db dashboard.db] <command> [options]; see --help.
+
+import argparse
+import csv
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List, Optional, TextIO
+
+from database import Database, ConcurrentModificationError, archive_path_for
+from repositories import StudentRepository, ModuleRepository, EnrollmentRepository, ProgramRepository, GoalRuleRepository, ChangeLogRepository, EvaluationCacheRepository, ArchiveRepository
+from evaluation_cache import EvaluationCache
+from goal_engine import GOAL_REGISTRY, load_goal_rules
+from services import DashboardService
+from maintenance import run_maintenance
+from backup import backup_database, restore_backup, verify_backup
+from parsing import parse_user_date, sql_iso_date
+from model import Student, Module, StudyProgram, Goal, GoalEvaluation
+
+# Table exports: header and query (ordered by primary key, streamed from the cursor); dates are
+# exported as ISO strings regardless of their storage format.
+EXPORTS = {
+    "programs": (("program_id", "name", "total_ects", "duration_months"),
+                 "SELECT program_id, name, total_ects, duration_months FROM program ORDER BY program_id"),
+    "students": (("student_id", "name", "start_date", "program_id"),
+                 f"SELECT student_id, name, {sql_iso_date('start_date')}, program_id FROM student ORDER BY student_id"),
+    "modules": (("module_id", "title", "ects"),
+                "SELECT module_id, title, ects FROM module ORDER BY module_id"),
+    "enrollments": (("student_id", "module_id", "grade", "date_passed"),
+                    f"SELECT student_id, module_id, grade, {sql_iso_date('date_passed')} FROM enrollment ORDER BY student_id, module_id"),
+    "goals": (("student_id", "goal_type", "value"),
+              "SELECT student_id, goal_type, value FROM student_goals ORDER BY student_id, goal_type"),
+}
+
+def _build_service(database: Database, use_cache: bool = False) -> DashboardService:
+    return DashboardService(
+        student_repository=StudentRepository(database=database),
+        module_repository=ModuleRepository(database=database),
+        enrollment_repository=EnrollmentRepository(database=database),
+        program_repository=ProgramRepository(database=database),
+        evaluation_cache=EvaluationCache(EvaluationCacheRepository(database=database)) if use_cache else None,
+        archive_repository=ArchiveRepository(database=database) if database.archive_attached else None,
+    )
+
+@contextmanager
+def _open_output(path: Optional[str]) -> Iterator[TextIO]:
+    if path is None or path == "-":
+        yield sys.stdout
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            yield fh
+
+def _evaluation_rows(student_id: str, evaluations: List[GoalEvaluation]) -> Iterator[tuple]:
+    for evaluation in evaluations:
+        for criterion in evaluation.criteria:
+            yield (student_id, evaluation.title, evaluation.status.value, criterion.name, criterion.value, criterion.target)
+
+# Write evaluation results as CSV (one row per criterion) or JSON lines (one object per student).
+def _write_evaluations(out: IO[str], fmt: str, batches: Iterable[dict[str, List[GoalEvaluation]]]) -> int:
+    count = 0
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(("student_id", "goal", "status", "criterion", "value", "target"))
+    for batch in batches:
+        for student_id in sorted(batch):
+            evaluations = batch[student_id]
+            if writer is not None:
+                writer.writerows(_evaluation_rows(student_id, evaluations))
+            else:
+                out.write(json.dumps({
+                    "student_id": student_id,
+                    "goals": [
+                        {
+                            "goal": e.title,
+                            "status": e.status.value,
+                            "criteria": [{"name": c.name, "value": c.value, "target": c.target} for c in e.criteria],
+                        }
+                        for e in evaluations
+                    ],
+                }, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+def cmd_evaluate(database: Database, args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    service = _build_service(database, use_cache=not args.no_cache)
+    as_of = datetime.date.fromisoformat(args.as_of) if args.as_of else datetime.date.today()
+    if args.student:
+        students = []
+        for student_id in args.student:
+            students.append(service.get_student_aggregate(student_id, include_archived=args.include_archived))
+        batches: Iterable[dict[str, List[GoalEvaluation]]] = [service.evaluate_students(students, as_of)]
+    elif args.stream:
+        # Shard by shard: memory stays bounded by chunk_size students (2 * workers shards with --workers)
+        batches = service.iter_evaluations(workers=args.workers, chunk_size=args.chunk_size, as_of=as_of)
+    else:
+        results: dict[str, List[GoalEvaluation]] = {}
+        for batch in service.iter_evaluations(workers=args.workers, chunk_size=args.chunk_size, as_of=as_of):
+            results.update(batch)
+        batches = [results]
+
+    with _open_output(args.output) as out:
+        count = _write_evaluations(out, args.format, batches)
+    print(f"{count} students evaluated in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    return 0
+
+# Import rows from a CSV file with header in one transaction; an invalid row aborts the import.
+def cmd_import(database: Database, args: argparse.Namespace) -> int:
+    students = StudentRepository(database=database)
+    modules = ModuleRepository(database=database)
+    enrollments = EnrollmentRepository(database=database)
+    programs = ProgramRepository(database=database)
+
+    def optional(value: Optional[str]) -> Optional[str]:
+        return value if value not in (None, "") else None
+
+    def load() -> int:
+        count = 0
+        goals_by_student: dict[str, List[Goal]] = {}
+        with open(args.file, encoding="utf-8", newline="") as fh, database.transaction():
+            for line, row in enumerate(csv.DictReader(fh), start=2):
+                try:
+                    if args.kind == "programs":
+                        programs.upsert(StudyProgram(
+                            name=row["name"],
+                            total_ects=int(row["total_ects"]),
+                            duration_months=int(row["duration_months"]),
+                            program_id=row["program_id"],
+                        ))
+                    elif args.kind == "students":
+                        students.upsert(Student(
+                            student_id=row["student_id"],
+                            name=row["name"],
+                            start_date=parse_user_date(row["start_date"]),
+                            program_id=optional(row.get("program_id")),
+                        ))
+                    elif args.kind == "modules":
+                        modules.upsert(Module(module_id=row["module_id"], title=row["title"], ects=int(row["ects"])))
+                    elif args.kind == "enrollments":
+                        grade = optional(row.get("grade"))
+                        enrollments.upsert(
+                            row["student_id"],
+                            row["module_id"],
+                            float(grade) if grade is not None else None,
+                            parse_user_date(row.get("date_passed")),
+                        )
+                    else:
+                        goal = GOAL_REGISTRY.create(row["goal_type"], float(row["value"]))
+                        if goal is None:
+                            raise ValueError(f"unknown goal type {row['goal_type']}")
+                        goals_by_student.setdefault(row["student_id"], []).append(goal)
+                except (KeyError, ValueError, sqlite3.IntegrityError) as e:
+                    raise ValueError(f"{args.file}:{line}: invalid {args.kind} row: {e}") from e
+                count += 1
+            # Goals are replaced per student (like the goal form)
+            for student_id, goals in goals_by_student.items():
+                students.save_goals(student_id, goals)
+        return count
+
+    count = database.run_with_retry(load)
+    print(f"{count} {args.kind} imported")
+    return 0
+
+def cmd_export(database: Database, args: argparse.Namespace) -> int:
+    header, query = EXPORTS[args.kind]
+    cursor = database.conn.cursor()
+    cursor.execute(query)
+    with _open_output(args.output) as out:
+        writer = csv.writer(out)
+        writer.writerow(header)
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            writer.writerows(rows)
+    return 0
+
+def cmd_vacuum(database: Database, args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    size_before = os.path.getsize(database.db_path)
+    database.conn.execute("VACUUM")
+    print(f"VACUUM: {size_before} -> {os.path.getsize(database.db_path)} bytes in {time.perf_counter() - started:.2f}s")
+    return 0
+
+def cmd_analyze(database: Database, args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    database.conn.execute("ANALYZE")
+    database.conn.execute("PRAGMA optimize")
+    database.conn.commit()
+    print(f"ANALYZE: {time.perf_counter() - started:.2f}s")
+    return 0
+
+# Changes after a sequence number as CSV (incremental downstream sync). Exits with 3 if changes
+# after `since` were already pruned, i.e. the consumer has to export fully instead.
+def cmd_changes(database: Database, args: argparse.Namespace) -> int:
+    log = ChangeLogRepository(database=database)
+    if not log.covers(args.since):
+        logging.error(f"Changes after {args.since} were pruned, a full export is required.")
+        return 3
+    with _open_output(args.output) as out:
+        writer = csv.writer(out)
+        writer.writerow(("seq", "entity", "student_id", "module_id", "version", "changed_at"))
+        for change in log.changes_since(args.since, args.limit):
+            writer.writerow((change.seq, change.entity, change.student_id, change.module_id, change.version, change.changed_at))
+    return 0
+
+# All maintenance steps (see maintenance.py) in one go, e.g. as a nightly job.
+def cmd_maintain(database: Database, args: argparse.Namespace) -> int:
+    report = run_maintenance(database, check=not args.no_check, convert_auto_vacuum=args.convert_auto_vacuum)
+    print(report.describe())
+    return 0 if report.ok else 2
+
+def cmd_backup(database: Database, args: argparse.Namespace) -> int:
+    result = backup_database(database.db_path, args.dir, pages=args.pages, compress=args.compress)
+    print(f"{result.path}: {result.pages} pages, {result.bytes} bytes in {result.seconds:.2f}s ({result.mb_per_second:.1f} MB/s)")
+    return 0
+
+def cmd_restore(database: Database, args: argparse.Namespace) -> int:
+    # The target file is written through a connection of its own; ours must not stay open meanwhile
+    database.close()
+    restore_backup(args.backup, database.db_path, verify=not args.no_verify)
+    print(f"{args.backup} restored into {database.db_path}")
+    return 0
+
+def cmd_verify(database: Database, args: argparse.Namespace) -> int:
+    problems = verify_backup(args.backup)
+    print(f"{args.backup}: " + ("ok" if not problems else "; ".join(problems)))
+    return 0 if not problems else 2
+
+# Move finished students into the archive file (see ArchiveRepository), e.g. as a monthly job.
+def cmd_archive(database: Database, args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    student_ids = _build_service(database).archive_finished_students(quiet_days=args.quiet_days, dry_run=args.dry_run)
+    if args.dry_run:
+        for student_id in student_ids:
+            print(student_id)
+        return 0
+    print(f"{len(student_ids)} students archived into {database.archive_path} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+def cmd_unarchive(database: Database, args: argparse.Namespace) -> int:
+    _build_service(database).restore_archived_student(args.student)
+    print(f"{args.student} restored from {database.archive_path}")
+    return 0
+
+# Recommended modules per student (see planner.py) as CSV: student, status, missing ECTS, modules.
+def cmd_plan(database: Database, args: argparse.Namespace) -> int:
+    service = _build_service(database)
+    as_of = datetime.date.fromisoformat(args.as_of) if args.as_of else None
+    with _open_output(args.output) as out:
+        writer = csv.writer(out)
+        writer.writerow(("student_id", "status", "missing_ects", "planned_ects", "modules"))
+        for student_id in args.student:
+            plan = service.plan_student_modules(student_id, as_of)
+            status = "on_track" if not plan.off_track else "planned" if plan.feasible else "unreachable"
+            writer.writerow((student_id, status, plan.missing_ects, plan.planned_ects, " ".join(m.module_id for m in plan.modules)))
+    return 0
+
+def cmd_stats(database: Database, args: argparse.Namespace) -> int:
+    cursor = database.conn.cursor()
+    for table in ("program", "student", "module", "enrollment", "student_goals", "change_log"):
+        (count,) = cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        print(f"{table:<16} {count:>12}")
+    if database.archive_attached:
+        print(f"{'archived':<16} {ArchiveRepository(database=database).count():>12}")
+    (page_size,) = cursor.execute("PRAGMA page_size").fetchone()
+    (page_count,) = cursor.execute("PRAGMA page_count").fetchone()
+    (freelist,) = cursor.execute("PRAGMA freelist_count").fetchone()
+    print(f"{'pages':<16} {page_count:>12}  ({page_count * page_size / 1e6:.1f} MB, {freelist} free)")
+    return 0
+
+COMMANDS = {
+    "evaluate": cmd_evaluate,
+    "import": cmd_import,
+    "export": cmd_export,
+    "vacuum": cmd_vacuum,
+    "analyze": cmd_analyze,
+    "changes": cmd_changes,
+    "maintain": cmd_maintain,
+    "backup": cmd_backup,
+    "restore": cmd_restore,
+    "verify": cmd_verify,
+    "stats": cmd_stats,
+    "archive": cmd_archive,
+    "unarchive": cmd_unarchive,
+    "plan": cmd_plan,
+}
+
+# Commands working on the database file itself or moving rows between files; not available with --in-memory
+FILE_COMMANDS = {"vacuum", "maintain", "backup", "restore", "archive", "unarchive"}
+
+# Commands that attach the default archive file (see archive_path_for) unless --archive is given
+ARCHIVE_COMMANDS = {"archive", "unarchive"}
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m dashboard", description="Dashboard batch operations (headless)")
+    parser.add_argument("--db", default="dashboard.db", help="database file (default: dashboard.db)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress (INFO)")
+    parser.add_argument("--ordinal-dates", action="store_true", help="store written dates as day ordinals")
+    parser.add_argument("--in-memory", action="store_true", help="work on an in-memory copy, written back on exit")
+    parser.add_argument("--archive", metavar="FILE", help="archive of finished students to attach (default for archive/unarchive: <db>.archive.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("evaluate", help="evaluate goal statuses")
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument("--all", action="store_true", help="all students")
+    target.add_argument("--student", action="append", metavar="ID", help="one student (repeatable)")
+    p.add_argument("--workers", type=int, default=1, help="worker processes (default: 1 = in process)")
+    p.add_argument("--chunk-size", type=int, default=500, help="students per shard")
+    p.add_argument("--stream", action="store_true", help="write results shard by shard instead of collecting them")
+    p.add_argument("--as-of", help="evaluation date YYYY-MM-DD (default: today)")
+    p.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+    p.add_argument("--no-cache", action="store_true", help="evaluate every student instead of reusing cached results")
+    p.add_argument("--include-archived", action="store_true", help="with --student: also look up archived students (needs --archive)")
+
+    p = sub.add_parser("import", help="import rows from a CSV file with header")
+    p.add_argument("kind", choices=tuple(EXPORTS))
+    p.add_argument("file")
+
+    p = sub.add_parser("export", help="export a table as CSV")
+    p.add_argument("kind", choices=tuple(EXPORTS))
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+
+    sub.add_parser("vacuum", help="rebuild the database file")
+    sub.add_parser("analyze", help="update the query planner statistics")
+    p = sub.add_parser("changes", help="change log entries after a sequence number as CSV")
+    p.add_argument("--since", type=int, default=0, help="last sequence number already processed")
+    p.add_argument("--limit", type=int, help="maximum number of entries")
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+
+    p = sub.add_parser("maintain", help="ANALYZE, incremental vacuum and integrity check")
+    p.add_argument("--no-check", action="store_true", help="skip the integrity check (quick_check)")
+    p.add_argument("--convert-auto-vacuum", action="store_true",
+                   help="switch an older database to incremental auto-vacuum (full VACUUM, stop other instances first)")
+    p = sub.add_parser("backup", help="online backup into a timestamped file")
+    p.add_argument("--dir", default="backups", help="target directory (default: backups)")
+    p.add_argument("--pages", type=int, default=256, help="pages copied per step")
+    p.add_argument("--compress", action="store_true", help="gzip the backup")
+
+    p = sub.add_parser("restore", help="verify a backup and restore it into the database")
+    p.add_argument("backup")
+    p.add_argument("--no-verify", action="store_true", help="skip the integrity check of the backup")
+
+    p = sub.add_parser("verify", help="integrity check of a backup")
+    p.add_argument("backup")
+
+    sub.add_parser("stats", help="row counts and file size")
+
+    p = sub.add_parser("archive", help="move students with a completed degree into the archive")
+    p.add_argument("--quiet-days", type=int, default=60, help="days without exams or changes before a student is archived")
+    p.add_argument("--dry-run", action="store_true", help="only list the students that would be archived")
+    p = sub.add_parser("unarchive", help="move an archived student back, e.g. to correct data")
+    p.add_argument("student", metavar="ID")
+
+    p = sub.add_parser("plan", help="modules that bring deadline and pace goals back to GREEN")
+    p.add_argument("student", metavar="ID", nargs="+")
+    p.add_argument("--as-of", help="evaluation date YYYY-MM-DD (default: today)")
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.in_memory and args.command in FILE_COMMANDS:
+        parser.error(f"{args.command} works on the database file and cannot be combined with --in-memory")
+    if args.archive is None and args.command in ARCHIVE_COMMANDS:
+        args.archive = archive_path_for(args.db)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        stream=sys.stderr,
+    )
+
+    database = Database(
+        db_path=args.db,
+        ordinal_dates=args.ordinal_dates,
+        in_memory=args.in_memory,
+        persist_interval=None,
+        archive_path=args.archive,
+    )
+    database.connect()
+    try:
+        database.init_db()
+        load_goal_rules(GoalRuleRepository(database=database))
+        return COMMANDS[args.command](database, args)
+    except (ValueError, OSError) as e:
+        logging.error(f"{args.command} failed: {e}")
+        return 1
+    except ConcurrentModificationError as e:
+        logging.error(f"{args.command} failed, the data was changed concurrently: {e}")
+        return 1
+    except sqlite3.Error as e:
+        logging.error(f"{args.command} failed, database error: {e}")
+        return 1
+    finally:
+        database.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,200 @@
 # database.py
 import sqlite3
 import logging
-from typing import Optional
-from dataclasses import dataclass
+import os
+import pathlib
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, TypeVar
+from dataclasses import dataclass, field
+
+from model import DEFAULT_PROGRAM
+
+T = TypeVar("T")
+
+# Raised by a compare-and-swap write when the row was changed (by another dashboard instance)
+# since it was read: the stored version no longer matches the expected one.
+class ConcurrentModificationError(RuntimeError):
+    def __init__(self, table: str, key: tuple, expected_version: Optional[int]) -> None:
+        super().__init__(
+            f"{table} {' / '.join(map(str, key))} was modified concurrently (expected version {expected_version})"
+        )
+        self.table = table
+        self.key = key
+        self.expected_version = expected_version
+
+# Default archive file next to the database: dashboard.db -> dashboard.archive.db
+def archive_path_for(db_path: str) -> str:
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.archive{ext or '.db'}"
+
+# Make a rename in the directory durable (POSIX; not supported on Windows).
+def _fsync_directory(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+# Lock contention between instances sharing the database file ("database is locked"/"busy").
+def is_busy_error(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
 
 @dataclass
 # Database class responsible for managing the SQLite connection and initializing the database schema.
 class Database:
     db_path: str = "dashboard.db"
     conn: Optional[sqlite3.Connection] = None
+    # Read-only connections are used by worker processes; they cannot modify the file by accident.
+    read_only: bool = False
+    # Seconds SQLite waits for a lock held by another connection before reporting "database is locked"
+    busy_timeout: float = 5.0
+    # Retries of a write that still failed with a lock error, with exponential backoff (seconds)
+    retry_attempts: int = 3
+    retry_backoff: float = 0.05
+    # Store dates written by the repositories as integer day ordinals instead of ISO strings
+    # (see parsing.py); readers accept both, so rows of either format can be mixed in one file.
+    ordinal_dates: bool = False
+    # In-memory mode: connect() loads the file at db_path into RAM and all reads and writes are
+    # served from there; changes are written back to the file every persist_interval seconds (None:
+    # only on close) and on close(). Meant for a single instance (demos, tests, batch jobs): other
+    # processes only see the state of the last persist.
+    in_memory: bool = False
+    persist_interval: Optional[float] = 30.0
+    # Archive of finished students (see ArchiveRepository), attached as schema `archive`; None
+    # disables archiving. Moves between the files are atomic in rollback journal mode (SQLite uses
+    # a super-journal); in WAL mode each file commits on its own.
+    archive_path: Optional[str] = None
+    _transaction_depth: int = field(default=0, init=False, repr=False)
+    _after_commit: List[Callable[[], None]] = field(default_factory=list, init=False, repr=False)
+    _persisted_changes: int = field(default=0, init=False, repr=False)
+    _persist_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _persist_stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _persist_thread: Optional[threading.Thread] = field(default=None, init=False, repr=False)
+    _archive_attached: bool = field(default=False, init=False, repr=False)
 
     def connect(self) -> None:
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            if self.in_memory:
+                self.conn = self._load_into_memory()
+            elif self.read_only:
+                uri = pathlib.Path(self.db_path).resolve().as_uri() + "?mode=ro"
+                self.conn = sqlite3.connect(uri, uri=True, timeout=self.busy_timeout)
+            else:
+                self.conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
             self.conn.execute("PRAGMA foreign_keys = ON;")
+            if self.archive_path is not None:
+                self._attach_archive()
         except sqlite3.Error as e:
             logging.error(f"Database connection error: {e}.")
             self.conn = None
             raise
         else:
             logging.info("Database connected successfully.")
+            if self.in_memory and self.persist_interval is not None:
+                self._persist_stop.clear()
+                self._persist_thread = threading.Thread(target=self._persist_loop, name="db-persist", daemon=True)
+                self._persist_thread.start()
+
+    # Copy the file at db_path (if it exists) into a new in-memory database with the backup API.
+    # The connection is shared with the persist thread, hence check_same_thread=False.
+    def _load_into_memory(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        if self.db_path != ":memory:" and os.path.exists(self.db_path):
+            started = time.perf_counter()
+            source = sqlite3.connect(pathlib.Path(self.db_path).resolve().as_uri() + "?mode=ro", uri=True, timeout=self.busy_timeout)
+            try:
+                source.backup(conn)
+            finally:
+                source.close()
+            logging.info(f"Database {self.db_path} loaded into memory in {time.perf_counter() - started:.2f}s.")
+        self._persisted_changes = conn.total_changes
+        return conn
+
+    # Attach the archive file; a read-only connection attaches it read-only, and only if it exists.
+    def _attach_archive(self) -> None:
+        if self.read_only:
+            if not os.path.exists(self.archive_path):
+                return
+            target = pathlib.Path(self.archive_path).resolve().as_uri() + "?mode=ro"
+        else:
+            target = self.archive_path
+        self.conn.execute("ATTACH DATABASE ? AS archive", (target,))
+        self._archive_attached = True
+
+    @property
+    def archive_attached(self) -> bool:
+        return self.conn is not None and self._archive_attached
+
+    # Write the in-memory database to db_path if it changed since the last persist; returns True
+    # if the file was written. The live connection is only held for a copy into a second in-memory
+    # database, which is then written to a temporary file next to db_path, synced and atomically
+    # renamed over it, so a crash leaves either the previous or the new file. No-op for file-backed
+    # databases. The backup waits for open write transactions of the connection to end, so with a
+    # transaction open the persist thread skips the round and any other caller gets a RuntimeError
+    # instead of waiting for itself.
+    def persist(self) -> bool:
+        if not self.in_memory or self.db_path == ":memory:":
+            return False
+        if self.conn is None:
+            raise RuntimeError("Database not connected.")
+        with self._persist_lock:
+            if self.conn.in_transaction:
+                if threading.current_thread() is self._persist_thread:
+                    logging.debug("Persist skipped, a transaction is open.")
+                    return False
+                raise RuntimeError("Cannot persist the in-memory database while a transaction is open.")
+            changes = self.conn.total_changes
+            if changes == self._persisted_changes and os.path.exists(self.db_path):
+                return False
+            started = time.perf_counter()
+            # One backup step: consistent, and never runs while a write transaction is open (it is
+            # retried after `sleep` seconds instead of the default 250 ms)
+            copy = sqlite3.connect(":memory:")
+            try:
+                self.conn.backup(copy, sleep=0.001)
+                copied = time.perf_counter()
+                directory = os.path.dirname(os.path.abspath(self.db_path))
+                fd, tmp_path = tempfile.mkstemp(prefix=".persist-", suffix=".db", dir=directory)
+                os.close(fd)
+                try:
+                    target = sqlite3.connect(tmp_path)
+                    try:
+                        copy.backup(target)
+                    finally:
+                        target.close()
+                    with open(tmp_path, "rb+") as fh:
+                        os.fsync(fh.fileno())
+                    os.replace(tmp_path, self.db_path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+            finally:
+                copy.close()
+            _fsync_directory(directory)
+            self._persisted_changes = changes
+        logging.info(
+            f"In-memory database persisted to {self.db_path} in {time.perf_counter() - started:.2f}s "
+            f"(connection held {copied - started:.3f}s)."
+        )
+        return True
+
+    def _persist_loop(self) -> None:
+        while not self._persist_stop.wait(self.persist_interval):
+            try:
+                self.persist()
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"Persisting the in-memory database failed: {e}.")
 
     def init_db(self) -> None:
         if self.conn is None:
@@ -27,19 +202,43 @@ class Database:
 
         cursor = self.conn.cursor()
 
+        # Free pages can be returned to the file system in small steps (see maintenance.py). Takes
+        # effect for new database files; existing files are converted by the next maintenance run.
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS program (
+                program_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                total_ects INTEGER NOT NULL CHECK (total_ects >= 0),
+                duration_months INTEGER NOT NULL CHECK (duration_months > 0)
+            )
+        """)
+
+        # Default study program; students without an explicit program link are evaluated against it.
+        cursor.execute(
+            "INSERT OR IGNORE INTO program (program_id, name, total_ects, duration_months) VALUES (?, ?, ?, ?)",
+            (DEFAULT_PROGRAM.program_id, DEFAULT_PROGRAM.name, DEFAULT_PROGRAM.total_ects, DEFAULT_PROGRAM.duration_months),
+        )
+
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS student (
                 student_id TEXT PRIMARY KEY,
                 name TEXT NOT NULL,
-                start_date TEXT NOT NULL
+                start_date TEXT NOT NULL,
+                program_id TEXT REFERENCES program(program_id) ON DELETE SET NULL,
+                version INTEGER NOT NULL DEFAULT 1
             )
         """)
+        # Databases created before multi-program support lack the program link.
+        self._ensure_column(cursor, "student", "program_id", "TEXT REFERENCES program(program_id) ON DELETE SET NULL")
 
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS module (
                 module_id TEXT PRIMARY KEY,
                 title TEXT NOT NULL,
-                ects INTEGER NOT NULL CHECK (ects >= 0)
+                ects INTEGER NOT NULL CHECK (ects >= 0),
+                version INTEGER NOT NULL DEFAULT 1
             )
         """)
 
@@ -49,12 +248,24 @@ class Database:
                 module_id TEXT NOT NULL,
                 grade REAL,
                 date_passed TEXT,
+                version INTEGER NOT NULL DEFAULT 1,
                 PRIMARY KEY (student_id, module_id),
                 FOREIGN KEY (student_id) REFERENCES student(student_id) ON DELETE CASCADE,
                 FOREIGN KEY (module_id) REFERENCES module(module_id) ON DELETE CASCADE
             )
         """)
 
+        # Row versions for compare-and-swap updates (see ConcurrentModificationError); databases
+        # created before optimistic concurrency start every row at version 1.
+        for table in ("student", "module", "enrollment"):
+            self._ensure_column(cursor, table, "version", "INTEGER NOT NULL DEFAULT 1")
+
+        # Covering index for module-centric lookups (who is enrolled in X, pass rate of X)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_enrollment_module
+            ON enrollment (module_id, student_id, grade, date_passed)
+        """)
+
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS student_goals (
                 student_id TEXT NOT NULL,
@@ -65,9 +276,183 @@ class Database:
             )
         """)
 
+        # Append-only change log written by the repositories in the same transaction as the change;
+        # seq increases monotonically (AUTOINCREMENT never reuses values), see ChangeLogRepository.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity TEXT NOT NULL CHECK (entity IN ('student', 'module', 'enrollment', 'goals')),
+                student_id TEXT,
+                module_id TEXT,
+                version INTEGER,
+                changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+            )
+        """)
+
+        # Persistent goal evaluation results per student and evaluation month (YYYY-MM), valid while
+        # input_hash matches the hash of the current evaluation inputs (see evaluation_cache.py).
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS evaluation_cache (
+                student_id TEXT NOT NULL,
+                month TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (student_id, month),
+                FOREIGN KEY (student_id) REFERENCES student(student_id) ON DELETE CASCADE
+            )
+        """)
+
+        # Archived students: the student row plus its enrollments (with the module data at the time of
+        # archiving) and goals as one zlib-compressed JSON payload (see ArchiveRepository).
+        if self._archive_attached:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS archive.archived_student (
+                    student_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    start_date TEXT NOT NULL,
+                    program_id TEXT,
+                    archived_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+                    payload BLOB NOT NULL
+                )
+            """)
+
+        # Threshold rules of the goal types (see goal_engine.py); seeded with the defaults of the goal classes.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS goal_rule (
+                goal_type TEXT PRIMARY KEY,
+                higher_is_better INTEGER NOT NULL CHECK (higher_is_better IN (0, 1))
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS goal_threshold (
+                goal_type TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                status TEXT NOT NULL CHECK (status IN ('GREEN', 'YELLOW', 'RED')),
+                mode TEXT NOT NULL CHECK (mode IN ('offset', 'factor')),
+                param REAL NOT NULL,
+                PRIMARY KEY (goal_type, position),
+                FOREIGN KEY (goal_type) REFERENCES goal_rule(goal_type) ON DELETE CASCADE
+            )
+        """)
+
         self.conn.commit()
 
+    # Group several repository writes into one transaction. Repositories call commit(), which is
+    # deferred while a transaction is open; the outermost block commits, or rolls back on error.
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        if self.conn is None:
+            raise RuntimeError("Database not connected.")
+        self._transaction_depth += 1
+        outermost = self._transaction_depth == 1
+        try:
+            yield
+            if outermost:
+                self.conn.commit()
+        except BaseException:
+            if outermost:
+                self.conn.rollback()
+                self._after_commit.clear()
+            raise
+        finally:
+            self._transaction_depth -= 1
+        if outermost:
+            self._run_after_commit()
+
+    # Run a write operation (which commits itself or opens a transaction()) and retry it with
+    # exponential backoff while another connection holds the lock. Inside an enclosing transaction
+    # the operation runs once; the owner of the outermost transaction decides about retries.
+    def run_with_retry(self, operation: Callable[[], T]) -> T:
+        if self.conn is None:
+            raise RuntimeError("Database not connected.")
+        if self._transaction_depth > 0:
+            return operation()
+        attempt = 0
+        while True:
+            try:
+                return operation()
+            except sqlite3.OperationalError as e:
+                self.conn.rollback()
+                if attempt >= self.retry_attempts or not is_busy_error(e):
+                    raise
+                delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                attempt += 1
+                logging.warning(f"Database busy, retry {attempt}/{self.retry_attempts} in {delay:.3f}s: {e}.")
+                time.sleep(delay)
+            except BaseException:
+                # e.g. a failed compare-and-swap: release the write lock of the open statement
+                self.conn.rollback()
+                raise
+
+    # Register a callback to run once the current write is committed (immediately outside a
+    # transaction). Callbacks of a rolled back transaction are discarded.
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        if self._transaction_depth == 0:
+            callback()
+        else:
+            self._after_commit.append(callback)
+
+    def _run_after_commit(self) -> None:
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    # Commit the current write unless it is part of an enclosing transaction().
+    def commit(self) -> None:
+        if self.conn is None:
+            raise RuntimeError("Database not connected.")
+        if self._transaction_depth == 0:
+            self.conn.commit()
+
+    # Read the file change counter from the SQLite header (offset 24). SQLite increments it on every
+    # committed write in rollback journal mode, so it identifies a data version across processes.
+    # Returns None for in-memory databases and WAL mode, where the counter is not maintained.
+    def change_counter(self) -> Optional[int]:
+        if self.conn is None:
+            raise RuntimeError("Database not connected.")
+        if self.db_path == ":memory:" or self.in_memory:
+            return None
+        (journal_mode,) = self.conn.execute("PRAGMA journal_mode").fetchone()
+        if str(journal_mode).lower() == "wal":
+            return None
+        try:
+            with open(self.db_path, "rb") as fh:
+                fh.seek(24)
+                return int.from_bytes(fh.read(4), "big")
+        except OSError as e:
+            logging.error(f"Could not read database header: {e}.")
+            return None
+
+    # PRAGMA data_version changes whenever another connection (e.g. a second dashboard instance on
+    # the shared file) committed a change; own commits leave it unchanged. A cheap external-change probe.
+    def data_version(self) -> int:
+        if self.conn is None:
+            raise RuntimeError("Database not connected.")
+        (version,) = self.conn.execute("PRAGMA data_version").fetchone()
+        return int(version)
+
+    # Add a column to an existing table if it is missing (lightweight schema migration).
+    def _ensure_column(self, cursor: sqlite3.Cursor, table: str, column: str, definition: str) -> None:
+        columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            logging.info(f"Column {table}.{column} added.")
+
     def close(self) -> None:
+        if self._persist_thread is not None:
+            self._persist_stop.set()
+            self._persist_thread.join()
+            self._persist_thread = None
+        if self.conn is not None and self.in_memory:
+            try:
+                # Closing discards uncommitted changes anyway; roll them back so the backup can run
+                if self.conn.in_transaction:
+                    logging.warning("Uncommitted changes rolled back on close.")
+                    self.conn.rollback()
+                self.persist()
+            except (sqlite3.Error, OSError, RuntimeError) as e:
+                logging.error(f"Persisting the in-memory database failed, changes are lost: {e}.")
         if self.conn is not None:
             try:
                 self.conn.close()
@@ -75,4 +460,5 @@ class Database:
                 logging.error(f"Error closing database: {e}.")
             else:
                 self.conn = None
+                self._archive_attached = False
                 logging.info("Database connection closed.")
@@ -0,0 +1,174 @@
+# datagen.py
+# Deterministic synthetic data generator for load testing. Writes students, a module catalogue,
+# enrollments (grades and passed dates) and goals straight into the schema of database.py.
+# Usage: python datagen.py --db load.db --students 40000 --modules 300 --enrollments 25 --seed 42
+
+import argparse
+import datetime
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from database import Database
+
+FIRST_NAMES = ("Anna", "Ben", "Clara", "David", "Emma", "Felix", "Greta", "Hannah", "Jonas", "Lea",
+               "Lukas", "Marie", "Noah", "Paul", "Sophie", "Tim", "Lena", "Elias", "Mia", "Finn")
+LAST_NAMES = ("Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker",
+              "Schulz", "Hoffmann", "Koch", "Richter", "Klein", "Wolf", "Neumann", "Schwarz")
+SUBJECTS = ("Mathematik", "Statistik", "Programmierung", "Datenbanken", "Machine Learning", "BWL",
+            "Projektmanagement", "Algorithmen", "Netzwerke", "Software Engineering", "Ethik", "Cloud")
+# German grade scale with a bell-shaped distribution around 2.3; 5.0 = failed
+GRADES = (1.0, 1.3, 1.7, 2.0, 2.3, 2.7, 3.0, 3.3, 3.7, 4.0, 5.0)
+GRADE_WEIGHTS = (4, 6, 9, 12, 14, 13, 11, 9, 7, 5, 4)
+# Synthetic programs in addition to the default program seeded by init_db (program_id, name, ECTS, months)
+PROGRAMS = (("AKI", None, None, None), ("SYN-INF", "Informatik (synthetisch)", 180, 36), ("SYN-DS", "Data Science (synthetisch)", 210, 48))
+
+# Students per insert chunk
+CHUNK_STUDENTS = 5000
+
+@dataclass(frozen=True)
+# Sizing of a generated dataset
+class DatasetSize:
+    students: int = 10000
+    modules: int = 200
+    enrollments_per_student: int = 25
+
+# Generate a dataset into an initialized database. Existing rows with the same keys are replaced.
+# Returns the number of generated rows per table.
+def generate_dataset(database: Database, size: DatasetSize, seed: int = 42, as_of: datetime.date = datetime.date(2026, 1, 1)) -> dict[str, int]:
+    if database.conn is None:
+        raise RuntimeError("Database not connected")
+    rng = random.Random(seed)
+    conn = database.conn
+    started = time.perf_counter()
+
+    module_rows = [
+        (f"SYN{i:05d}", f"{SUBJECTS[i % len(SUBJECTS)]} {i // len(SUBJECTS) + 1}", rng.choice((5, 5, 5, 10, 10, 15)))
+        for i in range(size.modules)
+    ]
+    per_student = min(size.enrollments_per_student, len(module_rows))
+
+    # Bulk load: no fsync per statement, in-memory journal, no per-row foreign key checks (the rows
+    # are consistent by construction) and the secondary index is rebuilt once afterwards.
+    conn.execute("PRAGMA foreign_keys = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("DROP INDEX IF EXISTS idx_enrollment_module")
+    counts: dict[str, int] = {"module": len(module_rows), "student": size.students, "enrollment": 0, "student_goals": 0}
+    try:
+        with database.transaction():
+            conn.executemany(
+                "INSERT OR REPLACE INTO program (program_id, name, total_ects, duration_months) VALUES (?, ?, ?, ?)",
+                [p for p in PROGRAMS if p[1] is not None],
+            )
+            conn.executemany("INSERT OR REPLACE INTO module (module_id, title, ects) VALUES (?, ?, ?)", module_rows)
+            students = _students(rng, size.students, as_of)
+            conn.executemany(
+                "INSERT OR REPLACE INTO student (student_id, name, start_date, program_id) VALUES (?, ?, ?, ?)",
+                [(sid, name, _iso(start), program_id) for sid, name, start, program_id, _ in students],
+            )
+            # Enrollments and goals are generated and inserted in chunks to bound memory use.
+            for i in range(0, len(students), CHUNK_STUDENTS):
+                chunk = students[i:i + CHUNK_STUDENTS]
+                enrollments = _enrollments(rng, chunk, module_rows, per_student, as_of)
+                goals = _goals(rng, chunk)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO enrollment (student_id, module_id, grade, date_passed) VALUES (?, ?, ?, ?)",
+                    enrollments,
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO student_goals (student_id, goal_type, value) VALUES (?, ?, ?)",
+                    goals,
+                )
+                counts["enrollment"] += len(enrollments)
+                counts["student_goals"] += len(goals)
+    finally:
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute("PRAGMA foreign_keys = ON")
+        database.init_db()
+
+    logging.info("Synthetic dataset generated in %.2fs: %s", time.perf_counter() - started, counts)
+    return counts
+
+# ISO strings of day ordinals; the generated dates come from a small domain, so they are memoized.
+_ISO_BY_ORDINAL: dict[int, str] = {}
+
+def _iso(ordinal: int) -> str:
+    iso = _ISO_BY_ORDINAL.get(ordinal)
+    if iso is None:
+        iso = _ISO_BY_ORDINAL[ordinal] = datetime.date.fromordinal(ordinal).isoformat()
+    return iso
+
+# Students: (student_id, name, start date ordinal, program_id, pace factor)
+def _students(rng: random.Random, count: int, as_of: datetime.date) -> List[Tuple[str, str, int, str, float]]:
+    first_start = as_of - datetime.timedelta(days=5 * 365)
+    # Study starts on the first of a month
+    starts = sorted({(first_start + datetime.timedelta(days=d)).replace(day=1).toordinal() for d in range(5 * 365)})
+    program_ids = [p[0] for p in PROGRAMS]
+    return [
+        (
+            f"SYN{i:08d}",
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            rng.choice(starts),
+            rng.choice(program_ids),
+            rng.uniform(0.4, 1.6),
+        )
+        for i in range(count)
+    ]
+
+# Enrollments in sorted module order (cheap primary key inserts). Passed modules get a grade and
+# a date between the start date and as_of, depending on the student's pace; the rest is in progress
+# or failed.
+def _enrollments(rng: random.Random, students, module_rows: List[tuple], per_student: int, as_of: datetime.date) -> List[tuple]:
+    module_ids = sorted(m[0] for m in module_rows)
+    module_count = len(module_ids)
+    as_of_ordinal = as_of.toordinal()
+    random_ = rng.random
+    out: List[tuple] = []
+    append = out.append
+    for sid, _, start, _, pace in students:
+        span = max(1, as_of_ordinal - start)
+        pass_probability = min(0.95, 0.6 * pace)
+        k = rng.randint(max(1, per_student // 2), per_student) if per_student else 0
+        grades = rng.choices(GRADES, GRADE_WEIGHTS, k=k)
+        for index, grade in zip(sorted(rng.sample(range(module_count), k)), grades):
+            if random_() > pass_probability:
+                append((sid, module_ids[index], None, None))
+            elif grade >= 5.0:
+                append((sid, module_ids[index], grade, None))
+            else:
+                append((sid, module_ids[index], grade, _iso(start + int(random_() * span))))
+    return out
+
+# Goals: each student gets the three built-in goal types with varied targets.
+def _goals(rng: random.Random, students) -> List[tuple]:
+    out: List[tuple] = []
+    for sid, *_ in students:
+        out.append((sid, "GradeAverageGoal", rng.choice((1.5, 2.0, 2.3, 2.5, 3.0))))
+        out.append((sid, "DeadlineGoal", rng.choice((36, 42, 48, 60))))
+        out.append((sid, "CpPaceGoal", rng.choice((3.0, 3.75, 4.0, 5.0))))
+    return out
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset")
+    parser.add_argument("--db", default="loadtest.db")
+    parser.add_argument("--students", type=int, default=DatasetSize.students)
+    parser.add_argument("--modules", type=int, default=DatasetSize.modules)
+    parser.add_argument("--enrollments", type=int, default=DatasetSize.enrollments_per_student, help="max. enrollments per student")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    database = Database(db_path=args.db)
+    database.connect()
+    database.init_db()
+    try:
+        generate_dataset(database, DatasetSize(args.students, args.modules, args.enrollments), seed=args.seed)
+    finally:
+        database.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+# differential.py
+# Differential test harness for the optimized evaluation paths. Random cohorts (reproducible by
+# seed, with the edge cases the goals have to handle: no grades, nothing passed, start dates after
+# the evaluation date, leap days, programs and modules with 0 ECTS, random threshold rules) are
+# evaluated with the reference logic and with every optimized path; each difference is reported.
+#
+# Reference: the per-metric methods of Student and the threshold rules interpreted band by band.
+# Optimized paths: StudentMetrics (memoized), batch loading, the evaluation cache, the snapshot,
+# the process pool, the SQL analytics and the archive. A performance smoke test times the paths
+# on a larger cohort, so correctness and speed are checked in one run.
+# Usage: python differential.py [--seed 1] [--rounds 5] [--students 200] [--workers 2]; see --help.
+
+import argparse
+import datetime
+import gc
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Optional
+
+from database import Database
+from repositories import (
+    StudentRepository,
+    ModuleRepository,
+    EnrollmentRepository,
+    ProgramRepository,
+    GoalRuleRepository,
+    EvaluationCacheRepository,
+    ArchiveRepository,
+)
+from evaluation_cache import EvaluationCache
+from services import DashboardService
+from analytics import CohortAnalyticsService
+from snapshot import open_snapshot, write_snapshot
+from goal_engine import GOAL_REGISTRY, GoalRule, load_goal_rules
+from parsing import format_db_date
+from model import (
+    Student,
+    Module,
+    Enrollment,
+    StudyProgram,
+    DEFAULT_PROGRAM,
+    Goal,
+    GoalEvaluation,
+    EvaluationCriterion,
+    Status,
+    ThresholdBand,
+    GradeAverageGoal,
+    DeadlineGoal,
+    CpPaceGoal,
+)
+
+# Tolerance for float results; paths that sum in a different order (SQL) differ in the last bits
+REL_TOL = 1e-9
+ABS_TOL = 1e-9
+
+# German grade scale including the failed grade
+GRADES = (1.0, 1.3, 1.7, 2.0, 2.3, 2.7, 3.0, 3.3, 3.7, 4.0, 5.0)
+
+@dataclass(frozen=True)
+# One difference between the reference and an optimized path.
+class Divergence:
+    path: str
+    student_id: str
+    detail: str
+
+# A generated cohort: programs (the first one is the service's default program), modules and
+# student aggregates, evaluated as of `as_of`.
+@dataclass
+class Case:
+    seed: int
+    as_of: datetime.date
+    programs: List[StudyProgram]
+    modules: List[Module]
+    students: List[Student]
+    rules: List[GoalRule] = field(default_factory=list)
+
+    def program_of(self, student: Student) -> StudyProgram:
+        by_id = {p.program_id: p for p in self.programs}
+        return by_id.get(student.program_id or "", self.programs[0])
+
+# --- Reference logic ---
+
+# Classify a value by reading the rule's bands one by one (independent of compile_classifier).
+def reference_status(rule: GoalRule, actual: float, target: float) -> Status:
+    def meets(threshold: float) -> bool:
+        return actual >= threshold if rule.higher_is_better else actual <= threshold
+
+    if meets(target):
+        return Status.GREEN
+    for band in rule.bands:
+        threshold = target * band.param if band.mode == "factor" else target + band.param
+        if meets(threshold):
+            return band.status
+    return Status.RED
+
+# Evaluate a student's goals with the per-metric reference methods of Student.
+def reference_evaluations(student: Student, program: StudyProgram, as_of: datetime.date) -> List[GoalEvaluation]:
+    rules = {rule.goal_type: rule for rule in GOAL_REGISTRY.rules()}
+    out: List[GoalEvaluation] = []
+    for goal in student.goals:
+        rule = rules[goal.goal_type]
+        if isinstance(goal, GradeAverageGoal):
+            avg = student.get_average_grade()
+            out.append(GoalEvaluation(
+                title=goal.get_title(),
+                status=reference_status(rule, avg, goal.target_avg),
+                criteria=[EvaluationCriterion(name="Aktuell", value=avg, target=goal.target_avg)],
+                ui_type="big_text",
+                ui_data={"actual": avg, "target": goal.target_avg},
+            ))
+        elif isinstance(goal, DeadlineGoal):
+            time_percent = student.get_time_progress_percentage(goal.duration_months, as_of)
+            cp_percent = student.get_cp_progress_percentage(program.total_ects)
+            out.append(GoalEvaluation(
+                title=goal.get_title(),
+                status=reference_status(rule, cp_percent - time_percent, 0.0),
+                criteria=[
+                    EvaluationCriterion(name="Zeitfortschritt (%)", value=time_percent, target=100.0),
+                    EvaluationCriterion(name="CP-Fortschritt (%)", value=cp_percent, target=100.0),
+                ],
+                ui_type="dual_progress",
+                ui_data={"time_percent": time_percent, "cp_percent": cp_percent},
+            ))
+        elif isinstance(goal, CpPaceGoal):
+            pace = student.get_cp_per_month(as_of)
+            status = reference_status(rule, pace, goal.target_cp_per_month)
+            out.append(GoalEvaluation(
+                title=goal.get_title(),
+                status=status,
+                criteria=[EvaluationCriterion(name="Ist-Pace", value=pace, target=goal.target_cp_per_month)],
+                ui_type="arrow",
+                ui_data={"arrow": {Status.GREEN: "↑", Status.YELLOW: "→", Status.RED: "↓"}[status], "actual": pace, "target": goal.target_cp_per_month},
+            ))
+        else:
+            raise ValueError(f"No reference for goal type {goal.goal_type}")
+    return out
+
+# --- Comparison ---
+
+def _close(a: object, b: object) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return isinstance(a, (int, float)) and isinstance(b, (int, float)) and math.isclose(a, b, rel_tol=REL_TOL, abs_tol=ABS_TOL)
+    return a == b
+
+# Describe the first difference between two evaluation lists, or return None if they agree.
+def evaluation_difference(expected: List[GoalEvaluation], actual: List[GoalEvaluation]) -> Optional[str]:
+    if len(expected) != len(actual):
+        return f"{len(expected)} evaluations expected, got {len(actual)}"
+    for e, a in zip(expected, actual):
+        if (e.title, e.status, e.ui_type) != (a.title, a.status, a.ui_type):
+            return f"{e.title}: expected {e.status.value}/{e.ui_type}, got {a.title} {a.status.value}/{a.ui_type}"
+        if len(e.criteria) != len(a.criteria):
+            return f"{e.title}: criteria differ: {e.criteria} != {a.criteria}"
+        for ec, ac in zip(e.criteria, a.criteria):
+            if ec.name != ac.name or not _close(ec.value, ac.value) or not _close(ec.target, ac.target):
+                return f"{e.title}: criterion {ec} != {ac}"
+        if e.ui_data.keys() != a.ui_data.keys() or not all(_close(e.ui_data[k], a.ui_data[k]) for k in e.ui_data):
+            return f"{e.title}: ui_data {e.ui_data} != {a.ui_data}"
+    return None
+
+def compare(path: str, expected: dict[str, List[GoalEvaluation]], actual: dict[str, List[GoalEvaluation]]) -> List[Divergence]:
+    out: List[Divergence] = []
+    for student_id in sorted(expected.keys() | actual.keys()):
+        if student_id not in actual:
+            out.append(Divergence(path, student_id, "missing from the result"))
+        elif student_id not in expected:
+            out.append(Divergence(path, student_id, "not expected in the result"))
+        else:
+            detail = evaluation_difference(expected[student_id], actual[student_id])
+            if detail is not None:
+                out.append(Divergence(path, student_id, detail))
+    return out
+
+# --- Generation ---
+
+def _random_date(rng: random.Random, first: datetime.date, last: datetime.date) -> datetime.date:
+    day = rng.randint(first.toordinal(), last.toordinal())
+    # Month ends and leap days are where month arithmetic goes wrong
+    roll = rng.random()
+    if roll < 0.05:
+        year = rng.choice((2016, 2020, 2024))
+        return datetime.date(year, 2, 29)
+    if roll < 0.15:
+        date = datetime.date.fromordinal(day)
+        return (date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1)
+    return datetime.date.fromordinal(day)
+
+def _random_rules(rng: random.Random) -> List[GoalRule]:
+    rules = []
+    for goal_cls in (GradeAverageGoal, DeadlineGoal, CpPaceGoal):
+        bands = []
+        for status in rng.sample((Status.YELLOW, Status.RED), rng.randint(0, 2)):
+            if rng.random() < 0.5:
+                bands.append(ThresholdBand(status, "offset", rng.choice((-20.0, -10.0, -0.5, 0.0, 0.3, 0.5, 1.0))))
+            else:
+                bands.append(ThresholdBand(status, "factor", rng.choice((0.5, 0.8, 0.9, 1.1, 1.5))))
+        rules.append(GoalRule(goal_cls.goal_type, rng.random() < 0.5, tuple(bands)))
+    return rules
+
+# Generate a cohort. Enrollments are created in module_id order, the order the repositories
+# load them in, so float sums are comparable across paths.
+def generate_case(seed: int, students: int, random_rules: bool = True) -> Case:
+    rng = random.Random(seed)
+    as_of = _random_date(rng, datetime.date(2018, 1, 1), datetime.date(2030, 12, 31))
+    programs = [DEFAULT_PROGRAM]
+    for i in range(rng.randint(1, 3)):
+        programs.append(StudyProgram(name=f"Programm {i}", total_ects=rng.choice((0, 60, 180, 210)), duration_months=rng.randint(1, 60), program_id=f"P{i}"))
+    modules = [Module(module_id=f"M{i:03d}", title=f"Modul {i}", ects=rng.choice((0, 5, 5, 10, 15))) for i in range(rng.randint(1, 40))]
+
+    cohort: List[Student] = []
+    for i in range(students):
+        start = _random_date(rng, as_of - datetime.timedelta(days=3650), as_of + datetime.timedelta(days=90))
+        enrollments = []
+        for module in sorted(rng.sample(modules, rng.randint(0, min(len(modules), 20))), key=lambda m: m.module_id):
+            grade = rng.choice(GRADES) if rng.random() < 0.7 else None
+            passed = _random_date(rng, start, as_of) if rng.random() < 0.7 and start <= as_of else None
+            enrollments.append(Enrollment(module=module, grade=grade, date_passed=passed))
+        goals: List[Goal] = []
+        if rng.random() < 0.9:
+            goals.append(GradeAverageGoal(target_avg=rng.choice((1.0, 1.5, 2.0, 2.3, 2.5, 3.0, 4.0))))
+        if rng.random() < 0.9:
+            goals.append(DeadlineGoal(duration_months=rng.choice((0, 1, 12, 36, 48, 60))))
+        if rng.random() < 0.9:
+            goals.append(CpPaceGoal(target_cp_per_month=rng.choice((0.0, 1.0, 3.75, 5.0, 10.0))))
+        rng.shuffle(goals)
+        cohort.append(Student(
+            student_id=f"D{i:06d}",
+            name=f"Student {i}",
+            start_date=start,
+            enrollments=enrollments,
+            goals=goals,
+            program_id=rng.choice([None] + [p.program_id for p in programs]),
+        ))
+    rules = _random_rules(rng) if random_rules and rng.random() < 0.7 else GOAL_REGISTRY.default_rules()
+    return Case(seed=seed, as_of=as_of, programs=programs, modules=modules, students=cohort, rules=rules)
+
+# Write a case into an initialized database; dates are stored as ISO strings or day ordinals at random.
+def write_case(database: Database, case: Case) -> None:
+    rng = random.Random(case.seed)
+    with database.transaction():
+        cursor = database.conn.cursor()
+        cursor.executemany(
+            "INSERT OR REPLACE INTO program (program_id, name, total_ects, duration_months) VALUES (?, ?, ?, ?)",
+            [(p.program_id, p.name, p.total_ects, p.duration_months) for p in case.programs],
+        )
+        cursor.executemany("INSERT INTO module (module_id, title, ects) VALUES (?, ?, ?)", [(m.module_id, m.title, m.ects) for m in case.modules])
+        cursor.executemany(
+            "INSERT INTO student (student_id, name, start_date, program_id) VALUES (?, ?, ?, ?)",
+            [(s.student_id, s.name, format_db_date(s.start_date, rng.random() < 0.5), s.program_id) for s in case.students],
+        )
+        cursor.executemany(
+            "INSERT INTO enrollment (student_id, module_id, grade, date_passed) VALUES (?, ?, ?, ?)",
+            [(s.student_id, e.module.module_id, e.grade, format_db_date(e.date_passed, rng.random() < 0.5))
+             for s in case.students for e in s.enrollments],
+        )
+        cursor.executemany(
+            "INSERT INTO student_goals (student_id, goal_type, value) VALUES (?, ?, ?)",
+            [(s.student_id, g.goal_type, g.get_value()) for s in case.students for g in s.goals],
+        )
+    rules = GoalRuleRepository(database=database)
+    for rule in case.rules:
+        rules.upsert(rule)
+    load_goal_rules(rules)
+
+# Goals are stored sorted by goal type; the repositories load them in that order.
+def _stored_order(student: Student) -> Student:
+    return replace(student, goals=sorted(student.goals, key=lambda g: g.goal_type))
+
+def _service(database: Database, cache: bool = False) -> DashboardService:
+    return DashboardService(
+        student_repository=StudentRepository(database=database),
+        module_repository=ModuleRepository(database=database),
+        enrollment_repository=EnrollmentRepository(database=database),
+        program_repository=ProgramRepository(database=database),
+        evaluation_cache=EvaluationCache(EvaluationCacheRepository(database=database)) if cache else None,
+    )
+
+# --- Paths under test ---
+
+# In-memory paths: evaluate_all_goals (shared, memoized StudentMetrics) and the memo after an
+# evaluation at another date and after a change of the enrollments.
+def check_in_memory(case: Case) -> List[Divergence]:
+    out: List[Divergence] = []
+    other_day = case.as_of + datetime.timedelta(days=45)
+    for student in case.students:
+        program = case.program_of(student)
+        expected = reference_evaluations(student, program, case.as_of)
+        for path, actual in (
+            ("evaluate_all_goals", lambda s: s.evaluate_all_goals(program, case.as_of)),
+            ("memo after other date", lambda s: (s.evaluate_all_goals(program, other_day), s.evaluate_all_goals(program, case.as_of))[1]),
+        ):
+            detail = evaluation_difference(expected, actual(student))
+            if detail is not None:
+                out.append(Divergence(path, student.student_id, f"{detail} [{shrink(student, program, case.as_of, actual)!r}]"))
+        # Replacing the enrollments must invalidate the memoized metrics
+        changed = replace(student, enrollments=student.enrollments[:-1])
+        changed._metrics_cache = student._metrics_cache
+        detail = evaluation_difference(reference_evaluations(changed, program, case.as_of), changed.evaluate_all_goals(program, case.as_of))
+        if detail is not None:
+            out.append(Divergence("memo after enrollment change", student.student_id, detail))
+    return out
+
+# Reduce a diverging student to a minimal one (greedy removal of enrollments and goals).
+def shrink(student: Student, program: StudyProgram, as_of: datetime.date, path: Callable[[Student], List[GoalEvaluation]]) -> Student:
+    def diverges(candidate: Student) -> bool:
+        candidate = replace(candidate)
+        return evaluation_difference(reference_evaluations(candidate, program, as_of), path(candidate)) is not None
+
+    current = replace(student)
+    for attribute in ("enrollments", "goals"):
+        i = 0
+        while i < len(getattr(current, attribute)):
+            items = getattr(current, attribute)
+            candidate = replace(current, **{attribute: items[:i] + items[i + 1:]})
+            if diverges(candidate):
+                current = candidate
+            else:
+                i += 1
+    return current
+
+# Database paths: single aggregate, batch aggregates, evaluation cache (cold and warm), snapshot,
+# process pool, SQL analytics and archive. The database is a temporary file.
+def check_database(case: Case, workers: int) -> List[Divergence]:
+    out: List[Divergence] = []
+    with tempfile.TemporaryDirectory(prefix="differential-") as directory:
+        db_path = os.path.join(directory, "differential.db")
+        database = Database(db_path=db_path, archive_path=os.path.join(directory, "differential.archive.db"))
+        database.connect()
+        try:
+            database.init_db()
+            write_case(database, case)
+            expected = {s.student_id: reference_evaluations(_stored_order(s), case.program_of(s), case.as_of) for s in case.students}
+
+            service = _service(database)
+            single = {s.student_id: service.evaluate_students([service.get_student_aggregate(s.student_id)], case.as_of)[s.student_id] for s in case.students}
+            out += compare("get_student_aggregate", expected, single)
+            out += compare("list_aggregates", expected, service.evaluate_students(service.student_repository.list_aggregates(), case.as_of))
+
+            cached = _service(database, cache=True)
+            out += compare("evaluation cache (cold)", expected, cached._evaluate_range(None, None, case.as_of))
+            out += compare("evaluation cache (warm)", expected, cached._evaluate_range(None, None, case.as_of))
+            if cached.evaluation_cache.hits < len(case.students):
+                out.append(Divergence("evaluation cache (warm)", "*", f"{cached.evaluation_cache.hits} hits for {len(case.students)} students"))
+
+            snapshot_path = os.path.join(directory, "differential.snapshot")
+            write_snapshot(database, snapshot_path)
+            snapshot = open_snapshot(database, snapshot_path)
+            if snapshot is None:
+                out.append(Divergence("snapshot", "*", "snapshot not usable right after writing it"))
+            else:
+                try:
+                    out += compare("snapshot", expected, service.evaluate_students(snapshot.aggregates(), case.as_of))
+                finally:
+                    snapshot.close()
+
+            if workers > 1:
+                from parallel import evaluate_cohort_parallel
+                out += compare("process pool", expected, evaluate_cohort_parallel(db_path, workers=workers, chunk_size=max(1, len(case.students) // 7), as_of=case.as_of))
+
+            out += check_analytics(case, database)
+
+            archive = ArchiveRepository(database=database)
+            archive.archive_students([s.student_id for s in case.students])
+            archived = {s.student_id: service.evaluate_students([archive.get_aggregate_by_id(s.student_id)], case.as_of)[s.student_id] for s in case.students}
+            out += compare("archive", expected, archived)
+        finally:
+            database.close()
+    return out
+
+# SQL analytics: DeadlineGoal progress of most_at_risk and the pace percentiles (nearest rank).
+def check_analytics(case: Case, database: Database) -> List[Divergence]:
+    out: List[Divergence] = []
+    analytics = CohortAnalyticsService(database=database, default_program=case.programs[0])
+    rule = next(r for r in GOAL_REGISTRY.rules() if r.goal_type == DeadlineGoal.goal_type)
+    by_id = {s.student_id: s for s in case.students}
+    with_deadline = [s for s in case.students if any(isinstance(g, DeadlineGoal) for g in s.goals)]
+    for row in analytics.most_at_risk(k=len(with_deadline), as_of=case.as_of):
+        student = by_id[row.student_id]
+        goal = next(g for g in student.goals if isinstance(g, DeadlineGoal))
+        time_percent = student.get_time_progress_percentage(goal.duration_months, case.as_of)
+        cp_percent = student.get_cp_progress_percentage(case.program_of(student).total_ects)
+        status = reference_status(rule, cp_percent - time_percent, 0.0)
+        if not (_close(row.time_percent, time_percent) and _close(row.cp_percent, cp_percent) and row.status == status):
+            out.append(Divergence("most_at_risk", row.student_id,
+                                  f"expected ({time_percent}, {cp_percent}, {status.value}), got ({row.time_percent}, {row.cp_percent}, {row.status.value})"))
+
+    percentiles = (10, 50, 90, 100)
+    paces = sorted(s.get_cp_per_month(case.as_of) for s in case.students)
+    actual = analytics.ects_per_month_percentiles(percentiles, case.as_of)
+    for p in percentiles:
+        expected = paces[min(len(paces), max(1, math.ceil(p / 100.0 * len(paces)))) - 1] if paces else None
+        if expected is not None and not _close(actual.get(p), expected):
+            out.append(Divergence("ects_per_month_percentiles", f"p{p}", f"expected {expected}, got {actual.get(p)}"))
+    return out
+
+# --- Performance smoke test ---
+
+@dataclass(frozen=True)
+# Timing of an optimized path against its baseline; fails if it is more than max_ratio times slower.
+class PerfCheck:
+    name: str
+    baseline_seconds: float
+    optimized_seconds: float
+    max_ratio: float
+
+    @property
+    def ok(self) -> bool:
+        return self.optimized_seconds <= self.baseline_seconds * self.max_ratio
+
+# Best wall time of `repeat` runs; garbage collection of the earlier rounds would skew the timings.
+def _best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return best
+
+# Time the optimized paths against their baselines on one larger cohort.
+def perf_smoke(seed: int, students: int, repeat: int = 3) -> List[PerfCheck]:
+    case = generate_case(seed, students, random_rules=False)
+    GOAL_REGISTRY.compile_rules(GOAL_REGISTRY.default_rules())
+    checks: List[PerfCheck] = []
+
+    def reference() -> None:
+        for s in case.students:
+            reference_evaluations(s, case.program_of(s), case.as_of)
+
+    def optimized() -> None:
+        for s in case.students:
+            s._metrics_cache = None
+            s.evaluate_all_goals(case.program_of(s), case.as_of)
+
+    # Both compute the same per student; the shared metrics must at least not be slower (10% noise)
+    checks.append(PerfCheck("evaluate_all_goals vs reference", _best_of(reference, repeat), _best_of(optimized, repeat), 1.1))
+
+    with tempfile.TemporaryDirectory(prefix="differential-") as directory:
+        database = Database(db_path=os.path.join(directory, "perf.db"))
+        database.connect()
+        try:
+            database.init_db()
+            write_case(database, case)
+            service = _service(database)
+            ids = service.student_repository.list_ids()
+            logging.disable(logging.INFO)
+            try:
+                single = _best_of(lambda: [service.get_student_aggregate(i) for i in ids], 1)
+                batch = _best_of(lambda: service.student_repository.list_aggregates(), repeat)
+                # Building the objects dominates both, the batch saves the per-student queries (≈1.3x)
+                checks.append(PerfCheck("list_aggregates vs get_student_aggregate", single, batch, 1.0))
+                cached = _service(database, cache=True)
+                uncached = _best_of(lambda: service._evaluate_range(None, None, case.as_of), repeat)
+                cached._evaluate_range(None, None, case.as_of)
+                warm = _best_of(lambda: cached._evaluate_range(None, None, case.as_of), repeat)
+                checks.append(PerfCheck("evaluation cache (warm) vs uncached", uncached, warm, 0.8))
+            finally:
+                logging.disable(logging.NOTSET)
+        finally:
+            database.close()
+    return checks
+
+# --- Entry point ---
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Differential test of the optimized evaluation paths against the reference logic")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first round (round i uses seed + i)")
+    parser.add_argument("--rounds", type=int, default=5, help="generated cohorts")
+    parser.add_argument("--students", type=int, default=200, help="students per cohort")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes for the process-pool path (1 skips it)")
+    parser.add_argument("--perf-students", type=int, default=5000, help="cohort size of the performance smoke test (0 skips it)")
+    parser.add_argument("--max-report", type=int, default=20, help="divergences printed per round")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    failed = False
+    for seed in range(args.seed, args.seed + args.rounds):
+        case = generate_case(seed, args.students)
+        started = time.perf_counter()
+        GOAL_REGISTRY.compile_rules(case.rules)
+        divergences = check_in_memory(case) + check_database(case, args.workers)
+        print(f"seed {seed}: as of {case.as_of}, {len(case.students)} students, "
+              f"{len(divergences)} divergences ({time.perf_counter() - started:.2f}s)")
+        for divergence in divergences[:args.max_report]:
+            print(f"  [{divergence.path}] {divergence.student_id}: {divergence.detail}")
+        failed = failed or bool(divergences)
+    GOAL_REGISTRY.compile_rules(GOAL_REGISTRY.default_rules())
+
+    slow = False
+    if args.perf_students > 0:
+        for check in perf_smoke(args.seed, args.perf_students):
+            print(f"{check.name:>42}: {check.baseline_seconds * 1e3:8.1f} ms -> {check.optimized_seconds * 1e3:8.1f} ms "
+                  f"({check.baseline_seconds / check.optimized_seconds if check.optimized_seconds else float('inf'):.1f}x, "
+                  f"limit {1 / check.max_ratio:.1f}x) {'ok' if check.ok else 'TOO SLOW'}")
+            slow = slow or not check.ok
+    return 1 if failed else 2 if slow else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
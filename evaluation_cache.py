@@ -0,0 +1,133 @@
+# evaluation_cache.py
+# Persistent cache of goal evaluation results, keyed by a hash of everything an evaluation reads:
+# the student's start date, enrollments (with module ECTS) and goals, the study program, the
+# evaluation month, the compiled goal rules and the version of the evaluation logic. A result is
+# reused as long as the hash of the current inputs matches; there is no expiry by time.
+# The inputs are hashed from raw rows (EvaluationCacheRepository.list_inputs), so a hit needs
+# neither the student aggregate nor the evaluation.
+
+import datetime
+import hashlib
+import json
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from repositories import EvaluationCacheRepository
+from model import EvaluationCriterion, GoalEvaluation, Status, StudyProgram
+from goal_engine import GOAL_REGISTRY, GoalRegistry
+
+# Increment whenever the evaluation logic (Goal.evaluate, StudentMetrics) changes its results;
+# all cached results of older versions are then ignored.
+EVALUATION_LOGIC_VERSION = 1
+
+# Evaluations depend on the as-of date only through its month (StudentMetrics.months_since_start).
+def evaluation_month(as_of: datetime.date) -> str:
+    return f"{as_of.year:04d}-{as_of.month:02d}"
+
+# Fingerprint of the compiled goal rules (direction and threshold bands of every goal type).
+def rules_fingerprint(registry: GoalRegistry = GOAL_REGISTRY) -> str:
+    rules = sorted(
+        (rule.goal_type, rule.higher_is_better, [(band.status.value, band.mode, band.param) for band in rule.bands])
+        for rule in registry.rules()
+    )
+    return hashlib.blake2b(repr(rules).encode(), digest_size=16).hexdigest()
+
+# Hash of one student's evaluation inputs as returned by EvaluationCacheRepository.list_inputs.
+# `context` holds the parts shared by all students (logic version, rules, month, program).
+def input_hash(context: str, start_date: object, enrollments: Optional[str], goals: Optional[str]) -> str:
+    text = f"{context}\x1f{start_date}\x1f{enrollments or ''}\x1f{goals or ''}"
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+def _context(month: str, rules: str, program: StudyProgram) -> str:
+    return (
+        f"{EVALUATION_LOGIC_VERSION}\x1f{rules}\x1f{month}\x1f"
+        f"{program.program_id}\x1e{program.name}\x1e{program.total_ects}\x1e{program.duration_months}"
+    )
+
+# Compact JSON of a student's evaluations (plain lists instead of dataclass dicts).
+def encode_evaluations(evaluations: List[GoalEvaluation]) -> str:
+    return json.dumps(
+        [
+            [e.title, e.status.value, [[c.name, c.value, c.target] for c in e.criteria], e.ui_type, e.ui_data]
+            for e in evaluations
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+def decode_evaluations(text: str) -> List[GoalEvaluation]:
+    return [
+        GoalEvaluation(
+            title=title,
+            status=Status(status),
+            criteria=[EvaluationCriterion(name=name, value=value, target=target) for name, value, target in criteria],
+            ui_type=ui_type,
+            ui_data=ui_data,
+        )
+        for title, status, criteria, ui_type, ui_data in json.loads(text)
+    ]
+
+@dataclass
+# Lookup and storage of cached evaluations for one student_id range at a time (see
+# DashboardService._evaluate_range). Worker processes with a read-only connection create the cache
+# with write_through=False: new results are collected and handed to the parent (take_pending).
+class EvaluationCache:
+    repository: EvaluationCacheRepository
+    write_through: bool = True
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    _pending: List[tuple[str, str, str, str]] = field(default_factory=list, init=False, repr=False)
+
+    # Return the cached evaluations that are still valid and the current input hash of every
+    # student in the range (in student_id order); students without a valid result must be evaluated.
+    def lookup(
+        self,
+        id_from: Optional[str],
+        id_to: Optional[str],
+        as_of: datetime.date,
+        resolve_program: Callable[[Optional[str]], StudyProgram],
+    ) -> tuple[dict[str, List[GoalEvaluation]], dict[str, str]]:
+        month = evaluation_month(as_of)
+        rules = rules_fingerprint()
+        contexts: dict[Optional[str], str] = {}
+        hashes: dict[str, str] = {}
+        for student_id, program_id, start_date, enrollments, goals in self.repository.list_inputs(id_from, id_to):
+            context = contexts.get(program_id)
+            if context is None:
+                context = contexts[program_id] = _context(month, rules, resolve_program(program_id))
+            hashes[student_id] = input_hash(context, start_date, enrollments, goals)
+
+        valid: dict[str, List[GoalEvaluation]] = {}
+        for student_id, (cached_hash, result) in self.repository.get_many(month, id_from, id_to).items():
+            if hashes.get(student_id) == cached_hash:
+                valid[student_id] = decode_evaluations(result)
+        self.hits += len(valid)
+        self.misses += len(hashes) - len(valid)
+        return valid, hashes
+
+    # Store freshly computed evaluations under the input hashes returned by lookup().
+    def store(self, as_of: datetime.date, hashes: dict[str, str], results: dict[str, List[GoalEvaluation]]) -> None:
+        month = evaluation_month(as_of)
+        entries = [
+            (student_id, month, hashes[student_id], encode_evaluations(evaluations))
+            for student_id, evaluations in results.items()
+            if student_id in hashes
+        ]
+        if self.write_through:
+            self.write(entries)
+        else:
+            self._pending.extend(entries)
+
+    # Write entries collected elsewhere (e.g. by worker processes). A failing cache write (e.g. a
+    # read-only database file) is logged and does not fail the evaluation.
+    def write(self, entries: List[tuple[str, str, str, str]]) -> None:
+        try:
+            self.repository.put_many(entries)
+        except sqlite3.Error as e:
+            logging.warning(f"Evaluation cache not updated: {e}.")
+
+    def take_pending(self) -> List[tuple[str, str, str, str]]:
+        pending, self._pending = self._pending, []
+        return pending
@@ -0,0 +1,76 @@
+# goal_engine.py
+# Registry-based goal engine: goal types are registered once, their threshold rules are
+# data (table goal_rule/goal_threshold) and are compiled into classifier closures.
+
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from model import (
+    Goal,
+    ThresholdBand,
+    compile_classifier,
+    GradeAverageGoal,
+    DeadlineGoal,
+    CpPaceGoal,
+)
+
+@dataclass(frozen=True)
+# Threshold rule of one goal type as stored in the database.
+class GoalRule:
+    goal_type: str
+    higher_is_better: bool
+    bands: tuple[ThresholdBand, ...]
+
+# Registry of goal types. Repositories create and persist goals through the registry,
+# so new goal types only need to be registered here (or by a plugin module).
+class GoalRegistry:
+    def __init__(self) -> None:
+        self._types: dict[str, type[Goal]] = {}
+        self._rules: dict[str, GoalRule] = {}
+
+    # Register a Goal subclass under its goal_type; usable as a class decorator.
+    def register(self, goal_cls: type[Goal]) -> type[Goal]:
+        self._types[goal_cls.goal_type] = goal_cls
+        self._rules[goal_cls.goal_type] = GoalRule(goal_cls.goal_type, goal_cls.higher_is_better, tuple(goal_cls.default_bands))
+        return goal_cls
+
+    def get(self, goal_type: str) -> Optional[type[Goal]]:
+        return self._types.get(goal_type)
+
+    # Create a goal from a student_goals row. Returns None for unknown goal types.
+    def create(self, goal_type: str, value: float) -> Optional[Goal]:
+        goal_cls = self._types.get(goal_type)
+        return goal_cls.from_value(value) if goal_cls is not None else None
+
+    # Rules of all registered goal types, as currently compiled.
+    def rules(self) -> List[GoalRule]:
+        return list(self._rules.values())
+
+    # Default rules declared by the registered goal classes; used to seed the database.
+    def default_rules(self) -> List[GoalRule]:
+        return [GoalRule(t, c.higher_is_better, tuple(c.default_bands)) for t, c in self._types.items()]
+
+    # Compile rules into classifier closures and bind them to the goal classes. Done once after
+    # loading the rules, so evaluating goals needs no per-call dispatch on goal type or band.
+    def compile_rules(self, rules: Iterable[GoalRule]) -> None:
+        for rule in rules:
+            goal_cls = self._types.get(rule.goal_type)
+            if goal_cls is None:
+                logging.warning(f"Goal rule for unknown goal type ignored: {rule.goal_type}.")
+                continue
+            goal_cls.classify = staticmethod(compile_classifier(rule.higher_is_better, rule.bands))
+            self._rules[rule.goal_type] = rule
+        logging.info("Goal rules compiled: %d goal types.", len(self._rules))
+
+# Default registry with the built-in goal types.
+GOAL_REGISTRY = GoalRegistry()
+GOAL_REGISTRY.register(GradeAverageGoal)
+GOAL_REGISTRY.register(DeadlineGoal)
+GOAL_REGISTRY.register(CpPaceGoal)
+
+# Seed missing default rules and compile the rules stored in the database.
+# The repository is a GoalRuleRepository (repositories.py).
+def load_goal_rules(rule_repository, registry: GoalRegistry = GOAL_REGISTRY) -> None:
+    rule_repository.insert_defaults(registry.default_rules())
+    registry.compile_rules(rule_repository.list_all())
@@ -4,36 +4,90 @@
 import tkinter as tk
 import logging
 
-from view import DashboardGUI
+from view import DashboardGUI, TargetMonitoring, DataCollection, EnrollmentGrid
 from database import Database
-from repositories import StudentRepository, ModuleRepository, EnrollmentRepository
+from repositories import StudentRepository, ModuleRepository, EnrollmentRepository, ProgramRepository, GoalRuleRepository, ChangeLogRepository
+from goal_engine import load_goal_rules
 from services import DashboardService
+from write_behind import WriteBehindQueue
 from controller import DashboardController, IDashboardService
+from perf import UiProfiler
+from memdiag import MemoryDiagnostics
+from maintenance import MaintenanceScheduler
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s')
 
+# Binary cold-start snapshot of the dataset (see snapshot.py); set to None to disable it.
+SNAPSHOT_PATH = "dashboard.snapshot"
+
+# In-memory mode (see Database.in_memory): the database file is loaded into RAM at startup and written
+# back every PERSIST_INTERVAL seconds and on exit. For demos and single-user sessions; the snapshot
+# and the maintenance of the file are not used in this mode.
+IN_MEMORY_DATABASE = False
+PERSIST_INTERVAL = 30.0
+
+# Seconds after which queued form saves are written to the database in one transaction.
+WRITE_BEHIND_INTERVAL = 2.0
+
+# Background database maintenance (see maintenance.py): interval between runs and the user idle
+# time required before a run starts, in seconds.
+MAINTENANCE_INTERVAL = 6 * 3600.0
+MAINTENANCE_IDLE_AFTER = 60.0
+
+# UI render-time instrumentation (see perf.py): set to a file path to record handler timings and
+# event-loop latency; the data is exported there when the window is closed. None disables it.
+UI_PROFILE_PATH = None
+
+# Memory diagnostics (see memdiag.py): set to a file path to sample tracemalloc, Tk widget and model
+# object counts every MEMORY_DIAGNOSTICS_INTERVAL_MS and log their growth; the samples are exported
+# there when the window is closed. Tracing slows allocations down and each sample pauses the UI
+# (roughly 0.5 s per 10 MB of traced memory), so None (the default) disables it.
+MEMORY_DIAGNOSTICS_PATH = None
+MEMORY_DIAGNOSTICS_INTERVAL_MS = 60000
+
+# UI handlers timed by the profiler
+PROFILED_HANDLERS = {
+    TargetMonitoring: ("update_overview", "refresh_student_dropdown", "on_student_selected", "_prefetch_step"),
+    DataCollection: ("refresh_student_list", "_render_enrollments", "refresh_module_dropdown", "on_student_selected"),
+    EnrollmentGrid: ("load", "paste_from_clipboard", "save"),
+}
+
 # Main function to set up and run the application
 def main():
     # Setup database and repositories
-    database = Database()
+    database = Database(in_memory=IN_MEMORY_DATABASE, persist_interval=PERSIST_INTERVAL)
     database.connect()
     database.init_db()
+    load_goal_rules(GoalRuleRepository(database=database))
 
     student_repository = StudentRepository(database=database)
     module_repository = ModuleRepository(database=database)
     enrollment_repository = EnrollmentRepository(database=database)
+    program_repository = ProgramRepository(database=database)
 
     # Type annotation: We signal that we treat the service as an interface, not as a concrete implementation.
     dashboard_service: IDashboardService = DashboardService(
         student_repository=student_repository,
         module_repository=module_repository,
         enrollment_repository=enrollment_repository,
+        program_repository=program_repository,
+        change_log_repository=ChangeLogRepository(database=database),
+        snapshot_path=None if IN_MEMORY_DATABASE else SNAPSHOT_PATH,
+        write_behind=WriteBehindQueue(database=database, flush_interval=WRITE_BEHIND_INTERVAL),
     )
 
     # Setup controller (injects the interface)
     controller = DashboardController(dashboard_service=dashboard_service)
 
+    # Instrument the views before they are created, so bound callbacks are timed as well
+    profiler = None
+    if UI_PROFILE_PATH is not None:
+        profiler = UiProfiler()
+        profiler.instrument_db(DashboardController)
+        for view_class, handlers in PROFILED_HANDLERS.items():
+            profiler.instrument_handlers(view_class, handlers)
+
     # Setup and run GUI
     main_window = tk.Tk()
     dashboard_app = DashboardGUI(master=main_window, controller=controller)
@@ -41,7 +95,29 @@ def main():
     dashboard_app.master.title("Dashboard GUI")
     dashboard_app.master.geometry("1100x950")
     logging.info("Starting Dashboard application.")
+    if profiler is not None:
+        profiler.start_heartbeat(main_window)
+    memory_diagnostics = None
+    if MEMORY_DIAGNOSTICS_PATH is not None:
+        memory_diagnostics = MemoryDiagnostics(interval_ms=MEMORY_DIAGNOSTICS_INTERVAL_MS)
+        memory_diagnostics.start(main_window)
+
+    # Maintenance runs on its own thread and connection; keyboard and mouse input postpone it.
+    maintenance = MaintenanceScheduler(db_path=database.db_path, interval=MAINTENANCE_INTERVAL, idle_after=MAINTENANCE_IDLE_AFTER)
+    for sequence in ("<KeyPress>", "<ButtonPress>"):
+        main_window.bind_all(sequence, lambda _evt: maintenance.note_activity(), add="+")
+    if not IN_MEMORY_DATABASE:
+        maintenance.start()
     main_window.mainloop()
+    maintenance.stop()
+
+    if profiler is not None:
+        profiler.log_summary()
+        profiler.export(UI_PROFILE_PATH)
+    if memory_diagnostics is not None:
+        memory_diagnostics.stop(main_window)
+        memory_diagnostics.log_summary()
+        memory_diagnostics.export(MEMORY_DIAGNOSTICS_PATH)
 
 # Entry point
 if __name__ == "__main__":
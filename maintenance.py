@@ -0,0 +1,200 @@
+# maintenance.py
+# Database maintenance: planner statistics (PRAGMA optimize / ANALYZE), incremental vacuum of
+# free pages and an integrity check. Runs on a background thread with its own connection, on a
+# schedule and only while the user is idle, so the UI thread is never blocked.
+
+import datetime
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from database import Database
+from repositories import ChangeLogRepository, EvaluationCacheRepository
+
+# PRAGMA auto_vacuum value of INCREMENTAL (see Database.init_db)
+AUTO_VACUUM_INCREMENTAL = 2
+
+@dataclass(frozen=True)
+# Outcome of one maintenance run: file statistics before/after, integrity check result and the
+# time spent per step (seconds).
+class MaintenanceReport:
+    page_size: int
+    pages_before: int
+    pages_after: int
+    freelist_before: int
+    freelist_after: int
+    integrity: tuple[str, ...]
+    step_seconds: dict[str, float]
+
+    @property
+    def ok(self) -> bool:
+        return self.integrity in ((), ("ok",))
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.step_seconds.values())
+
+    def describe(self) -> str:
+        steps = ", ".join(f"{step} {seconds:.2f}s" for step, seconds in self.step_seconds.items())
+        return (
+            f"pages {self.pages_before} -> {self.pages_after} "
+            f"({(self.pages_before - self.pages_after) * self.page_size / 1e6:.1f} MB freed), "
+            f"freelist {self.freelist_before} -> {self.freelist_after}, "
+            f"integrity {'ok' if self.ok else '; '.join(self.integrity)}, {steps}"
+        )
+
+def _pragma(database: Database, name: str) -> int:
+    (value,) = database.conn.execute(f"PRAGMA {name}").fetchone()
+    return int(value)
+
+# Run all maintenance steps once. Change log entries older than change_log_days and cached
+# evaluations of more than evaluation_cache_months months ago are pruned. The free pages are
+# released in steps of vacuum_step pages, each in its own short write transaction, so other
+# instances only wait for one step.
+# A database created before incremental auto-vacuum is only converted with convert_auto_vacuum
+# (one full VACUUM, holding an exclusive lock for the whole rebuild; meant for the CLI while no
+# other instance is running). Without it the vacuum step is skipped for such a database.
+def run_maintenance(
+    database: Database,
+    vacuum_step: int = 1000,
+    analysis_limit: int = 1000,
+    check: bool = True,
+    change_log_days: Optional[int] = 90,
+    evaluation_cache_months: Optional[int] = 12,
+    convert_auto_vacuum: bool = False,
+) -> MaintenanceReport:
+    if database.conn is None:
+        raise RuntimeError("Database not connected")
+    steps: dict[str, float] = {}
+    page_size = _pragma(database, "page_size")
+    pages_before = _pragma(database, "page_count")
+    freelist_before = _pragma(database, "freelist_count")
+
+    started = time.perf_counter()
+    # analysis_limit bounds the rows ANALYZE samples per index, so the run time does not grow with the data
+    database.conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+    database.run_with_retry(lambda: database.conn.execute("ANALYZE"))
+    database.conn.execute("PRAGMA optimize")
+    steps["analyze"] = time.perf_counter() - started
+
+    # Change log entries older than the retention are deleted before the vacuum releases their pages
+    if change_log_days is not None:
+        started = time.perf_counter()
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=change_log_days)
+        ChangeLogRepository(database=database).prune_before(cutoff.strftime("%Y-%m-%dT%H:%M:%S"))
+        steps["prune_change_log"] = time.perf_counter() - started
+
+    if evaluation_cache_months is not None:
+        started = time.perf_counter()
+        today = datetime.date.today()
+        months = today.year * 12 + today.month - 1 - evaluation_cache_months
+        EvaluationCacheRepository(database=database).prune_before(f"{months // 12:04d}-{months % 12 + 1:02d}")
+        steps["prune_evaluation_cache"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if _pragma(database, "auto_vacuum") != AUTO_VACUUM_INCREMENTAL:
+        if convert_auto_vacuum:
+            database.conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+            database.run_with_retry(lambda: database.conn.execute("VACUUM"))
+            logging.info("Database converted to incremental auto-vacuum.")
+        else:
+            logging.info("Database does not use incremental auto-vacuum; vacuum skipped (run 'maintain --convert-auto-vacuum' once).")
+    else:
+        # The pragma releases pages while its result rows are stepped, hence fetchall()
+        free = _pragma(database, "freelist_count")
+        while free > 0:
+            database.run_with_retry(lambda: database.conn.execute(f"PRAGMA incremental_vacuum({int(vacuum_step)})").fetchall())
+            remaining = _pragma(database, "freelist_count")
+            if remaining >= free:
+                break
+            free = remaining
+    steps["vacuum"] = time.perf_counter() - started
+
+    integrity: tuple[str, ...] = ()
+    if check:
+        started = time.perf_counter()
+        integrity = tuple(str(row[0]) for row in database.conn.execute("PRAGMA quick_check").fetchall())
+        steps["quick_check"] = time.perf_counter() - started
+
+    report = MaintenanceReport(
+        page_size=page_size,
+        pages_before=pages_before,
+        pages_after=_pragma(database, "page_count"),
+        freelist_before=freelist_before,
+        freelist_after=_pragma(database, "freelist_count"),
+        integrity=integrity,
+        step_seconds=steps,
+    )
+    if report.ok:
+        logging.info(f"Database maintenance finished: {report.describe()}.")
+    else:
+        logging.error(f"Database integrity check failed: {report.describe()}.")
+    return report
+
+@dataclass
+# Runs run_maintenance on a daemon thread every `interval` seconds, but only once the application
+# has been idle for `idle_after` seconds (see note_activity). The thread opens its own connection.
+# It never does the full VACUUM of the auto-vacuum conversion, since other instances may be running.
+class MaintenanceScheduler:
+    db_path: str
+    interval: float = 6 * 3600.0
+    idle_after: float = 60.0
+    # Seconds between checks whether maintenance is due
+    poll_interval: float = 5.0
+    # Called on the maintenance thread with each report (must not touch Tk widgets)
+    on_report: Optional[Callable[[MaintenanceReport], None]] = None
+    last_report: Optional[MaintenanceReport] = field(default=None, init=False)
+    _last_activity: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _last_run: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _run_requested: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _thread: Optional[threading.Thread] = field(default=None, init=False, repr=False)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="db-maintenance", daemon=True)
+        self._thread.start()
+
+    # A running maintenance step is finished first; waits at most `timeout` seconds.
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._run_requested.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # Record user activity (called by the GUI); maintenance waits until the user is idle again.
+    def note_activity(self) -> None:
+        self._last_activity = time.monotonic()
+
+    # Run maintenance at the next idle moment, regardless of the interval.
+    def request_run(self) -> None:
+        self._run_requested.set()
+
+    def _is_due(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_activity < self.idle_after:
+            return False
+        return self._run_requested.is_set() or now - self._last_run >= self.interval
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._stop.wait(self.poll_interval)
+            if self._stop.is_set() or not self._is_due():
+                continue
+            self._run_requested.clear()
+            self._last_run = time.monotonic()
+            database = Database(db_path=self.db_path)
+            try:
+                database.connect()
+                self.last_report = run_maintenance(database)
+                if self.on_report is not None:
+                    self.on_report(self.last_report)
+            except Exception as e:
+                logging.error(f"Database maintenance failed: {e}.")
+            finally:
+                database.close()
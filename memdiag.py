@@ -0,0 +1,280 @@
+# memdiag.py
+# Memory diagnostics for long-running GUI sessions: on an interval the Tk event loop takes a
+# tracemalloc snapshot, counts the live Tk widgets (per class) and Tcl commands (callbacks
+# registered by tkinter) and counts the live model objects (Student, Enrollment, Module, ...).
+# Each sample reports the growth since the previous one and the source lines that allocated the
+# most new memory; a count that grows over several consecutive samples is logged as a suspected leak.
+# Everything is logged on the "memdiag" channel and can be exported as JSON for offline analysis.
+# Grouping a snapshot by source line is pure Python and, while tracing is active, very slow on a
+# large heap (every allocation it makes is traced too), so the UI thread only dumps the snapshot
+# and a worker process without tracing groups it; the allocation growth is logged when it is ready.
+
+import gc
+import json
+import linecache
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import tkinter as tk
+import tracemalloc
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional, Sequence
+
+from model import Student, Enrollment, Module, GoalEvaluation
+
+logger = logging.getLogger("memdiag")
+
+# Model classes whose live instances are counted
+TRACKED_TYPES: tuple[type, ...] = (Student, Enrollment, Module, GoalEvaluation)
+
+@dataclass(frozen=True)
+# A source line that allocated memory since the previous sample.
+class AllocationGrowth:
+    location: str
+    size_diff_bytes: int
+    count_diff: int
+    source: str
+
+@dataclass(frozen=True)
+# Source lines with the largest allocation growth between the sample at at_s and the one before.
+class AllocationReport:
+    at_s: float
+    top_growth: List[AllocationGrowth]
+
+@dataclass(frozen=True)
+# One sample: traced memory, Tk widgets and Tcl commands and live model objects.
+class MemorySample:
+    at_s: float
+    traced_bytes: int
+    peak_bytes: int
+    widgets: int
+    widgets_by_class: dict[str, int]
+    tcl_commands: int
+    objects: dict[str, int]
+    sample_ms: float
+
+@dataclass
+class MemoryDiagnostics:
+    interval_ms: int = 60000
+    # Stack frames stored per allocation (1 = the allocating line; more is slower and uses more memory)
+    frames: int = 1
+    # Source lines reported per sample
+    top: int = 10
+    # Consecutive growing samples after which a count is reported as a suspected leak
+    leak_samples: int = 3
+    tracked_types: Sequence[type] = TRACKED_TYPES
+    max_samples: int = 1000
+    samples: deque = field(init=False, repr=False)
+    allocation_reports: deque = field(init=False, repr=False)
+    _origin: float = field(default_factory=time.perf_counter, init=False, repr=False)
+    # Per-line (size, count) of the previous snapshot, as grouped by the worker
+    _previous: Optional[dict[str, tuple[int, int]]] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _executor: Optional[ProcessPoolExecutor] = field(default=None, init=False, repr=False)
+    _pending: List[Future] = field(default_factory=list, init=False, repr=False)
+    _started_tracing: bool = field(default=False, init=False, repr=False)
+    _job: Optional[str] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.samples = deque(maxlen=self.max_samples)
+        self.allocation_reports = deque(maxlen=self.max_samples)
+
+    # Start tracing allocations and sample every interval_ms on the Tk event loop of `root`.
+    def start(self, root: tk.Misc) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self.sample(root)
+
+        def tick() -> None:
+            try:
+                self.sample(root)
+            except Exception as e:
+                logger.error(f"Memory sample failed: {e}")
+            self._job = root.after(self.interval_ms, tick)
+
+        self._job = root.after(self.interval_ms, tick)
+
+    # Stop sampling and wait for the pending allocation reports; also safe after the window has
+    # been destroyed.
+    def stop(self, root: tk.Misc) -> None:
+        if self._job is not None:
+            try:
+                root.after_cancel(self._job)
+            except tk.TclError:
+                pass
+            self._job = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._previous = None
+
+    # Block until the allocation reports of all samples taken so far are available.
+    def wait(self) -> None:
+        for future in list(self._pending):
+            try:
+                future.result()
+            except Exception:
+                pass
+
+    # Take one sample (root=None skips the Tk counts, e.g. outside the GUI) and log its growth.
+    # Requires tracemalloc to be tracing (start() does that).
+    def sample(self, root: Optional[tk.Misc] = None) -> MemorySample:
+        started = time.perf_counter()
+        fd, snapshot_path = tempfile.mkstemp(prefix="memdiag-", suffix=".tracemalloc")
+        os.close(fd)
+        tracemalloc.take_snapshot().dump(snapshot_path)
+        traced, peak = tracemalloc.get_traced_memory()
+        widgets_by_class = _count_widgets(root) if root is not None else {}
+
+        sample = MemorySample(
+            at_s=started - self._origin,
+            traced_bytes=traced,
+            peak_bytes=peak,
+            widgets=sum(widgets_by_class.values()),
+            widgets_by_class=widgets_by_class,
+            tcl_commands=len(root.tk.splitlist(root.tk.call("info", "commands"))) if root is not None else 0,
+            objects=_count_objects(self.tracked_types),
+            sample_ms=(time.perf_counter() - started) * 1000.0,
+        )
+        self._report(sample)
+        self.samples.append(sample)
+
+        if self._executor is None:
+            # spawn: the worker must not inherit the tracing state or the Tk/database threads
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        future = self._executor.submit(_group_snapshot, snapshot_path)
+        self._pending.append(future)
+        future.add_done_callback(lambda f: self._on_grouped(sample.at_s, f))
+        return sample
+
+    # Called on the executor's thread in submission order: compare with the previous snapshot
+    # and log the lines with the largest growth (logging only, no Tk calls).
+    def _on_grouped(self, at_s: float, future: Future) -> None:
+        with self._lock:
+            self._pending.remove(future)
+            try:
+                current = future.result()
+            except Exception as e:
+                logger.error(f"Grouping the memory snapshot failed: {e}")
+                return
+            previous, self._previous = self._previous, current
+            if previous is None:
+                return
+            diffs = []
+            for location, (size, count) in current.items():
+                old_size, old_count = previous.get(location, (0, 0))
+                if size > old_size:
+                    diffs.append((size - old_size, count - old_count, location))
+            diffs.sort(reverse=True)
+            top_growth = []
+            for size_diff, count_diff, location in diffs[:self.top]:
+                filename, _, lineno = location.rpartition(":")
+                top_growth.append(AllocationGrowth(
+                    location=location,
+                    size_diff_bytes=size_diff,
+                    count_diff=count_diff,
+                    source=linecache.getline(filename, int(lineno)).strip(),
+                ))
+            self.allocation_reports.append(AllocationReport(at_s=at_s, top_growth=top_growth))
+            if top_growth:
+                logger.info("Largest allocation growth: %+.1f KB at %s.", top_growth[0].size_diff_bytes / 1e3, top_growth[0].location)
+            for growth in top_growth:
+                logger.debug("  %+.1f KB in %+d blocks at %s: %s", growth.size_diff_bytes / 1e3, growth.count_diff, growth.location, growth.source)
+
+    # Counts that grew in each of the last leak_samples samples: name -> growth over these samples.
+    def suspected_leaks(self) -> dict[str, int]:
+        if len(self.samples) <= self.leak_samples:
+            return {}
+        window = list(self.samples)[-(self.leak_samples + 1):]
+        series = {
+            "traced_bytes": [s.traced_bytes for s in window],
+            "widgets": [s.widgets for s in window],
+            "tcl_commands": [s.tcl_commands for s in window],
+            **{name: [s.objects.get(name, 0) for s in window] for name in window[-1].objects},
+        }
+        return {
+            name: values[-1] - values[0]
+            for name, values in series.items()
+            if all(b > a for a, b in zip(values, values[1:]))
+        }
+
+    def log_summary(self) -> None:
+        if not self.samples:
+            return
+        first, last = self.samples[0], self.samples[-1]
+        logger.info(
+            "Memory over %.0f s: traced %.1f -> %.1f MB (peak %.1f MB), widgets %d -> %d, Tcl commands %d -> %d, %s",
+            last.at_s - first.at_s, first.traced_bytes / 1e6, last.traced_bytes / 1e6, last.peak_bytes / 1e6,
+            first.widgets, last.widgets, first.tcl_commands, last.tcl_commands,
+            ", ".join(f"{name} {first.objects.get(name, 0)} -> {count}" for name, count in last.objects.items()),
+        )
+
+    # Write all samples to a JSON file.
+    def export(self, path: str) -> None:
+        data = {
+            "interval_ms": self.interval_ms,
+            "samples": [asdict(s) for s in self.samples],
+            "allocation_growth": [asdict(r) for r in self.allocation_reports],
+            "suspected_leaks": self.suspected_leaks(),
+        }
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, indent=1)
+        logger.info("Memory diagnostics exported to %s (%d samples).", path, len(self.samples))
+
+    def _report(self, sample: MemorySample) -> None:
+        previous = self.samples[-1] if self.samples else None
+        if previous is None:
+            logger.info("Memory baseline: traced %.1f MB, %d widgets, %d Tcl commands, objects %s (%.0f ms).",
+                        sample.traced_bytes / 1e6, sample.widgets, sample.tcl_commands, sample.objects, sample.sample_ms)
+            return
+        object_growth = {name: count - previous.objects.get(name, 0) for name, count in sample.objects.items()}
+        logger.info(
+            "Memory: traced %+.2f MB (%.1f MB), widgets %+d (%d), Tcl commands %+d (%d), objects %s (%.0f ms).",
+            (sample.traced_bytes - previous.traced_bytes) / 1e6, sample.traced_bytes / 1e6,
+            sample.widgets - previous.widgets, sample.widgets, sample.tcl_commands - previous.tcl_commands, sample.tcl_commands,
+            {name: f"{diff:+d}" for name, diff in object_growth.items()}, sample.sample_ms,
+        )
+        for name, growth in self.suspected_leaks().items():
+            logger.warning("Possible leak: %s grew in each of the last %d samples (%+d).", name, self.leak_samples, growth)
+
+# Worker entry point: group a dumped snapshot by allocating source line into
+# "file:line" -> (size, count), ignoring the allocations of tracemalloc and the import machinery.
+def _group_snapshot(snapshot_path: str) -> dict[str, tuple[int, int]]:
+    try:
+        snapshot = tracemalloc.Snapshot.load(snapshot_path).filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, linecache.__file__),
+        ))
+    finally:
+        os.remove(snapshot_path)
+    return {
+        f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}": (stat.size, stat.count)
+        for stat in snapshot.statistics("lineno")
+    }
+
+# Live widgets below root per Tk class, following tkinter's children dictionaries.
+def _count_widgets(root: tk.Misc) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    stack = list(root.children.values())
+    while stack:
+        widget = stack.pop()
+        name = type(widget).__name__
+        counts[name] = counts.get(name, 0) + 1
+        stack.extend(widget.children.values())
+    return dict(sorted(counts.items()))
+
+# Live instances of the given classes (exact type; all are user classes, which the GC tracks).
+def _count_objects(types: Sequence[type]) -> dict[str, int]:
+    by_type = Counter(map(type, gc.get_objects()))
+    return {t.__name__: by_type[t] for t in types}
@@ -5,7 +5,7 @@ import datetime
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional
+from typing import Callable, ClassVar, Optional, Sequence
 
 # Status enum for goal evaluations
 class Status(str, Enum):
@@ -14,11 +14,14 @@ class Status(str, Enum):
     RED = "RED"
 
 # Module data model
+# version: row version as read from the database (0 = not read from the database), used for
+# compare-and-swap updates; it does not take part in comparisons.
 @dataclass(frozen=True)
 class Module:
     module_id: str
     title: str
     ects: int
+    version: int = field(default=0, compare=False)
 
 # Study program data model
 @dataclass(frozen=True)
@@ -26,6 +29,10 @@ class StudyProgram:
     name: str
     total_ects: int
     duration_months: int
+    program_id: str = ""
+
+# Default study program; students without a (known) program link are evaluated against it
+DEFAULT_PROGRAM = StudyProgram(name="Angewandte Künstliche Intelligenz", total_ects=180, duration_months=48, program_id="AKI")
 
 # Enrollment data model
 @dataclass(frozen=True)
@@ -33,6 +40,56 @@ class Enrollment:
     module: Module
     grade: Optional[float] = None
     date_passed: Optional[datetime.date] = None
+    version: int = field(default=0, compare=False)
+
+# Derived metrics of a student at one evaluation date. Computed once per evaluation and shared
+# by all Goal.evaluate implementations; the arithmetic matches the reference methods of Student.
+@dataclass(frozen=True)
+class StudentMetrics:
+    as_of: datetime.date
+    months_since_start: int
+    earned_ects: int
+    average_grade: float
+
+    @classmethod
+    def compute(cls, student: "Student", as_of: datetime.date) -> "StudentMetrics":
+        """
+        Compute all metrics of the student in one pass over the enrollments.
+
+        :param student: The student instance.
+        :type student: Student
+        :param as_of: The evaluation date.
+        :type as_of: datetime.date
+        :return: The metrics of the student at the evaluation date.
+        :rtype: StudentMetrics
+        """
+        earned = 0
+        grades = []
+        for e in student.enrollments:
+            if e.date_passed is not None:
+                earned += e.module.ects
+            if e.grade is not None:
+                grades.append(e.grade)
+        months = (as_of.year - student.start_date.year) * 12 + (as_of.month - student.start_date.month)
+        return cls(
+            as_of=as_of,
+            months_since_start=max(0, months),
+            earned_ects=earned,
+            average_grade=(sum(grades) / len(grades)) if grades else 0.0,
+        )
+
+    def time_progress_percentage(self, duration_months: int) -> float:
+        if duration_months <= 0:
+            return 0.0
+        return min(100.0, (self.months_since_start / duration_months) * 100.0)
+
+    def cp_progress_percentage(self, total_ects: int) -> float:
+        if total_ects <= 0:
+            return 0.0
+        return min(100.0, (self.earned_ects / total_ects) * 100.0)
+
+    def cp_per_month(self) -> float:
+        return self.earned_ects / max(1, self.months_since_start)
 
 # Student data model
 @dataclass
@@ -42,6 +99,12 @@ class Student:
     start_date: datetime.date
     enrollments: list[Enrollment] = field(default_factory=list)
     goals: list["Goal"] = field(default_factory=list)
+    program_id: Optional[str] = None
+    version: int = field(default=0, compare=False)
+    # Loaded from the archive of finished students (read-only, see ArchiveRepository)
+    archived: bool = field(default=False, compare=False)
+    # Memoized metrics: ((as_of, start_date, enrollments), StudentMetrics) of the last evaluation
+    _metrics_cache: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
 
     # Calculated properties and methods for goal evaluation
     def _months_since_start(self, now: Optional[datetime.date] = None) -> int:
@@ -69,19 +132,21 @@ class Student:
         grades = [e.grade for e in self.enrollments if e.grade is not None]
         return (sum(grades) / len(grades)) if grades else 0.0
 
-    def get_time_progress_percentage(self, duration_months: int) -> float:
+    def get_time_progress_percentage(self, duration_months: int, now: Optional[datetime.date] = None) -> float:
         """
         Calculate the percentage of time progress based on the program duration.
 
         :param self: The student instance.
         :param duration_months: The total duration of the program in months.
         :type duration_months: int
+        :param now: The current date. Defaults to today if not provided.
+        :type now: Optional[datetime.date]
         :return: The percentage of time progress based on the duration.
         :rtype: float
         """
         if duration_months <= 0:
             return 0.0
-        months = self._months_since_start()
+        months = self._months_since_start(now)
         return min(100.0, (months / duration_months) * 100.0)
 
     def get_earned_ects(self) -> int:
@@ -108,28 +173,56 @@ class Student:
             return 0.0
         return min(100.0, (self.get_earned_ects() / total_ects) * 100.0)
 
-    def get_cp_per_month(self) -> float:
+    def get_cp_per_month(self, now: Optional[datetime.date] = None) -> float:
         """
         Calculate the average ECTS credits earned per month.
 
         :param self: The student instance.
+        :param now: The current date. Defaults to today if not provided.
+        :type now: Optional[datetime.date]
         :return: The average ECTS credits earned per month.
         :rtype: float
         """
-        months = max(1, self._months_since_start())
+        months = max(1, self._months_since_start(now))
         return self.get_earned_ects() / months
 
-    def evaluate_all_goals(self, program: StudyProgram) -> list["GoalEvaluation"]:
+    def metrics(self, as_of: Optional[datetime.date] = None) -> StudentMetrics:
+        """
+        Return the derived metrics at the given date, computed at most once per
+        (enrollments, start date, as_of). The cache is invalidated as soon as the
+        enrollments list differs from the one the metrics were computed for.
+
+        :param self: The student instance.
+        :param as_of: The evaluation date. Defaults to today if not provided.
+        :type as_of: Optional[datetime.date]
+        :return: The metrics of the student.
+        :rtype: StudentMetrics
+        """
+        as_of = as_of or datetime.date.today()
+        # Tuple equality compares the (immutable) enrollments by identity first, so a cache hit
+        # costs one pointer comparison per enrollment.
+        key = (as_of, self.start_date, tuple(self.enrollments))
+        cached = self._metrics_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        metrics = StudentMetrics.compute(self, as_of)
+        self._metrics_cache = (key, metrics)
+        return metrics
+
+    def evaluate_all_goals(self, program: StudyProgram, as_of: Optional[datetime.date] = None) -> list["GoalEvaluation"]:
         """
         Evaluate all goals for the student against the given study program.
 
         :param self: The student instance.
         :param program: The study program instance.
         :type program: StudyProgram
+        :param as_of: The evaluation date. Defaults to today if not provided.
+        :type as_of: Optional[datetime.date]
         :return: A list of goal evaluations for the student.
         :rtype: list[GoalEvaluation]
         """
-        return [goal.evaluate(self, program) for goal in self.goals]
+        metrics = self.metrics(as_of)
+        return [goal.evaluate(self, program, metrics) for goal in self.goals]
 
 # Goal evaluation data models
 @dataclass(frozen=True)
@@ -147,16 +240,76 @@ class GoalEvaluation:
     ui_type: str
     ui_data: dict
 
-# Abstract base class for goals
+# Threshold band of a goal rule: the status applies if the actual value still meets the
+# target shifted by an offset (target + param) or scaled by a factor (target * param).
+@dataclass(frozen=True)
+class ThresholdBand:
+    status: Status
+    mode: str
+    param: float
+
+# Compile a rule (direction + ordered bands) into a classifier closure (actual, target) -> Status.
+# A value meeting the target is GREEN, the first band it meets gives its status, otherwise RED.
+def compile_classifier(higher_is_better: bool, bands: Sequence[ThresholdBand]) -> Callable[[float, float], Status]:
+    for band in bands:
+        if band.mode not in ("offset", "factor"):
+            raise ValueError(f"Unknown threshold mode: {band.mode}")
+    steps = tuple((band.mode == "factor", band.param, band.status) for band in bands)
+    green, red = Status.GREEN, Status.RED
+
+    if higher_is_better:
+        def classify(actual: float, target: float) -> Status:
+            if actual >= target:
+                return green
+            for is_factor, param, status in steps:
+                if actual >= (target * param if is_factor else target + param):
+                    return status
+            return red
+    else:
+        def classify(actual: float, target: float) -> Status:
+            if actual <= target:
+                return green
+            for is_factor, param, status in steps:
+                if actual <= (target * param if is_factor else target + param):
+                    return status
+            return red
+
+    return classify
+
+# Abstract base class for goals. Each goal type declares its rule defaults (direction and
+# threshold bands); the compiled classifier can be replaced by rules stored in the database
+# (see goal_engine.py).
 class Goal(ABC):
+    goal_type: ClassVar[str]
+    higher_is_better: ClassVar[bool]
+    default_bands: ClassVar[tuple[ThresholdBand, ...]]
+    classify: ClassVar[Callable[[float, float], Status]]
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.goal_type = cls.__name__
+        if hasattr(cls, "default_bands"):
+            cls.classify = staticmethod(compile_classifier(cls.higher_is_better, cls.default_bands))
+
     @abstractmethod
-    def evaluate(self, student: Student, program: StudyProgram) -> GoalEvaluation:
+    def evaluate(self, student: Student, program: StudyProgram, metrics: Optional[StudentMetrics] = None) -> GoalEvaluation:
         raise NotImplementedError
 
     @abstractmethod
     def get_title(self) -> str:
         raise NotImplementedError
 
+    # Persisted target value of the goal (student_goals.value)
+    @abstractmethod
+    def get_value(self) -> float:
+        raise NotImplementedError
+
+    # Create a goal from its persisted target value
+    @classmethod
+    @abstractmethod
+    def from_value(cls, value: float) -> "Goal":
+        raise NotImplementedError
+
 # Concrete goal implementations
 
 # GradeAverageGoal implementation
@@ -164,10 +317,20 @@ class Goal(ABC):
 class GradeAverageGoal(Goal):
     target_avg: float
 
+    higher_is_better: ClassVar[bool] = False
+    default_bands: ClassVar[tuple[ThresholdBand, ...]] = (ThresholdBand(Status.YELLOW, "offset", 0.3),)
+
     def get_title(self) -> str:
         return "Notenschnitt"
 
-    def evaluate(self, student: Student, program: StudyProgram) -> GoalEvaluation:
+    def get_value(self) -> float:
+        return self.target_avg
+
+    @classmethod
+    def from_value(cls, value: float) -> "GradeAverageGoal":
+        return cls(target_avg=float(value))
+
+    def evaluate(self, student: Student, program: StudyProgram, metrics: Optional[StudentMetrics] = None) -> GoalEvaluation:
         """
         Evaluate the goal for the student against the given study program.
         
@@ -176,16 +339,14 @@ class GradeAverageGoal(Goal):
         :type student: Student
         :param program: The study program instance.
         :type program: StudyProgram
+        :param metrics: Shared metrics of the current evaluation. Computed (as of today) if not provided.
+        :type metrics: Optional[StudentMetrics]
         :return: The goal evaluation for the student.
         :rtype: GoalEvaluation
         """
-        avg = student.get_average_grade()
-        if avg <= self.target_avg:
-            status = Status.GREEN
-        elif avg <= self.target_avg + 0.3:
-            status = Status.YELLOW
-        else:
-            status = Status.RED
+        metrics = metrics or student.metrics()
+        avg = metrics.average_grade
+        status = self.classify(avg, self.target_avg)
 
         return GoalEvaluation(
             title=self.get_title(),
@@ -202,10 +363,21 @@ class GradeAverageGoal(Goal):
 class DeadlineGoal(Goal):
     duration_months: int
 
+    # Classified on the lead of CP progress over time progress in percentage points (target 0).
+    higher_is_better: ClassVar[bool] = True
+    default_bands: ClassVar[tuple[ThresholdBand, ...]] = (ThresholdBand(Status.YELLOW, "offset", -10.0),)
+
     def get_title(self) -> str:
         return "Bachelorabschluss"
 
-    def evaluate(self, student: Student, program: StudyProgram) -> GoalEvaluation:
+    def get_value(self) -> float:
+        return self.duration_months
+
+    @classmethod
+    def from_value(cls, value: float) -> "DeadlineGoal":
+        return cls(duration_months=int(value))
+
+    def evaluate(self, student: Student, program: StudyProgram, metrics: Optional[StudentMetrics] = None) -> GoalEvaluation:
         """
         Evaluate the goal for the student against the given study program.
         
@@ -214,19 +386,16 @@ class DeadlineGoal(Goal):
         :type student: Student
         :param program: The study program instance.
         :type program: StudyProgram
+        :param metrics: Shared metrics of the current evaluation. Computed (as of today) if not provided.
+        :type metrics: Optional[StudentMetrics]
         :return: The goal evaluation for the student.
         :rtype: GoalEvaluation
         """
-        time_percent = student.get_time_progress_percentage(self.duration_months)
-        cp_percent = student.get_cp_progress_percentage(program.total_ects)
+        metrics = metrics or student.metrics()
+        time_percent = metrics.time_progress_percentage(self.duration_months)
+        cp_percent = metrics.cp_progress_percentage(program.total_ects)
         delta = cp_percent - time_percent
-
-        if delta >= 0:
-            status = Status.GREEN
-        elif delta >= -10:
-            status = Status.YELLOW
-        else:
-            status = Status.RED
+        status = self.classify(delta, 0.0)
 
         return GoalEvaluation(
             title=self.get_title(),
@@ -244,10 +413,21 @@ class DeadlineGoal(Goal):
 class CpPaceGoal(Goal):
     target_cp_per_month: float
 
+    higher_is_better: ClassVar[bool] = True
+    default_bands: ClassVar[tuple[ThresholdBand, ...]] = (ThresholdBand(Status.YELLOW, "factor", 0.8),)
+    arrows: ClassVar[dict[Status, str]] = {Status.GREEN: "↑", Status.YELLOW: "→", Status.RED: "↓"}
+
     def get_title(self) -> str:
         return "Arbeitstempo"
 
-    def evaluate(self, student: Student, program: StudyProgram) -> GoalEvaluation:
+    def get_value(self) -> float:
+        return self.target_cp_per_month
+
+    @classmethod
+    def from_value(cls, value: float) -> "CpPaceGoal":
+        return cls(target_cp_per_month=float(value))
+
+    def evaluate(self, student: Student, program: StudyProgram, metrics: Optional[StudentMetrics] = None) -> GoalEvaluation:
         """
         Evaluate the goal for the student against the given study program.
         
@@ -256,19 +436,15 @@ class CpPaceGoal(Goal):
         :type student: Student
         :param program: The study program instance.
         :type program: StudyProgram
+        :param metrics: Shared metrics of the current evaluation. Computed (as of today) if not provided.
+        :type metrics: Optional[StudentMetrics]
         :return: The goal evaluation for the student.
         :rtype: GoalEvaluation
         """
-        pace = student.get_cp_per_month()
-        if pace >= self.target_cp_per_month:
-            status = Status.GREEN
-            arrow = "↑"
-        elif pace >= self.target_cp_per_month * 0.8:
-            status = Status.YELLOW
-            arrow = "→"
-        else:
-            status = Status.RED
-            arrow = "↓"
+        metrics = metrics or student.metrics()
+        pace = metrics.cp_per_month()
+        status = self.classify(pace, self.target_cp_per_month)
+        arrow = self.arrows[status]
 
         return GoalEvaluation(
             title=self.get_title(),
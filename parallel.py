@@ -0,0 +1,116 @@
+# parallel.py
+# Process-pool evaluation of goal statuses for large cohorts (e.g. nightly recomputation).
+
+import itertools
+import os
+import datetime
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from database import Database
+from repositories import StudentRepository, ModuleRepository, EnrollmentRepository, ProgramRepository, GoalRuleRepository, EvaluationCacheRepository
+from evaluation_cache import EvaluationCache
+from services import DashboardService
+from model import GoalEvaluation
+from goal_engine import GOAL_REGISTRY
+
+@dataclass(frozen=True)
+# Configuration of the process pool: number of worker processes and students per shard.
+class ParallelEvaluationConfig:
+    workers: int = os.cpu_count() or 1
+    chunk_size: int = 500
+
+# Split the sorted student IDs into inclusive (id_from, id_to) ranges of at most chunk_size students.
+def shard_student_ids(student_ids: List[str], chunk_size: int) -> List[Tuple[str, str]]:
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be > 0")
+    return [
+        (student_ids[i], student_ids[min(i + chunk_size, len(student_ids)) - 1])
+        for i in range(0, len(student_ids), chunk_size)
+    ]
+
+# Worker entry point: opens its own read-only connection, loads one shard of aggregates
+# and evaluates them with the regular Goal implementations. With use_cache, valid results are
+# taken from the evaluation cache; the new cache entries are returned for the parent to store.
+def _evaluate_shard(
+    db_path: str, id_from: str, id_to: str, as_of: Optional[datetime.date] = None, use_cache: bool = False
+) -> tuple[dict[str, List[GoalEvaluation]], list]:
+    database = Database(db_path=db_path, read_only=True)
+    database.connect()
+    try:
+        # Spawned workers start with the class defaults; compile the rules stored in the database.
+        GOAL_REGISTRY.compile_rules(GoalRuleRepository(database=database).list_all())
+        service = DashboardService(
+            student_repository=StudentRepository(database=database),
+            module_repository=ModuleRepository(database=database),
+            enrollment_repository=EnrollmentRepository(database=database),
+            program_repository=ProgramRepository(database=database),
+            evaluation_cache=EvaluationCache(EvaluationCacheRepository(database=database), write_through=False) if use_cache else None,
+        )
+        results = service._evaluate_range(id_from, id_to, as_of or datetime.date.today())
+        return results, service.evaluation_cache.take_pending() if use_cache else []
+    finally:
+        database.close()
+
+# Evaluate all students of the database in a process pool and merge the per-shard results.
+def evaluate_cohort_parallel(
+    db_path: str,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    as_of: Optional[datetime.date] = None,
+    on_cache_entries: Optional[Callable[[list], None]] = None,
+) -> dict[str, List[GoalEvaluation]]:
+    results: dict[str, List[GoalEvaluation]] = {}
+    for shard_results in iter_cohort_parallel(db_path, workers, chunk_size, as_of, on_cache_entries):
+        results.update(shard_results)
+    return results
+
+# Evaluate all students in a process pool and yield the results shard by shard (in student_id
+# order), so callers can stream them without holding the whole cohort in memory: at most
+# 2 * workers shards are evaluated or waiting to be consumed at any time.
+# With on_cache_entries the workers use the evaluation cache (read-only) and the callback receives
+# the new cache entries of each shard, e.g. EvaluationCache.write of the parent.
+def iter_cohort_parallel(
+    db_path: str,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    as_of: Optional[datetime.date] = None,
+    on_cache_entries: Optional[Callable[[list], None]] = None,
+) -> Iterator[dict[str, List[GoalEvaluation]]]:
+    config = ParallelEvaluationConfig()
+    workers = workers or config.workers
+    chunk_size = chunk_size or config.chunk_size
+
+    database = Database(db_path=db_path, read_only=True)
+    database.connect()
+    try:
+        shards = shard_student_ids(StudentRepository(database=database).list_ids(), chunk_size)
+    finally:
+        database.close()
+
+    if not shards:
+        return
+
+    evaluated = 0
+    workers = min(workers, len(shards))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        use_cache = on_cache_entries is not None
+        # At most 2 * workers shards in flight: shards finished ahead of the consumer are held in
+        # memory until they are yielded, so a larger window would defeat streaming.
+        pending = iter(shards)
+        futures: deque = deque()
+        for id_from, id_to in itertools.islice(pending, 2 * workers):
+            futures.append(executor.submit(_evaluate_shard, db_path, id_from, id_to, as_of, use_cache))
+        while futures:
+            shard_results, cache_entries = futures.popleft().result()
+            for id_from, id_to in itertools.islice(pending, 1):
+                futures.append(executor.submit(_evaluate_shard, db_path, id_from, id_to, as_of, use_cache))
+            if cache_entries:
+                on_cache_entries(cache_entries)
+            evaluated += len(shard_results)
+            yield shard_results
+
+    logging.info("Cohort evaluated in parallel: %d students, %d shards, %d workers.", evaluated, len(shards), workers)
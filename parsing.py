@@ -0,0 +1,99 @@
+# parsing.py
+# Shared conversion of dates and grades for database rows and user input.
+#
+# Dates in the database are ISO strings (YYYY-MM-DD) or, with Database.ordinal_dates, integer day
+# ordinals (datetime.date.toordinal); readers accept both, so files with mixed rows stay valid.
+# The date columns have TEXT affinity, so SQLite hands ordinals back as digit strings; a value of up
+# to seven digits is an ordinal (ISO basic dates have eight).
+# The domain of dates is small (start dates and exam dates repeat across students), hence the
+# conversions are memoized in bounded caches. User input formats are detected by pattern instead
+# of trying parsers and catching their exceptions.
+
+import datetime
+import re
+from functools import lru_cache
+from typing import Optional, Union
+
+# Distinct dates kept per cache (about eleven years of days)
+DATE_CACHE_SIZE = 4096
+
+# Python ordinal 1 (0001-01-01) is Julian day 1721425.5; used to convert ordinals in SQL
+JULIAN_DAY_OFFSET = 1721424.5
+
+# Longest day ordinal (9999-12-31 is 3652059)
+_MAX_ORDINAL_DIGITS = 7
+
+# ISO extended (2026-02-17) or basic (20260217) format, like datetime.date.fromisoformat
+_ISO_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})|(\d{4})(\d{2})(\d{2})")
+_GERMAN_DATE = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4}|\d{2})")
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _date_from_text(text: str) -> datetime.date:
+    if len(text) <= _MAX_ORDINAL_DIGITS and text.isdigit():
+        return datetime.date.fromordinal(int(text))
+    return datetime.date.fromisoformat(text)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _date_from_ordinal(ordinal: int) -> datetime.date:
+    return datetime.date.fromordinal(ordinal)
+
+# Convert a date column value (ISO string, day ordinal or NULL) into a date.
+def parse_db_date(value: Union[str, int, None]) -> Optional[datetime.date]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return _date_from_ordinal(value)
+    return _date_from_text(value)
+
+# Day ordinal of a date column value (0 for NULL), e.g. for the snapshot columns.
+def db_date_ordinal(value: Union[str, int, None]) -> int:
+    if isinstance(value, int):
+        return value
+    date = parse_db_date(value)
+    return date.toordinal() if date is not None else 0
+
+# Convert a date into its column value in the configured storage format.
+def format_db_date(date: Optional[datetime.date], ordinal: bool = False) -> Union[str, int, None]:
+    if date is None:
+        return None
+    return date.toordinal() if ordinal else date.isoformat()
+
+# SQL expression normalizing a date column (ISO string or day ordinal) to an ISO string.
+def sql_iso_date(column: str) -> str:
+    return (
+        f"(CASE WHEN length({column}) BETWEEN 1 AND {_MAX_ORDINAL_DIGITS} AND {column} NOT GLOB '*[^0-9]*' "
+        f"THEN date({column} + {JULIAN_DAY_OFFSET}) ELSE {column} END)"
+    )
+
+# Parse a date typed by the user: ISO (2026-02-17) or German (17.02.2026, 17.02.26). Two-digit
+# years follow strptime's %y rule (69-99 -> 19xx, 00-68 -> 20xx). Returns None for empty input
+# and raises ValueError for anything else that is not a valid date.
+def parse_user_date(text: Optional[str]) -> Optional[datetime.date]:
+    s = (text or "").strip()
+    if not s:
+        return None
+    return _parse_user_date(s)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_user_date(s: str) -> datetime.date:
+    match = _ISO_DATE.fullmatch(s)
+    if match is not None:
+        year, month, day = (int(g) for g in match.groups() if g is not None)
+    else:
+        match = _GERMAN_DATE.fullmatch(s)
+        if match is None:
+            raise ValueError(f"Ungültiges Datum: {s}")
+        day, month, year = (int(g) for g in match.groups())
+        if len(match.group(3)) == 2:
+            year += 1900 if year >= 69 else 2000
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        raise ValueError(f"Ungültiges Datum: {s}") from None
+
+# Parse a grade typed by the user ("3,3" or "3.3"); returns None for empty input.
+def parse_grade(text: Optional[str]) -> Optional[float]:
+    s = (text or "").strip()
+    if not s:
+        return None
+    return float(s.replace(" ", "").replace(",", "."))
@@ -0,0 +1,171 @@
+# perf.py
+# Render-time instrumentation for the Tk views: measures the wall time of UI handlers, splits it
+# into database time (time spent in controller calls) and widget time, flags handlers exceeding the
+# frame budget and records the event-loop latency with a periodic after() heartbeat.
+# Everything is logged on the "perf" channel and can be exported as JSON for offline analysis.
+
+import functools
+import json
+import logging
+import time
+import tkinter as tk
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterable, List, Optional
+
+logger = logging.getLogger("perf")
+
+# Handlers (and heartbeat delays) above this wall time block the event loop noticeably.
+FRAME_BUDGET_MS = 50.0
+
+@dataclass(frozen=True)
+# One handler call. Nested handlers are recorded separately (depth > 0) and are included in the
+# time of the enclosing handler.
+class HandlerTiming:
+    handler: str
+    started_s: float
+    wall_ms: float
+    db_ms: float
+    widget_ms: float
+    depth: int
+    over_budget: bool
+
+@dataclass(frozen=True)
+# One heartbeat: how much later than scheduled the after() callback ran.
+class HeartbeatSample:
+    at_s: float
+    lag_ms: float
+
+@dataclass
+class UiProfiler:
+    budget_ms: float = FRAME_BUDGET_MS
+    # Maximum number of retained handler timings and heartbeat samples (oldest are dropped)
+    max_samples: int = 20000
+    timings: deque = field(init=False, repr=False)
+    heartbeats: deque = field(init=False, repr=False)
+    _origin: float = field(default_factory=time.perf_counter, init=False, repr=False)
+    _db_seconds: float = field(default=0.0, init=False, repr=False)
+    _db_depth: int = field(default=0, init=False, repr=False)
+    _handler_depth: int = field(default=0, init=False, repr=False)
+    _heartbeat_job: Optional[str] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.timings = deque(maxlen=self.max_samples)
+        self.heartbeats = deque(maxlen=self.max_samples)
+
+    # Time the given methods of a view class as UI handlers. Patching the class (before the
+    # views are created) also covers callbacks bound to widgets during render().
+    def instrument_handlers(self, cls: type, names: Iterable[str]) -> None:
+        for name in names:
+            setattr(cls, name, self._timed_handler(f"{cls.__name__}.{name}", getattr(cls, name)))
+
+    # Count the time spent in the public methods of the given class (e.g. the controller) as
+    # database time of the currently running handler.
+    def instrument_db(self, cls: type) -> None:
+        for name, member in list(vars(cls).items()):
+            if callable(member) and not name.startswith("_"):
+                setattr(cls, name, self._timed_db(member))
+
+    # Schedule the heartbeat on the Tk event loop; the lag of each tick is the event-loop latency.
+    def start_heartbeat(self, widget: tk.Misc, interval_ms: int = 100) -> None:
+        def tick(expected: float) -> None:
+            now = time.perf_counter()
+            lag_ms = max(0.0, (now - expected) * 1000.0)
+            self.heartbeats.append(HeartbeatSample(at_s=now - self._origin, lag_ms=lag_ms))
+            if lag_ms > self.budget_ms:
+                logger.warning("Event loop blocked: heartbeat %.1f ms late.", lag_ms)
+            self._heartbeat_job = widget.after(interval_ms, tick, time.perf_counter() + interval_ms / 1000.0)
+
+        self._heartbeat_job = widget.after(interval_ms, tick, time.perf_counter() + interval_ms / 1000.0)
+
+    def stop_heartbeat(self, widget: tk.Misc) -> None:
+        if self._heartbeat_job is not None:
+            widget.after_cancel(self._heartbeat_job)
+            self._heartbeat_job = None
+
+    # Per-handler statistics: calls, mean/p95/max wall time, mean database time, calls over budget.
+    def summary(self) -> dict[str, dict[str, float]]:
+        by_handler: dict[str, List[HandlerTiming]] = {}
+        for timing in self.timings:
+            by_handler.setdefault(timing.handler, []).append(timing)
+        out: dict[str, dict[str, float]] = {}
+        for handler, timings in sorted(by_handler.items()):
+            walls = sorted(t.wall_ms for t in timings)
+            out[handler] = {
+                "calls": len(walls),
+                "mean_ms": sum(walls) / len(walls),
+                "p95_ms": walls[min(len(walls) - 1, int(0.95 * len(walls)))],
+                "max_ms": walls[-1],
+                "mean_db_ms": sum(t.db_ms for t in timings) / len(timings),
+                "over_budget": sum(1 for t in timings if t.over_budget),
+            }
+        return out
+
+    def log_summary(self) -> None:
+        for handler, stats in self.summary().items():
+            logger.info(
+                "%s: calls=%d mean=%.1f ms p95=%.1f ms max=%.1f ms db=%.1f ms over_budget=%d",
+                handler, stats["calls"], stats["mean_ms"], stats["p95_ms"], stats["max_ms"],
+                stats["mean_db_ms"], stats["over_budget"],
+            )
+        if self.heartbeats:
+            lags = sorted(h.lag_ms for h in self.heartbeats)
+            logger.info("Event loop latency: p50=%.1f ms p99=%.1f ms max=%.1f ms",
+                        lags[len(lags) // 2], lags[min(len(lags) - 1, int(0.99 * len(lags)))], lags[-1])
+
+    # Write all recorded timings, heartbeat samples and the summary to a JSON file.
+    def export(self, path: str) -> None:
+        data = {
+            "budget_ms": self.budget_ms,
+            "summary": self.summary(),
+            "handlers": [asdict(t) for t in self.timings],
+            "heartbeats": [asdict(h) for h in self.heartbeats],
+        }
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, indent=1)
+        logger.info("UI performance data exported to %s (%d handler calls, %d heartbeats).",
+                    path, len(self.timings), len(self.heartbeats))
+
+    def _timed_handler(self, name: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            depth = self._handler_depth
+            self._handler_depth += 1
+            db_before = self._db_seconds
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                wall_ms = (time.perf_counter() - start) * 1000.0
+                db_ms = (self._db_seconds - db_before) * 1000.0
+                self._handler_depth -= 1
+                timing = HandlerTiming(
+                    handler=name,
+                    started_s=start - self._origin,
+                    wall_ms=wall_ms,
+                    db_ms=db_ms,
+                    widget_ms=max(0.0, wall_ms - db_ms),
+                    depth=depth,
+                    over_budget=wall_ms > self.budget_ms,
+                )
+                self.timings.append(timing)
+                if timing.over_budget:
+                    logger.warning("%s took %.1f ms (db %.1f ms, widgets %.1f ms), budget %.0f ms.",
+                                   name, wall_ms, db_ms, timing.widget_ms, self.budget_ms)
+                else:
+                    logger.debug("%s took %.1f ms (db %.1f ms).", name, wall_ms, db_ms)
+        return wrapper
+
+    def _timed_db(self, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Only the outermost call is counted, so nested controller calls are not counted twice
+            self._db_depth += 1
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._db_depth -= 1
+                if self._db_depth == 0:
+                    self._db_seconds += time.perf_counter() - start
+        return wrapper
@@ -0,0 +1,136 @@
+# planner.py
+# Module recommendations for students who fell behind: the remaining catalogue modules with the
+# least total ECTS whose completion brings the DeadlineGoal and CpPaceGoal of the student back to
+# GREEN. Both goals only depend on the earned ECTS at the evaluation date, so the ECTS required
+# are found with the goals' own evaluate() (binary search, GREEN is monotone in the earned ECTS),
+# and the modules are chosen by a bounded knapsack over the remaining modules grouped by ECTS.
+
+import dataclasses
+import datetime
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+
+from model import Student, Module, StudyProgram, StudentMetrics, Status, Goal, DeadlineGoal, CpPaceGoal
+
+# Goal types the planner can restore by completing modules
+PLANNED_GOALS: tuple[type[Goal], ...] = (DeadlineGoal, CpPaceGoal)
+# Their titles, as found in GoalEvaluation.title
+PLANNED_GOAL_TITLES: tuple[str, ...] = tuple(goal_cls.from_value(0).get_title() for goal_cls in PLANNED_GOALS)
+
+# Knapsack solutions kept per (ECTS classes, required ECTS); students of a cohort share them
+PLAN_CACHE_SIZE = 1024
+
+@dataclass(frozen=True)
+# Recommendation for one student at one date. modules is empty if the planned goals are already
+# GREEN (or the student has none); required_ects is None if even all remaining modules of the
+# catalogue are not enough.
+class ModulePlan:
+    as_of: datetime.date
+    earned_ects: int
+    required_ects: Optional[int]
+    modules: tuple[Module, ...]
+    # Titles of the planned goals that are not GREEN at as_of
+    off_track: tuple[str, ...]
+
+    @property
+    def feasible(self) -> bool:
+        return self.required_ects is not None
+
+    @property
+    def missing_ects(self) -> int:
+        return max(0, (self.required_ects or 0) - self.earned_ects)
+
+    @property
+    def planned_ects(self) -> int:
+        return sum(m.ects for m in self.modules)
+
+# Plan the modules for a student. Enrolled modules without a pass date are preferred among
+# modules of equal ECTS, since the student has already started them.
+def plan_modules(
+    student: Student, program: StudyProgram, catalogue: Iterable[Module], as_of: Optional[datetime.date] = None
+) -> ModulePlan:
+    metrics = student.metrics(as_of)
+    goals = [goal for goal in student.goals if isinstance(goal, PLANNED_GOALS)]
+    off_track = tuple(goal.get_title() for goal in goals if goal.evaluate(student, program, metrics).status != Status.GREEN)
+    if not off_track:
+        return ModulePlan(metrics.as_of, metrics.earned_ects, metrics.earned_ects, (), ())
+
+    passed = {e.module.module_id for e in student.enrollments if e.date_passed is not None}
+    started = {e.module.module_id for e in student.enrollments if e.date_passed is None}
+    remaining = [m for m in catalogue if m.module_id not in passed and m.ects > 0]
+    required = _required_ects(student, program, goals, metrics, metrics.earned_ects + sum(m.ects for m in remaining))
+    if required is None:
+        return ModulePlan(metrics.as_of, metrics.earned_ects, None, (), off_track)
+
+    # Modules of equal ECTS are interchangeable for the goals; started ones first, then by title
+    by_ects: dict[int, List[Module]] = {}
+    for module in sorted(remaining, key=lambda m: (m.module_id not in started, m.title.casefold(), m.module_id)):
+        by_ects.setdefault(module.ects, []).append(module)
+    classes = tuple(sorted(by_ects))
+    counts = _select(tuple((ects, len(by_ects[ects])) for ects in classes), required - metrics.earned_ects)
+    modules = [module for ects, count in zip(classes, counts) for module in by_ects[ects][:count]]
+    modules.sort(key=lambda m: (m.module_id not in started, -m.ects, m.title.casefold(), m.module_id))
+    return ModulePlan(metrics.as_of, metrics.earned_ects, required, tuple(modules), off_track)
+
+# Smallest earned ECTS in [metrics.earned_ects, reachable] at which all goals are GREEN, or None.
+def _required_ects(
+    student: Student, program: StudyProgram, goals: Sequence[Goal], metrics: StudentMetrics, reachable: int
+) -> Optional[int]:
+    def green(earned: int) -> bool:
+        hypothetical = dataclasses.replace(metrics, earned_ects=earned)
+        return all(goal.evaluate(student, program, hypothetical).status == Status.GREEN for goal in goals)
+
+    # A goal rule stored with higher_is_better = False would make more ECTS worse; then no plan exists
+    if not green(reachable):
+        return None
+    low, high = metrics.earned_ects, reachable
+    while low < high:
+        middle = (low + high) // 2
+        if green(middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+# Bounded knapsack: how many modules to take of each (ects, available) class so that their ECTS
+# reach `need` with the least total, and with the fewest modules among equal totals. A minimal
+# total is below need + the largest ECTS (dropping any module would fall short of need), which
+# bounds the table; per class at most total // ects modules are ever useful. Each class is
+# processed in O(limit).
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _select(classes: tuple[tuple[int, int], ...], need: int) -> tuple[int, ...]:
+    if need <= 0 or not classes:
+        return (0,) * len(classes)
+    limit = need + max(ects for ects, _ in classes)
+    # fewest[s]: fewest modules with exactly s ECTS over the classes processed so far
+    fewest: List[Optional[int]] = [0] + [None] * (limit - 1)
+    taken: List[List[int]] = []
+    for ects, available in classes:
+        most = min(available, (limit - 1) // ects)
+        previous, fewest = fewest, [None] * limit
+        choice = [0] * limit
+        # fewest[t] = min over count <= most of previous[t - count * ects] + count: per residue of
+        # t modulo ects a sliding-window minimum over (previous - position), kept in a monotone deque
+        for residue in range(min(ects, limit)):
+            window: deque[tuple[int, int]] = deque()
+            for position, total in enumerate(range(residue, limit, ects)):
+                if previous[total] is not None:
+                    value = previous[total] - position
+                    while window and window[-1][1] >= value:
+                        window.pop()
+                    window.append((position, value))
+                while window and position - window[0][0] > most:
+                    window.popleft()
+                if window:
+                    fewest[total] = window[0][1] + position
+                    choice[total] = position - window[0][0]
+        taken.append(choice)
+
+    total = next(s for s in range(need, limit) if fewest[s] is not None)
+    counts = [0] * len(classes)
+    for index in range(len(classes) - 1, -1, -1):
+        counts[index] = taken[index][total]
+        total -= counts[index] * classes[index][0]
+    return tuple(counts)
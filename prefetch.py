@@ -0,0 +1,121 @@
+# prefetch.py
+# Speculative evaluation of the students next to the one highlighted in the Target Monitoring
+# dropdown. The evaluations are kept in a small LRU cache, so switching to a prefetched student
+# only rebuilds the tiles. Students whose deadline or pace goal is not GREEN also get their module
+# plan (see planner.py) cached, computed in a step of its own. The prefetch runs one student per
+# step; the view drives the steps from the Tk event loop while it is idle, so the database
+# connection stays on the UI thread.
+
+import datetime
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+from model import GoalEvaluation, Status
+from planner import ModulePlan, PLANNED_GOAL_TITLES
+
+@dataclass
+# LRU cache of ready-to-render evaluations plus the queue of students to evaluate next.
+# Entries are dropped by invalidate() (wired to the service's invalidation listener) and when the
+# day changes, since evaluations depend on the current date.
+class EvaluationPrefetcher:
+    evaluate: Callable[[str], List[GoalEvaluation]]
+    # Module plan of a student; None disables planning
+    plan: Optional[Callable[[str], ModulePlan]] = None
+    capacity: int = 32
+    # Neighbours on each side of the highlighted student that are prefetched
+    radius: int = 2
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    _cache: "OrderedDict[str, tuple[datetime.date, List[GoalEvaluation]]]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _plans: dict[str, ModulePlan] = field(default_factory=dict, init=False, repr=False)
+    _queue: "deque[str]" = field(default_factory=deque, init=False, repr=False)
+    _plan_queue: "deque[str]" = field(default_factory=deque, init=False, repr=False)
+
+    # Return the cached evaluations of a student, or None if they must be computed.
+    def get(self, student_id: str) -> Optional[List[GoalEvaluation]]:
+        entry = self._cache.get(student_id)
+        if entry is None or entry[0] != datetime.date.today():
+            self.misses += 1
+            return None
+        self._cache.move_to_end(student_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, student_id: str, evaluations: List[GoalEvaluation]) -> None:
+        self._cache[student_id] = (datetime.date.today(), evaluations)
+        self._plans.pop(student_id, None)
+        self._cache.move_to_end(student_id)
+        while len(self._cache) > self.capacity:
+            evicted, _ = self._cache.popitem(last=False)
+            self._plans.pop(evicted, None)
+
+    # Cached module plan of a student with cached evaluations of today, or None.
+    def get_plan(self, student_id: str) -> Optional[ModulePlan]:
+        entry = self._cache.get(student_id)
+        if entry is None or entry[0] != datetime.date.today():
+            return None
+        return self._plans.get(student_id)
+
+    def put_plan(self, student_id: str, plan: ModulePlan) -> None:
+        if student_id in self._cache:
+            self._plans[student_id] = plan
+
+    def invalidate(self, student_ids: set[str]) -> None:
+        for student_id in student_ids:
+            self._cache.pop(student_id, None)
+            self._plans.pop(student_id, None)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._plans.clear()
+        self._queue.clear()
+        self._plan_queue.clear()
+
+    # Queue the student at `index` of `student_ids` and its neighbours, nearest first. The queue is
+    # replaced, so only the latest highlight is followed while the user moves through the list.
+    def schedule(self, student_ids: Sequence[str], index: int) -> None:
+        self._queue.clear()
+        self._plan_queue.clear()
+        if not 0 <= index < len(student_ids):
+            return
+        candidates = [index]
+        for distance in range(1, self.radius + 1):
+            candidates += [index + distance, index - distance]
+        for i in candidates:
+            if 0 <= i < len(student_ids) and student_ids[i] not in self._cache:
+                self._queue.append(student_ids[i])
+
+    def pending(self) -> bool:
+        return bool(self._queue or self._plan_queue)
+
+    # Evaluate the next queued student, or once all are evaluated plan the next one that needs a
+    # plan; returns True while more work is queued. A failing student is logged and skipped.
+    def step(self) -> bool:
+        while self._queue:
+            student_id = self._queue.popleft()
+            if student_id in self._cache:
+                continue
+            try:
+                evaluations = self.evaluate(student_id)
+                self.put(student_id, evaluations)
+                if self.plan is not None and needs_plan(evaluations):
+                    self._plan_queue.append(student_id)
+            except Exception as e:
+                logging.warning(f"Prefetch of student {student_id} failed: {e}")
+            return self.pending()
+        while self._plan_queue:
+            student_id = self._plan_queue.popleft()
+            if student_id not in self._cache or student_id in self._plans:
+                continue
+            try:
+                self.put_plan(student_id, self.plan(student_id))
+            except Exception as e:
+                logging.warning(f"Prefetch of the module plan of student {student_id} failed: {e}")
+            break
+        return self.pending()
+
+# True if a deadline or pace goal is not GREEN, i.e. the planner has something to recommend.
+def needs_plan(evaluations: List[GoalEvaluation]) -> bool:
+    return any(e.title in PLANNED_GOAL_TITLES and e.status != Status.GREEN for e in evaluations)
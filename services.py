@@ -1,14 +1,20 @@
 # services.py
 import datetime
-from typing import List, Optional
+from typing import Callable, Iterator, List, Optional
 from dataclasses import dataclass, field
 import logging
 
-from repositories import StudentRepository, ModuleRepository, EnrollmentRepository
+from repositories import StudentRepository, ModuleRepository, EnrollmentRepository, ProgramRepository, ChangeLogRepository, ArchiveRepository, Change
+from snapshot import DatasetSnapshot, open_snapshot, write_snapshot
+from evaluation_cache import EvaluationCache
+from planner import ModulePlan, plan_modules
+from write_behind import WriteBehindQueue, WriteFailure, FlushResult
 from model import (
     Student,
     Module,
+    Enrollment,
     StudyProgram,
+    DEFAULT_PROGRAM,
     Goal,
     GoalEvaluation,
     GradeAverageGoal,
@@ -16,36 +22,94 @@ from model import (
     CpPaceGoal,
 )
 
+@dataclass
+# In-memory inverted index module_id -> enrolled student IDs, plus the known ECTS per module.
+# Lets the service determine which students are affected by a module change without a query.
+class ModuleIndex:
+    students_by_module: dict[str, set[str]] = field(default_factory=dict)
+    ects_by_module: dict[str, int] = field(default_factory=dict)
+
+    def add_enrollment(self, module_id: str, student_id: str) -> None:
+        self.students_by_module.setdefault(module_id, set()).add(student_id)
+
+    def students(self, module_id: str) -> set[str]:
+        return set(self.students_by_module.get(module_id, ()))
+
+    # Record the module's ECTS; returns True if they differ from the previously known value.
+    def update_module(self, module: Module) -> bool:
+        previous = self.ects_by_module.get(module.module_id)
+        self.ects_by_module[module.module_id] = module.ects
+        return previous is not None and previous != module.ects
+
 @dataclass
 # Service layer for the Dashboard application, responsible for orchestration between repositories and the controller.
 class DashboardService:
     student_repository: StudentRepository
     module_repository: ModuleRepository
     enrollment_repository: EnrollmentRepository
+    program_repository: ProgramRepository
 
-    # Default study program configuration, can be extended to support multiple programs in the future.
+    # Default study program configuration, used for students without a (known) program link.
     def create_default_program() -> StudyProgram:
         logging.info("Default StudyProgram created.")
-        return StudyProgram(
-            name="Angewandte Künstliche Intelligenz",
-            total_ects=180,
-            duration_months=48,
-    )
+        return DEFAULT_PROGRAM
 
     _program: StudyProgram = field(default_factory=create_default_program)
+    # Optional on-disk snapshot for fast cold starts; None disables the snapshot.
+    snapshot_path: Optional[str] = None
+    _snapshot: Optional[DatasetSnapshot] = field(default=None, init=False, repr=False)
+    _snapshot_checked: bool = field(default=False, init=False, repr=False)
+    # Optional write-behind queue for UI-originated upserts; None writes through immediately.
+    write_behind: Optional[WriteBehindQueue] = None
+    _written_kinds: set[str] = field(default_factory=set, init=False, repr=False)
+    _write_failures: List[WriteFailure] = field(default_factory=list, init=False, repr=False)
+    # Module -> students index (loaded lazily) and listeners notified with the IDs of students
+    # whose evaluation inputs changed, so caches can invalidate only those students.
+    _module_index: Optional[ModuleIndex] = field(default=None, init=False, repr=False)
+    _invalidation_listeners: List[Callable[[set[str]], None]] = field(default_factory=list, init=False, repr=False)
+    # In-memory program catalog (program_id -> StudyProgram), loaded lazily on first use.
+    _program_catalog: Optional[dict[str, StudyProgram]] = field(default=None, init=False, repr=False)
+    # Row versions last read or written, (kind, *key) -> version; writes of these rows are
+    # compare-and-swap, so changes of another instance are not silently overwritten.
+    _row_versions: dict[tuple, int] = field(default_factory=dict, init=False, repr=False)
+    # Last seen PRAGMA data_version (see check_external_changes)
+    _data_version: Optional[int] = field(default=None, init=False, repr=False)
+    # Optional change log; with it external changes invalidate only the affected students.
+    change_log_repository: Optional[ChangeLogRepository] = None
+    _change_seq: Optional[int] = field(default=None, init=False, repr=False)
+    # Optional persistent cache of evaluation results for the batch evaluations (see evaluation_cache.py).
+    evaluation_cache: Optional[EvaluationCache] = None
+    # Optional archive of finished students; archived students are only read on request (include_archived).
+    archive_repository: Optional[ArchiveRepository] = None
 
     # Methods to handle business logic for students, modules, enrollments, and goal evaluations.
     def update_student_data(self, student: Student) -> None:
-        self.student_repository.upsert(student)
+        key = (student.student_id,)
+        self._write("student", key, student, self._versioned("student", key, lambda v: self.student_repository.upsert(student, v)))
+        self._invalidate({student.student_id})
 
-    def get_student_aggregate(self, student_id: str) -> Student:
+    # With include_archived a student missing from the hot tables is looked up in the archive.
+    def get_student_aggregate(self, student_id: str, include_archived: bool = False) -> Student:
+        self._sync_pending_writes()
         student = self.student_repository.get_aggregate_by_id(student_id)
+        if student is None and include_archived and self.archive_repository is not None:
+            student = self.archive_repository.get_aggregate_by_id(student_id)
+            if student is not None:
+                return student
         if student is None:
             raise ValueError(f"Student not found: {student_id}")
+        self._remember_version("student", (student_id,), student.version)
+        for enrollment in student.enrollments:
+            self._remember_version("enrollment", (student_id, enrollment.module.module_id), enrollment.version)
         return student
 
+    # Only students enrolled in the module are invalidated, and only if its ECTS changed
+    # (the title does not influence any evaluation).
     def add_module_to_catalogue(self, module: Module) -> None:
-        self.module_repository.upsert(module)
+        key = (module.module_id,)
+        self._write("module", key, module, self._versioned("module", key, lambda v: self.module_repository.upsert(module, v)))
+        if self._modules().update_module(module):
+            self._invalidate(self._modules().students(module.module_id))
 
     def update_study_progress(
         self,
@@ -54,17 +118,291 @@ class DashboardService:
         grade: Optional[float],
         date_passed: Optional[datetime.date],
     ) -> None:
-        self.enrollment_repository.upsert(student_id, module_id, grade, date_passed)
+        key = (student_id, module_id)
+        upsert = self._versioned("enrollment", key, lambda v: self.enrollment_repository.upsert(student_id, module_id, grade, date_passed, v))
+
+        # The module index learns the enrollment only once it is committed, so a write rejected at
+        # flush time leaves no trace; an index not built yet will read it from the database.
+        def apply() -> None:
+            upsert()
+            self.enrollment_repository.database.after_commit(lambda: self._index_enrollment(module_id, student_id))
+
+        self._write("enrollment", key, (student_id, module_id, grade, date_passed), apply)
+        self._invalidate({student_id})
+
+    def _index_enrollment(self, module_id: str, student_id: str) -> None:
+        if self._module_index is not None:
+            self._module_index.add_enrollment(module_id, student_id)
+
+    # Save many enrollments at once (bulk entry): (student_id, module_id, grade, date_passed) rows
+    # are written immediately in one transaction, bypassing the write-behind queue, so the caller
+    # sees conflicts and foreign key errors directly. Queued writes are flushed first.
+    def update_study_progress_many(self, rows: List[tuple[str, str, Optional[float], Optional[datetime.date]]]) -> None:
+        if not rows:
+            return
+        self._sync_pending_writes()
+        expected = {
+            (student_id, module_id): self._row_versions[("enrollment", student_id, module_id)]
+            for student_id, module_id, *_ in rows
+            if ("enrollment", student_id, module_id) in self._row_versions
+        }
+        versions = self.enrollment_repository.upsert_many(rows, expected)
+        for key, version in versions.items():
+            self._remember_version("enrollment", key, version)
+        for student_id, module_id, *_ in rows:
+            self._modules().add_enrollment(module_id, student_id)
+        self._written_kinds.add("enrollment")
+        self._invalidate({student_id for student_id, *_ in rows})
+
+    # Module-centric queries
+    def list_module_enrollments(self, module_id: str) -> List[tuple[str, Enrollment]]:
+        self._sync_pending_writes()
+        enrollments = self.enrollment_repository.list_by_module(module_id)
+        for student_id, enrollment in enrollments:
+            self._remember_version("enrollment", (student_id, module_id), enrollment.version)
+        return enrollments
+
+    def list_module_students(self, module_id: str) -> set[str]:
+        return self._modules().students(module_id)
+
+    def get_module_pass_rate(self, module_id: str) -> Optional[float]:
+        self._sync_pending_writes()
+        return self.module_repository.get_pass_rate(module_id)
+
+    # Register a callback receiving the IDs of students whose evaluation inputs changed.
+    def add_invalidation_listener(self, listener: Callable[[set[str]], None]) -> None:
+        self._invalidation_listeners.append(listener)
+
+    # Detect commits of other instances on the shared database via PRAGMA data_version (no table
+    # scan). On a change the caches are updated from the change log (O(changes)) or, without a
+    # complete log, dropped with all students invalidated; returns True so the caller can refresh
+    # its views. The first call only records the baseline.
+    def check_external_changes(self) -> bool:
+        version = self.student_repository.database.data_version()
+        changed = self._data_version is not None and version != self._data_version
+        self._data_version = version
+        if self.change_log_repository is not None and self._change_seq is None:
+            self._change_seq = self.change_log_repository.latest_seq()
+        if not changed:
+            return False
+        logging.info("External database change detected.")
+        self._program_catalog = None
+        log = self.change_log_repository
+        if log is not None and self._change_seq is not None and log.covers(self._change_seq):
+            self._invalidate(self._apply_changes(log.changes_since(self._change_seq)))
+        else:
+            self._module_index = None
+            if log is not None:
+                self._change_seq = log.latest_seq()
+            if self._invalidation_listeners:
+                self._invalidate(set(self.student_repository.list_ids()))
+        return True
+
+    # Bring the module index up to date with logged changes and return the affected students.
+    def _apply_changes(self, changes: Iterator[Change]) -> set[str]:
+        affected: set[str] = set()
+        index = self._module_index
+        for change in changes:
+            self._change_seq = change.seq
+            if change.student_id is not None:
+                affected.add(change.student_id)
+            if change.entity == "enrollment" and index is not None:
+                index.add_enrollment(change.module_id, change.student_id)
+            elif change.entity == "module":
+                # Like add_module_to_catalogue: enrolled students are affected by an ECTS change
+                module = self.module_repository.get_by_id(change.module_id)
+                if index is None:
+                    affected.update(self.module_repository.list_student_ids(change.module_id))
+                elif module is not None and index.update_module(module):
+                    affected.update(index.students(change.module_id))
+        return affected
+
+    def _invalidate(self, student_ids: set[str]) -> None:
+        if not student_ids:
+            return
+        for listener in self._invalidation_listeners:
+            listener(student_ids)
+
+    # Build the module index once from the covering index; afterwards it is kept up to date by the write methods.
+    def _modules(self) -> ModuleIndex:
+        if self._module_index is None:
+            self._sync_pending_writes()
+            index = ModuleIndex()
+            for module in self.module_repository.list_all():
+                index.ects_by_module[module.module_id] = module.ects
+            for module_id, student_id in self.enrollment_repository.list_module_student_pairs():
+                index.add_enrollment(module_id, student_id)
+            self._module_index = index
+            logging.info("Module index built: %d modules.", len(index.ects_by_module))
+        return self._module_index
 
     def evaluate_student_goals(self, student: Student) -> List[GoalEvaluation]:
-        aggregate = student if student.goals else self.get_student_aggregate(student.student_id)
-        return aggregate.evaluate_all_goals(self._program)
+        aggregate = student if student.goals or student.archived else self.get_student_aggregate(student.student_id)
+        return aggregate.evaluate_all_goals(self.get_program(aggregate.program_id))
+
+    # Recommend the remaining catalogue modules that bring the student's deadline and pace goals
+    # back to GREEN (see planner.py).
+    def plan_student_modules(self, student_id: str, as_of: Optional[datetime.date] = None) -> ModulePlan:
+        student = self.get_student_aggregate(student_id)
+        return plan_modules(student, self.get_program(student.program_id), self.list_modules(), as_of)
+
+    # Evaluate the goals of all students. With workers > 1 the cohort is sharded by student_id range
+    # and evaluated in a process pool (see parallel.py), otherwise in this process.
+    def evaluate_all_students(self, workers: int = 1, chunk_size: int = 500) -> dict[str, List[GoalEvaluation]]:
+        if workers > 1:
+            from parallel import evaluate_cohort_parallel
+            self._sync_pending_writes()
+            # The worker processes read the file; an in-memory database is written there first
+            self.student_repository.database.persist()
+            return evaluate_cohort_parallel(
+                self.student_repository.database.db_path, workers=workers, chunk_size=chunk_size, on_cache_entries=self._cache_writer()
+            )
+        self._sync_pending_writes()
+        return self._evaluate_range(None, None, datetime.date.today())
+
+    # Evaluate all students shard by shard (chunk_size students each, in student_id order) and yield
+    # the results per shard; with workers > 1 the shards are evaluated in a process pool.
+    # Used for streaming batch jobs that should not hold the whole cohort in memory.
+    def iter_evaluations(
+        self, workers: int = 1, chunk_size: int = 500, as_of: Optional[datetime.date] = None
+    ) -> Iterator[dict[str, List[GoalEvaluation]]]:
+        from parallel import iter_cohort_parallel, shard_student_ids
+        self._sync_pending_writes()
+        if workers > 1:
+            self.student_repository.database.persist()
+            yield from iter_cohort_parallel(self.student_repository.database.db_path, workers, chunk_size, as_of, self._cache_writer())
+            return
+        as_of = as_of or datetime.date.today()
+        for id_from, id_to in shard_student_ids(self.student_repository.list_ids(), chunk_size):
+            yield self._evaluate_range(id_from, id_to, as_of)
+
+    # Evaluate the students of an (inclusive) student_id range. With the evaluation cache only
+    # students whose inputs changed are loaded and evaluated, in runs of consecutive IDs; the
+    # results are returned in student_id order either way.
+    def _evaluate_range(self, id_from: Optional[str], id_to: Optional[str], as_of: datetime.date) -> dict[str, List[GoalEvaluation]]:
+        if self.evaluation_cache is None:
+            return self.evaluate_students(self.student_repository.list_aggregates(id_from, id_to), as_of)
 
-    def list_students(self) -> List[Student]:
+        cached, hashes = self.evaluation_cache.lookup(id_from, id_to, as_of, self.get_program)
+        computed: dict[str, List[GoalEvaluation]] = {}
+        run: List[str] = []
+        for student_id in [*hashes, None]:
+            if student_id is not None and student_id not in cached:
+                run.append(student_id)
+            elif run:
+                computed.update(self.evaluate_students(self.student_repository.list_aggregates(run[0], run[-1]), as_of))
+                run = []
+        if computed:
+            self.evaluation_cache.store(as_of, hashes, computed)
+        logging.info("Evaluation cache: %d results reused, %d evaluated.", len(cached), len(computed))
+        return {student_id: cached[student_id] if student_id in cached else computed[student_id] for student_id in hashes}
+
+    # Callback storing the cache entries computed by worker processes, or None without a cache.
+    def _cache_writer(self) -> Optional[Callable[[list], None]]:
+        return self.evaluation_cache.write if self.evaluation_cache is not None else None
+
+    # Evaluate the goals of the given student aggregates. Students are grouped by program so that
+    # each program is resolved once per group instead of once per student.
+    # All students are evaluated as of the same date (default: today).
+    def evaluate_students(self, students: List[Student], as_of: Optional[datetime.date] = None) -> dict[str, List[GoalEvaluation]]:
+        as_of = as_of or datetime.date.today()
+        by_program: dict[Optional[str], List[Student]] = {}
+        for student in students:
+            by_program.setdefault(student.program_id, []).append(student)
+
+        results: dict[str, List[GoalEvaluation]] = {}
+        for program_id, students in by_program.items():
+            program = self.get_program(program_id)
+            for student in students:
+                results[student.student_id] = student.evaluate_all_goals(program, as_of)
+        logging.info("Goals evaluated for %d students in %d programs.", len(results), len(by_program))
+        return results
+
+    # Resolve a program from the cached catalog; unknown or missing IDs fall back to the default program.
+    def get_program(self, program_id: Optional[str]) -> StudyProgram:
+        if program_id is None:
+            return self._program
+        return self._programs().get(program_id, self._program)
+
+    def list_programs(self) -> List[StudyProgram]:
+        return list(self._programs().values())
+
+    def add_program(self, program: StudyProgram) -> None:
+        self.program_repository.upsert(program)
+        self._programs()[program.program_id] = program
+
+    # Load the program catalog once; subsequent lookups are served from memory.
+    def _programs(self) -> dict[str, StudyProgram]:
+        if self._program_catalog is None:
+            self._program_catalog = {p.program_id: p for p in self.program_repository.list_all()}
+            logging.info("Program catalog loaded: %d programs.", len(self._program_catalog))
+        return self._program_catalog
+
+    def list_students(self, include_archived: bool = False) -> List[Student]:
+        self._sync_pending_writes()
+        if include_archived and self.archive_repository is not None:
+            students = {s.student_id: s for s in self.archive_repository.list_all()}
+            # Active rows win over a leftover archive row of the same student
+            students.update((s.student_id, s) for s in self.student_repository.list_all())
+            return sorted(students.values(), key=lambda s: (s.name.casefold(), s.student_id))
+        snapshot = self._fresh_snapshot()
+        if snapshot is not None:
+            return snapshot.students()
         return self.student_repository.list_all()
 
+    # Move students with a completed degree whose data has not changed for quiet_days days into the
+    # archive (see ArchiveRepository.list_candidates); returns their IDs. With dry_run the
+    # candidates are only listed.
+    def archive_finished_students(self, quiet_days: int = 60, dry_run: bool = False) -> List[str]:
+        if self.archive_repository is None:
+            raise RuntimeError("No archive configured")
+        self._sync_pending_writes()
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=quiet_days)
+        student_ids = self.archive_repository.list_candidates(
+            settled_before=cutoff.date().isoformat(),
+            unchanged_since=cutoff.strftime("%Y-%m-%dT%H:%M:%S"),
+            default_total_ects=self._program.total_ects,
+        )
+        if dry_run or not student_ids:
+            return student_ids
+        self.archive_repository.archive_students(student_ids)
+        # The enrollments of the archived students left the hot tables
+        self._module_index = None
+        self._invalidate(set(student_ids))
+        return student_ids
+
+    def restore_archived_student(self, student_id: str) -> None:
+        if self.archive_repository is None:
+            raise RuntimeError("No archive configured")
+        self._sync_pending_writes()
+        self.archive_repository.restore(student_id)
+        self._module_index = None
+        self._invalidate({student_id})
+
     def list_modules(self) -> List[Module]:
-        return self.module_repository.list_all()
+        self._sync_pending_writes()
+        snapshot = self._fresh_snapshot()
+        if snapshot is not None:
+            return snapshot.modules()
+        modules = self.module_repository.list_all()
+        for module in modules:
+            self._remember_version("module", (module.module_id,), module.version)
+        return modules
+
+    # Return the mapped snapshot while it matches the database; once the database has changed
+    # the snapshot is dropped and all reads go to SQLite again.
+    def _fresh_snapshot(self) -> Optional[DatasetSnapshot]:
+        if self.snapshot_path is None:
+            return None
+        database = self.student_repository.database
+        if not self._snapshot_checked:
+            self._snapshot_checked = True
+            self._snapshot = open_snapshot(database, self.snapshot_path)
+        if self._snapshot is not None and not self._snapshot.is_fresh(database):
+            logging.info("Snapshot is stale, reading from SQLite.")
+            self._snapshot.close()
+            self._snapshot = None
+        return self._snapshot
 
     def update_student_goals(self, student_id: str, duration_months: int, target_avg: float, target_cp_per_month: float) -> None:
         goals: List[Goal] = [
@@ -72,9 +410,85 @@ class DashboardService:
             CpPaceGoal(target_cp_per_month=target_cp_per_month),
             DeadlineGoal(duration_months=duration_months),
         ]
-        self.student_repository.save_goals(student_id, goals)
+        self._write("goals", (student_id,), goals, lambda: self.student_repository.save_goals(student_id, goals))
+        self._invalidate({student_id})
+
+    # Flush the write-behind queue (always if force, otherwise only when due) and report what was
+    # written and which writes failed since the last call, including implicit flushes before reads.
+    def flush_writes(self, force: bool = True) -> FlushResult:
+        if self.write_behind is not None and (force or self.write_behind.is_due()):
+            self._collect(self.write_behind.flush())
+        result = FlushResult(
+            written=frozenset(self._written_kinds),
+            failures=tuple(self._write_failures),
+            deferred=len(self.write_behind) if self.write_behind is not None else 0,
+        )
+        self._written_kinds.clear()
+        self._write_failures.clear()
+        return result
+
+    # Route a write through the write-behind queue, or perform it immediately without one.
+    def _write(self, kind: str, key: tuple, row, apply) -> None:
+        if self.write_behind is None:
+            apply()
+            self._written_kinds.add(kind)
+        else:
+            self.write_behind.enqueue(kind, key, row, apply)
+
+    # Wrap a versioned upsert (taking the expected version, returning the new one) into the apply
+    # callable of a write. Rows never read in this session are written without version check;
+    # the new version is only recorded once the write is committed.
+    def _versioned(self, kind: str, key: tuple, upsert: Callable[[Optional[int]], int]) -> Callable[[], None]:
+        row_key = (kind, *key)
+
+        def apply() -> None:
+            version = upsert(self._row_versions.get(row_key))
+            self.student_repository.database.after_commit(lambda: self._row_versions.__setitem__(row_key, version))
+
+        return apply
+
+    def _remember_version(self, kind: str, key: tuple, version: int) -> None:
+        if version > 0:
+            self._row_versions[(kind, *key)] = version
+
+    # Read-your-writes: pending writes are flushed before reading from the database.
+    def _sync_pending_writes(self) -> None:
+        if self.write_behind is not None and len(self.write_behind):
+            self._collect(self.write_behind.flush())
+
+    def _collect(self, result: FlushResult) -> None:
+        self._written_kinds.update(result.written)
+        self._write_failures.extend(result.failures)
 
     def close(self) -> None:
+        if self.write_behind is not None:
+            result = self.write_behind.flush()
+            for failure in result.failures:
+                logging.error(f"Write lost on shutdown: {failure.kind} {failure.key}: {failure.error}.")
+            if result.deferred:
+                logging.error(f"{result.deferred} writes lost on shutdown, the database stayed locked.")
+        self._save_snapshot()
+        if self.change_log_repository is not None:
+            self.change_log_repository.close()
+        if self.evaluation_cache is not None:
+            self.evaluation_cache.repository.close()
+        if self.archive_repository is not None:
+            self.archive_repository.close()
+        self.program_repository.close()
         self.enrollment_repository.close()
         self.module_repository.close()
         self.student_repository.close()
+
+    # Rewrite the snapshot on shutdown if it is missing or stale, so the next start can use it.
+    def _save_snapshot(self) -> None:
+        if self.snapshot_path is None or self.student_repository.database.conn is None:
+            return
+        try:
+            if self._fresh_snapshot() is None:
+                write_snapshot(self.student_repository.database, self.snapshot_path)
+        except (OSError, RuntimeError) as e:
+            logging.error(f"Snapshot could not be written: {e}.")
+        finally:
+            if self._snapshot is not None:
+                self._snapshot.close()
+                self._snapshot = None
@@ -0,0 +1,267 @@
+# snapshot.py
+# Compact, memory-mapped binary snapshot of the denormalized dataset for fast cold starts.
+#
+# File layout (little endian, all sections 8-byte aligned):
+#   header   : magic, format version, change counter and file size of the database it was taken from
+#   directory: (offset, length) per section, in the order of SECTIONS
+#   sections : typed arrays (int32/float64) and string columns (uint32 count, uint32 offsets, UTF-8 blob)
+
+import array
+import datetime
+import logging
+import math
+import mmap
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+from database import Database
+from model import Student, Module, Enrollment
+from parsing import db_date_ordinal
+from goal_engine import GOAL_REGISTRY
+
+MAGIC = b"IUDS"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sIQQ")
+
+# Section name -> array typecode ("s" marks a string column)
+SECTIONS: Tuple[Tuple[str, str], ...] = (
+    ("student_id", "s"),
+    ("student_name", "s"),
+    ("student_program", "s"),
+    ("student_start", "i"),
+    ("module_id", "s"),
+    ("module_title", "s"),
+    ("module_ects", "i"),
+    ("enrollment_student", "i"),
+    ("enrollment_module", "i"),
+    ("enrollment_grade", "d"),
+    ("enrollment_passed", "i"),
+    ("goal_student", "i"),
+    ("goal_type", "s"),
+    ("goal_value", "d"),
+)
+_DIRECTORY = struct.Struct("<" + "QQ" * len(SECTIONS))
+
+# Encode a list of strings as count, offsets (count + 1 entries) and the concatenated UTF-8 blob.
+def _encode_strings(values: Sequence[str]) -> bytes:
+    blobs = [v.encode("utf-8") for v in values]
+    offsets = array.array("I", [len(blobs), 0])
+    for b in blobs:
+        offsets.append(offsets[-1] + len(b))
+    return offsets.tobytes() + b"".join(blobs)
+
+@dataclass
+# Read access to a string column without decoding the whole column up front.
+class _StringColumn:
+    offsets: memoryview
+    blob: memoryview
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+# Read the version stamp (change counter, file size) of the database the snapshot must match.
+def _version_stamp(database: Database) -> Optional[Tuple[int, int]]:
+    counter = database.change_counter()
+    if counter is None:
+        return None
+    return counter, os.path.getsize(database.db_path)
+
+# Write a snapshot of the current database content. The file is replaced atomically.
+def write_snapshot(database: Database, path: str) -> None:
+    if database.conn is None:
+        raise RuntimeError("Database not connected")
+    stamp = _version_stamp(database)
+    if stamp is None:
+        raise RuntimeError("Snapshots require a file-backed database in rollback journal mode")
+
+    cursor = database.conn.cursor()
+    students = cursor.execute(
+        "SELECT student_id, name, program_id, start_date FROM student ORDER BY name COLLATE NOCASE, student_id"
+    ).fetchall()
+    modules = cursor.execute(
+        "SELECT module_id, title, ects FROM module ORDER BY title COLLATE NOCASE, module_id"
+    ).fetchall()
+    student_index = {row[0]: i for i, row in enumerate(students)}
+    module_index = {row[0]: i for i, row in enumerate(modules)}
+
+    # Enrollments and goals are sorted by student index so that a student's rows form one contiguous range.
+    # Within a student, enrollments keep the module_id order of the repositories.
+    enrollments = sorted(
+        (
+            (student_index[sid], module_index[mid], grade, passed)
+            for sid, mid, grade, passed in cursor.execute(
+                "SELECT student_id, module_id, grade, date_passed FROM enrollment ORDER BY student_id, module_id"
+            )
+        ),
+        key=lambda e: e[0],
+    )
+    goals = sorted(
+        (
+            (student_index[sid], goal_type, value)
+            for sid, goal_type, value in cursor.execute(
+                "SELECT student_id, goal_type, value FROM student_goals ORDER BY student_id, goal_type"
+            )
+        ),
+        key=lambda g: g[0],
+    )
+
+    columns = {
+        "student_id": [r[0] for r in students],
+        "student_name": [r[1] for r in students],
+        "student_program": [r[2] or "" for r in students],
+        "student_start": [db_date_ordinal(r[3]) for r in students],
+        "module_id": [r[0] for r in modules],
+        "module_title": [r[1] for r in modules],
+        "module_ects": [int(r[2]) for r in modules],
+        "enrollment_student": [e[0] for e in enrollments],
+        "enrollment_module": [e[1] for e in enrollments],
+        "enrollment_grade": [math.nan if e[2] is None else float(e[2]) for e in enrollments],
+        "enrollment_passed": [db_date_ordinal(e[3]) for e in enrollments],
+        "goal_student": [g[0] for g in goals],
+        "goal_type": [g[1] for g in goals],
+        "goal_value": [float(g[2]) for g in goals],
+    }
+
+    payloads = [
+        _encode_strings(columns[name]) if code == "s" else array.array(code, columns[name]).tobytes()
+        for name, code in SECTIONS
+    ]
+    directory: List[int] = []
+    offset = _HEADER.size + _DIRECTORY.size
+    for payload in payloads:
+        offset += -offset % 8
+        directory.extend((offset, len(payload)))
+        offset += len(payload)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(_HEADER.pack(MAGIC, FORMAT_VERSION, *stamp))
+        fh.write(_DIRECTORY.pack(*directory))
+        for (section_offset, _), payload in zip(zip(directory[::2], directory[1::2]), payloads):
+            fh.write(b"\0" * (section_offset - fh.tell()))
+            fh.write(payload)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+    logging.info("Snapshot written: %s (students=%d, modules=%d, enrollments=%d)", path, len(students), len(modules), len(enrollments))
+
+@dataclass
+# Memory-mapped snapshot; columns are zero-copy views into the mapped file.
+class DatasetSnapshot:
+    path: str
+    stamp: Tuple[int, int]
+    _mmap: mmap.mmap = field(repr=False)
+    _columns: dict = field(default_factory=dict, repr=False)
+    _views: List[memoryview] = field(default_factory=list, repr=False)
+
+    # Check that the database has not been modified since the snapshot was written.
+    def is_fresh(self, database: Database) -> bool:
+        return _version_stamp(database) == self.stamp
+
+    def column(self, name: str):
+        return self._columns[name]
+
+    # Students without enrollments or goals, in the order of StudentRepository.list_all.
+    def students(self) -> List[Student]:
+        ids, names, programs, starts = (self._columns[n] for n in ("student_id", "student_name", "student_program", "student_start"))
+        return [
+            Student(
+                student_id=ids[i],
+                name=names[i],
+                start_date=datetime.date.fromordinal(starts[i]),
+                program_id=programs[i] or None,
+            )
+            for i in range(len(ids))
+        ]
+
+    # Modules in the order of ModuleRepository.list_all.
+    def modules(self) -> List[Module]:
+        ids, titles, ects = (self._columns[n] for n in ("module_id", "module_title", "module_ects"))
+        return [Module(module_id=ids[i], title=titles[i], ects=ects[i]) for i in range(len(ids))]
+
+    # Full student aggregates including enrollments and goals.
+    def aggregates(self) -> List[Student]:
+        students = self.students()
+        modules = self.modules()
+        c = self._columns
+        for s_idx, m_idx, grade, passed in zip(c["enrollment_student"], c["enrollment_module"], c["enrollment_grade"], c["enrollment_passed"]):
+            students[s_idx].enrollments.append(_enrollment(modules[m_idx], grade, passed))
+        goal_types = c["goal_type"]
+        for i, (s_idx, value) in enumerate(zip(c["goal_student"], c["goal_value"])):
+            goal = GOAL_REGISTRY.create(goal_types[i], value)
+            if goal is not None:
+                students[s_idx].goals.append(goal)
+        return students
+
+    # Release all views into the mapping before unmapping the file.
+    def close(self) -> None:
+        self._columns.clear()
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._mmap.close()
+
+def _enrollment(module: Module, grade: float, passed: int) -> Enrollment:
+    return Enrollment(
+        module=module,
+        grade=None if math.isnan(grade) else grade,
+        date_passed=datetime.date.fromordinal(passed) if passed else None,
+    )
+
+# Map a snapshot file. Returns None if it is missing, unreadable or stale for the given database,
+# in which case callers fall back to SQLite.
+def open_snapshot(database: Database, path: str) -> Optional[DatasetSnapshot]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Snapshot {path} could not be mapped: {e}.")
+        return None
+
+    if len(mapped) < _HEADER.size + _DIRECTORY.size:
+        logging.warning(f"Snapshot {path} is truncated, falling back to SQLite.")
+        mapped.close()
+        return None
+    magic, version, counter, size = _HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC or version != FORMAT_VERSION or _version_stamp(database) != (counter, size):
+        logging.info(f"Snapshot {path} is stale or incompatible, falling back to SQLite.")
+        mapped.close()
+        return None
+
+    views: List[memoryview] = [memoryview(mapped)]
+    columns: dict = {}
+    try:
+        directory = _DIRECTORY.unpack_from(mapped, _HEADER.size)
+        for i, (name, code) in enumerate(SECTIONS):
+            offset, length = directory[2 * i], directory[2 * i + 1]
+            if offset + length > len(mapped):
+                raise ValueError(f"section {name} ends after the end of the file")
+            section = views[0][offset:offset + length]
+            views.append(section)
+            if code == "s":
+                (count,) = struct.unpack_from("<I", section)
+                width = 4 * (count + 2)
+                if width > length:
+                    raise ValueError(f"section {name} is shorter than its offset table")
+                offsets, blob = section[4:width].cast("I"), section[width:]
+                views.extend((offsets, blob))
+                columns[name] = _StringColumn(offsets=offsets, blob=blob)
+            else:
+                columns[name] = section.cast(code)
+                views.append(columns[name])
+    except (struct.error, ValueError, TypeError) as e:
+        # A damaged file is treated like a stale one; the views must be released before the map is closed
+        logging.warning(f"Snapshot {path} is damaged ({e}), falling back to SQLite.")
+        for view in reversed(views):
+            view.release()
+        mapped.close()
+        return None
+    logging.info("Snapshot mapped: %s", path)
+    return DatasetSnapshot(path=path, stamp=(counter, size), _mmap=mapped, _columns=columns, _views=views)
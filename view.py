@@ -3,12 +3,28 @@ import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox
 import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional
 import logging
 
 from controller import DashboardController
 from model import Student, GoalEvaluation, Module
+from write_behind import FlushResult, WriteFailure
+from database import ConcurrentModificationError
+from parsing import parse_grade, parse_user_date
+from prefetch import EvaluationPrefetcher, needs_plan
+from planner import ModulePlan
+
+# Interval (ms) in which the GUI checks whether queued writes are due to be flushed
+# and whether another instance changed the shared database.
+WRITE_FLUSH_POLL_MS = 500
+
+# Interval (ms) in which the open student dropdown is checked for a new highlighted student,
+# whose neighbours are then evaluated in advance (see prefetch.py).
+PREFETCH_POLL_MS = 50
+
+# Number of recommended modules listed in the hint below the goal tiles (see planner.py).
+PLAN_HINT_MODULES = 6
 
 
 @dataclass
@@ -20,6 +36,15 @@ class TargetMonitoring(ttk.Frame):
     def __post_init__(self) -> None:
         super().__init__(self.master)
         self._student_rows: dict[str, str] = {}  # mapping display-string -> student_id
+        self._student_ids: List[str] = []  # student IDs in dropdown order
+        self._prefetcher = EvaluationPrefetcher(
+            evaluate=self.controller.evaluate_student, plan=self.controller.plan_student_modules
+        )
+        self.controller.add_invalidation_listener(self._prefetcher.invalidate)
+        self._prefetch_job: Optional[str] = None
+        self._plan_job: Optional[str] = None
+        self._shown_student: Optional[str] = None
+        self._highlighted: Optional[int] = None
         self.render()
 
     def render(self) -> None:
@@ -34,6 +59,7 @@ class TargetMonitoring(ttk.Frame):
             state="readonly",
             width=40,
             font=("", 10),
+            postcommand=self._on_dropdown_opened,
         )
         self.student_dropdown.pack(side="left", fill="x", expand=True)
         self.student_dropdown.bind("<<ComboboxSelected>>", self.on_student_selected)
@@ -50,10 +76,12 @@ class TargetMonitoring(ttk.Frame):
         self._student_rows.clear()
 
         values = []
+        self._student_ids = []
         for student in students:
             display = f"{student.student_id} – {student.name}"
             values.append(display)
             self._student_rows[display] = student.student_id
+            self._student_ids.append(student.student_id)
 
         self.student_dropdown["values"] = values
 
@@ -71,14 +99,55 @@ class TargetMonitoring(ttk.Frame):
             return
 
         student_id = self._student_rows[display]
+        self._cancel_plan_hint()
 
+        # Prefetched students are shown without touching the database
+        data = self._prefetcher.get(student_id)
         try:
-            student = self.controller.get_student_aggregate(student_id)
-            data = self.controller.refresh_dashboard_stats(student)
+            if data is None:
+                data = self.controller.evaluate_student(student_id)
+                self._prefetcher.put(student_id, data)
             self.update_overview(data)
         except Exception as e:
             logging.error(f"Error loading student: {e}")
             self._show_placeholder()
+            return
+        self._shown_student = student_id
+        self._show_plan_hint(student_id, data)
+        # The next switch most likely goes to a neighbour
+        self._prefetcher.schedule(self._student_ids, self.student_dropdown.current())
+        self._start_prefetch()
+
+    # Called before the dropdown list opens: follow the highlighted entry while the list is shown.
+    def _on_dropdown_opened(self) -> None:
+        self._highlighted = None
+        self.after(PREFETCH_POLL_MS, self._watch_dropdown)
+
+    # Queue the neighbours of the highlighted entry whenever the highlight moves (mouse hover or
+    # arrow keys); stops once the list is closed.
+    def _watch_dropdown(self) -> None:
+        try:
+            popdown = self.tk.call("ttk::combobox::PopdownWindow", self.student_dropdown)
+            if not int(self.tk.call("winfo", "ismapped", popdown)):
+                return
+            selection = self.tk.splitlist(self.tk.call(f"{popdown}.f.l", "curselection"))
+        except tk.TclError:
+            return
+        if selection and int(selection[0]) != self._highlighted:
+            self._highlighted = int(selection[0])
+            self._prefetcher.schedule(self._student_ids, self._highlighted)
+            self._start_prefetch()
+        self.after(PREFETCH_POLL_MS, self._watch_dropdown)
+
+    # Evaluate the queued students one per idle callback, so input events are handled in between.
+    def _start_prefetch(self) -> None:
+        if self._prefetch_job is None and self._prefetcher.pending():
+            self._prefetch_job = self.after_idle(self._prefetch_step)
+
+    def _prefetch_step(self) -> None:
+        self._prefetch_job = None
+        if self._prefetcher.step():
+            self._start_prefetch()
 
     def update_overview(self, data: List[GoalEvaluation]) -> None:
         self._clear_tiles()
@@ -164,6 +233,52 @@ class TargetMonitoring(ttk.Frame):
                 content.pack(pady=16, fill="both", expand=True)
                 tk.Label(content, text=arrow_char, font=("", 48), fg=fg_col, bg=bg_color).pack(expand=True)
 
+    # Below the tiles: the modules recommended to get an off-track deadline or pace goal back to GREEN.
+    # A plan prefetched with the evaluations is drawn right away; otherwise it is computed in an idle
+    # callback after the tiles have been drawn, so the switch itself stays one frame.
+    def _show_plan_hint(self, student_id: str, data: List[GoalEvaluation]) -> None:
+        if not needs_plan(data):
+            return
+        plan = self._prefetcher.get_plan(student_id)
+        if plan is not None:
+            self._draw_plan_hint(plan, len(data))
+            return
+        self._plan_job = self.after_idle(lambda: self._compute_plan_hint(student_id, len(data)))
+
+    def _compute_plan_hint(self, student_id: str, columns: int) -> None:
+        self._plan_job = None
+        if student_id != self._shown_student:
+            return
+        try:
+            plan = self.controller.plan_student_modules(student_id)
+        except Exception as e:
+            logging.error(f"Error planning modules: {e}")
+            return
+        self._prefetcher.put_plan(student_id, plan)
+        self._draw_plan_hint(plan, columns)
+
+    def _cancel_plan_hint(self) -> None:
+        if self._plan_job is not None:
+            self.after_cancel(self._plan_job)
+            self._plan_job = None
+
+    def _draw_plan_hint(self, plan: ModulePlan, columns: int) -> None:
+        if not plan.off_track:
+            return
+        goals = " und ".join(plan.off_track)
+        if not plan.feasible:
+            text = f"Hinweis: {goals} lässt sich mit den verbleibenden Modulen des Katalogs nicht mehr in den grünen Bereich bringen."
+        else:
+            listed = ", ".join(f"{m.title} ({m.ects} CP)" for m in plan.modules[:PLAN_HINT_MODULES])
+            more = len(plan.modules) - PLAN_HINT_MODULES
+            text = (
+                f"Empfehlung für {goals} (noch {plan.missing_ects} CP bis Grün): {listed}"
+                + (f" und {more} weitere" if more > 0 else "")
+            )
+        ttk.Label(self.container, text=text, font=("", 10), wraplength=900, justify="left").grid(
+            row=1, column=0, columnspan=max(1, columns), sticky="w", padx=8, pady=(0, 8)
+        )
+
     def _clear_tiles(self) -> None:
         """Destroys all dynamically created tiles in the container."""
         for widget in self.container.winfo_children():
@@ -171,6 +286,8 @@ class TargetMonitoring(ttk.Frame):
 
     def _show_placeholder(self) -> None:
         """Displays a placeholder message when no student is selected."""
+        self._shown_student = None
+        self._cancel_plan_hint()
         self._clear_tiles()
         lbl = ttk.Label(
             self.container, 
@@ -192,6 +309,8 @@ class DataCollection(ttk.Frame):
         self._student_rows: dict[str, Student] = {} # mapping display-string -> Student
         self._modules_by_id: dict[str, Module] = {} # mapping module_id -> Module
         self._goal_settings: dict[str, float | int] = {} # mapping goal_name -> goal_value
+        self._programs_by_display: dict[str, str] = {} # mapping display-string -> program_id
+        self._detail_student_id: Optional[str] = None # student shown in the enrollment detail view
         self.render()
 
     # Renders the form with fields for student data, goal settings, module management, and enrollment input.
@@ -218,8 +337,13 @@ class DataCollection(ttk.Frame):
         ttk.Label(student_tile, text="Startdatum (YYYY-MM-DD)").grid(row=2, column=0, sticky="w", padx=8, pady=4)
         ttk.Entry(student_tile, textvariable=self.start_var, width=24).grid(row=2, column=1, sticky="w", padx=(0, 8), pady=4)
 
+        ttk.Label(student_tile, text="Studiengang").grid(row=3, column=0, sticky="w", padx=8, pady=4)
+        self.program_combo = ttk.Combobox(student_tile, state="readonly", width=30)
+        self.program_combo.grid(row=3, column=1, sticky="w", padx=(0, 8), pady=4)
+        self.refresh_program_dropdown()
+
         ttk.Button(student_tile, text="Student speichern", command=self.submit_data).grid(
-            row=3, column=1, sticky="e", padx=(0, 8), pady=(8, 8)
+            row=4, column=1, sticky="e", padx=(0, 8), pady=(8, 8)
         )
 
         goals_tile = ttk.LabelFrame(top_tiles, text="Zieldaten Studium")
@@ -280,6 +404,8 @@ class DataCollection(ttk.Frame):
         ttk.Entry(enrollment, textvariable=self.passed_var, width=16).grid(row=2, column=1, sticky="w", pady=6)
 
         ttk.Button(enrollment, text="Leistung speichern", command=self._save_enrollment).grid(row=2, column=3, sticky="e", padx=8, pady=6)
+        ttk.Button(enrollment, text="Sammelerfassung Student …", command=self._open_student_grid).grid(row=0, column=3, sticky="e", padx=8, pady=6)
+        ttk.Button(enrollment, text="Sammelerfassung Modul …", command=self._open_module_grid).grid(row=1, column=3, sticky="e", padx=8, pady=6)
 
         self.refresh_module_dropdown()
 
@@ -328,12 +454,14 @@ class DataCollection(ttk.Frame):
 
     # Helper to clear the enrollments view
     def _clear_enrollments_view(self) -> None:
+        self._detail_student_id = None
         for item_id in self.enrollment_tree.get_children():
             self.enrollment_tree.delete(item_id)
         self.enrollment_tree.insert("", "end", values=("—", "Kein Student ausgewählt", "", "", ""))
 
     # Helper to render enrollments of the selected student in the detail view
     def _render_enrollments(self, student: Student) -> None:
+        self._detail_student_id = student.student_id
         for item_id in self.enrollment_tree.get_children():
             self.enrollment_tree.delete(item_id)
 
@@ -351,6 +479,53 @@ class DataCollection(ttk.Frame):
                 values=(module.module_id, module.title, str(module.ects), grade, passed),
             )
 
+    # Helper to show a saved enrollment in the detail view without reloading it from the database
+    def _show_enrollment_row(self, student_id: str, module: Module, grade: Optional[float], passed: Optional[datetime.date]) -> None:
+        if student_id != self._detail_student_id:
+            return
+        values = (
+            module.module_id,
+            module.title,
+            str(module.ects),
+            "" if grade is None else f"{grade:.2f}",
+            "" if passed is None else passed.isoformat(),
+        )
+        for item_id in self.enrollment_tree.get_children():
+            current = self.enrollment_tree.item(item_id, "values")
+            if current and current[0] == module.module_id:
+                self.enrollment_tree.item(item_id, values=values)
+                return
+            if current and current[0] == "—":
+                self.enrollment_tree.delete(item_id)
+        self.enrollment_tree.insert("", "end", values=values)
+
+    # Helper to show a saved student in the student list without reloading the list
+    def _show_student_row(self, student: Student) -> None:
+        values = (student.student_id, student.name, student.start_date.isoformat())
+        for item_id, known in self._student_rows.items():
+            if known.student_id == student.student_id:
+                self.student_tree.item(item_id, values=values)
+                self._student_rows[item_id] = student
+                return
+        item_id = self.student_tree.insert("", "end", values=values)
+        self._student_rows[item_id] = student
+
+    # Called by the GUI after queued writes were flushed: synchronize dependent views and report rejected rows
+    def on_writes_flushed(self, result: FlushResult) -> None:
+        if "student" in result.written and self._on_student_saved:
+            self._on_student_saved()
+        if result.failures:
+            lines = [self._describe_failure(failure) for failure in result.failures]
+            messagebox.showerror("Speichern fehlgeschlagen", "Folgende Einträge wurden nicht gespeichert:\n\n" + "\n".join(lines))
+
+    @staticmethod
+    def _describe_failure(failure: WriteFailure) -> str:
+        labels = {"student": "Student", "module": "Modul", "enrollment": "Leistung", "goals": "Ziele"}
+        label = f"{labels.get(failure.kind, failure.kind)} {' / '.join(map(str, failure.key))}"
+        if isinstance(failure.error, ConcurrentModificationError):
+            return f"{label}: wurde zwischenzeitlich von einem anderen Benutzer geändert. Bitte neu laden und erneut speichern."
+        return f"{label}: {failure.error}"
+
     # Helper to get current student data from form fields
     def refresh_student_list(self) -> None:
         for item_id in self.student_tree.get_children():
@@ -386,6 +561,7 @@ class DataCollection(ttk.Frame):
         self.student_id_var.set(aggregate.student_id)
         self.name_var.set(aggregate.name)
         self.start_var.set(aggregate.start_date.isoformat())
+        self._select_program(aggregate.program_id)
 
         self._render_enrollments(aggregate)
         self._display_goals_from_student(aggregate)
@@ -419,42 +595,19 @@ class DataCollection(ttk.Frame):
 
     # save student data; called by "Student speichern" button
     def submit_data(self) -> None:
-        self.controller.process_student_data(self._current_student())
-        self.refresh_student_list()
+        student = self._current_student()
+        self.controller.process_student_data(student)
+        self._show_student_row(student)
         messagebox.showinfo("Student gespeichert", "Studentendaten wurden erfolgreich übernommen.")
-        
-        # Callback: synchronize dashboard view after saving student data (e.g. to update dropdowns or trigger selection)
-        if self._on_student_saved:
-            self._on_student_saved()
+        # The dashboard dropdown is synchronized via on_writes_flushed once the write reached the database.
 
     # helper to parse grade input (e.g. "3,3" or "3.3") into float; returns None if empty
     def _parse_grade(self, text: str) -> Optional[float]:
-        s = (text or "").strip()
-        if not s:
-            return None
-        s = s.replace(" ", "").replace(",", ".")
-        return float(s)
+        return parse_grade(text)
 
     # helper to parse date input in various formats (e.g. "17.02.2026" or "2026-02-17") into datetime.date; returns None if empty
     def _parse_date(self, text: str) -> Optional[datetime.date]:
-        s = (text or "").strip()
-        if not s:
-            return None
-
-        # ISO first (YYYY-MM-DD)
-        try:
-            return datetime.date.fromisoformat(s)
-        except ValueError:
-            pass
-
-        # German: DD.MM.YYYY / DD.MM.YY
-        for fmt in ("%d.%m.%Y", "%d.%m.%y"):
-            try:
-                return datetime.datetime.strptime(s, fmt).date()
-            except ValueError:
-                continue
-
-        raise ValueError(f"Ungültiges Datum: {s}")
+        return parse_user_date(text)
 
     # Save enrollment data; called by "Leistung speichern" button
     def _save_enrollment(self) -> None:
@@ -472,7 +625,7 @@ class DataCollection(ttk.Frame):
             messagebox.showerror("Eingabefehler", "Ausgewähltes Modul ist nicht (mehr) im Katalog. Bitte neu auswählen.")
             return
 
-        module = Module(module_id=module_id, title="", ects=0)
+        module = self._modules_by_id[module_id]
 
         try:
             grade = self._parse_grade(self.grade_var.get())
@@ -488,17 +641,48 @@ class DataCollection(ttk.Frame):
 
         self.controller.process_student_data(student)
 
+        # Queued: a rejected enrollment (e.g. unknown student or module) is reported by on_writes_flushed
+        self.controller.process_enrollment_data(student, module, grade=grade, date=passed)
+
+        self._show_student_row(student)
+        self._show_enrollment_row(student.student_id, module, grade, passed)
+
+    # Open the bulk entry grid for the student in the form; called by "Sammelerfassung Student …" button
+    def _open_student_grid(self) -> None:
+        student_id = self.student_id_var.get().strip()
+        if not student_id:
+            messagebox.showerror("Eingabefehler", "Bitte zuerst eine Student-ID eingeben.")
+            return
         try:
-            self.controller.process_enrollment_data(student, module, grade=grade, date=passed)
-        except sqlite3.IntegrityError as e:
-            messagebox.showerror("DB-Fehler", f"Speichern fehlgeschlagen (FK). Existiert Student und Modul?\n\n{e}")
+            EnrollmentGrid(master=self, controller=self.controller, mode="student", target_id=student_id, _on_saved=self._on_grid_saved)
+        except ValueError:
+            messagebox.showerror("Eingabefehler", "Student nicht gefunden. Bitte zuerst den Studenten speichern.")
+
+    # Open the bulk entry grid for the selected module; called by "Sammelerfassung Modul …" button
+    def _open_module_grid(self) -> None:
+        display = self.module_combo.get().strip()
+        module_id = display.split(" – ", 1)[0].strip() if display else ""
+        if not module_id:
+            messagebox.showerror("Eingabefehler", "Bitte ein Modul auswählen.")
             return
+        names = {student.student_id: student.name for student in self._student_rows.values()}
+        EnrollmentGrid(master=self, controller=self.controller, mode="module", target_id=module_id, student_names=names, _on_saved=self._on_grid_saved)
 
-        self.refresh_student_list()
+    # Show the rows saved in the bulk entry grid in the detail view without reloading it
+    def _on_grid_saved(self, rows: List[tuple[str, str, Optional[float], Optional[datetime.date]]]) -> None:
+        for student_id, module_id, grade, passed in rows:
+            module = self._modules_by_id.get(module_id)
+            if module is not None:
+                self._show_enrollment_row(student_id, module, grade, passed)
 
     # Refresh module list for dropdown; called after saving a module or when opening the tab
     def refresh_module_dropdown(self) -> None:
         modules = self.controller.refresh_module_list()
+        self._set_module_values(modules)
+
+    # Fill the module dropdown from the given catalogue (ordered like the module list of the repository)
+    def _set_module_values(self, modules: List[Module]) -> None:
+        modules = sorted(modules, key=lambda m: (m.title.casefold(), m.module_id))
         self._modules_by_id = {m.module_id: m for m in modules}
 
         # Display strings: "Modul-ID – Titel (ECTS ECTS)"
@@ -514,12 +698,28 @@ class DataCollection(ttk.Frame):
         else:
             self.module_combo.set("")
 
+    # Refresh program list for dropdown; the default program is preselected for new students
+    def refresh_program_dropdown(self) -> None:
+        programs = self.controller.refresh_program_list()
+        self._programs_by_display = {f"{p.name} ({p.total_ects} ECTS)": p.program_id for p in programs}
+        self.program_combo["values"] = list(self._programs_by_display)
+        if self.program_combo.get() not in self._programs_by_display:
+            self.program_combo.set(next(iter(self._programs_by_display), ""))
+
+    # Select the dropdown entry for the given program_id; keeps the current selection if the ID is unknown
+    def _select_program(self, program_id: Optional[str]) -> None:
+        for display, pid in self._programs_by_display.items():
+            if pid == program_id:
+                self.program_combo.set(display)
+                return
+
     # Helper to construct a Student object from the form fields; used when saving student data or enrollments
     def _current_student(self) -> Student:
         student_id = self.student_id_var.get().strip()
         name = self.name_var.get().strip()
         start_date = datetime.date.fromisoformat(self.start_var.get().strip())
-        return Student(student_id=student_id, name=name, start_date=start_date)
+        program_id = self._programs_by_display.get(self.program_combo.get())
+        return Student(student_id=student_id, name=name, start_date=start_date, program_id=program_id)
 
     # Save module data; called by "Modul speichern" button
     def _save_module(self) -> None:
@@ -528,8 +728,9 @@ class DataCollection(ttk.Frame):
         ects_txt = self.catalog_ects_var.get().strip()
         ects = int(ects_txt) if ects_txt else 0
 
-        self.controller.process_module_data(Module(module_id=module_id, title=title, ects=ects))
-        self.refresh_module_dropdown()
+        module = Module(module_id=module_id, title=title, ects=ects)
+        self.controller.process_module_data(module)
+        self._set_module_values([m for m in self._modules_by_id.values() if m.module_id != module_id] + [module])
         messagebox.showinfo("Module gespeichert", "Moduldaten wurden erfolgreich übernommen.")
 
     # Save goal settings; called by "Ziele speichern" button
@@ -561,6 +762,269 @@ class DataCollection(ttk.Frame):
         except Exception as e:
             messagebox.showerror("Fehler", f"Speichern fehlgeschlagen: {e}")
 
+@dataclass
+# --- Bulk entry of enrollments: spreadsheet-like grid for one student (all catalogue modules) or one
+# module (its enrolled students). Cells are edited in place or pasted from the clipboard (e.g. copied
+# from a spreadsheet); all changed rows are validated and saved together in one transaction. ---
+class EnrollmentGrid(tk.Toplevel):
+    master: tk.Misc
+    controller: DashboardController
+    mode: str  # "student" or "module"
+    target_id: str  # Student-ID or Modul-ID the grid is opened for
+    student_names: dict[str, str] = field(default_factory=dict)  # mapping student_id -> name (module mode)
+    _on_saved: Optional[callable] = None  # Callback with the saved (student_id, module_id, grade, date) rows
+
+    def __post_init__(self) -> None:
+        super().__init__(self.master)
+        self._rows: dict[str, str] = {} # mapping item_id -> row key (Modul-ID or Student-ID)
+        self._items_by_key: dict[str, str] = {} # mapping row key -> item_id
+        self._original: dict[str, tuple[str, str]] = {} # mapping item_id -> (grade, date) as loaded
+        self._editor: Optional[ttk.Entry] = None
+        self._editing: tuple[str, str] = ("", "") # (item_id, column) of the open editor
+        self.render()
+        try:
+            self.load()
+        except Exception:
+            self.destroy()
+            raise
+
+    def render(self) -> None:
+        if self.mode == "student":
+            self.title(f"Sammelerfassung Leistungen – Student {self.target_id}")
+            key_heading, label_heading = "Modul-ID", "Titel"
+        else:
+            self.title(f"Sammelerfassung Leistungen – Modul {self.target_id}")
+            key_heading, label_heading = "Student-ID", "Name"
+        self.geometry("760x560")
+
+        hint = "Doppelklick oder Enter bearbeitet eine Zelle, Tab springt weiter. Strg+V fügt Zeilen aus der Zwischenablage ein: Note[Tab]Datum ab der ausgewählten Zeile"
+        hint += " oder ID[Tab]Note[Tab]Datum." if self.mode == "student" else " oder Student-ID[Tab]Note[Tab]Datum (fehlende Studenten werden ergänzt)."
+        ttk.Label(self, text=hint, wraplength=720).pack(fill="x", padx=12, pady=(12, 6))
+
+        frame = ttk.Frame(self)
+        frame.pack(fill="both", expand=True, padx=12)
+        self.tree = ttk.Treeview(frame, columns=("key", "label", "grade", "passed"), show="headings", selectmode="browse")
+        self.tree.heading("key", text=key_heading)
+        self.tree.heading("label", text=label_heading)
+        self.tree.heading("grade", text="Note", anchor="e")
+        self.tree.heading("passed", text="Bestanden am", anchor="e")
+        self.tree.column("key", anchor="w", width=110, stretch=False)
+        self.tree.column("label", anchor="w", width=330, stretch=True)
+        self.tree.column("grade", anchor="e", width=80, stretch=False)
+        self.tree.column("passed", anchor="e", width=120, stretch=False)
+        self.tree.tag_configure("changed", background="#fff3cd")
+        self.tree.tag_configure("invalid", background="#f8d7da")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        self.tree.bind("<Double-1>", self._on_double_click)
+        self.tree.bind("<Return>", lambda _evt: self._begin_edit(self.tree.focus(), "grade"))
+        self.tree.bind("<Control-v>", lambda _evt: self.paste_from_clipboard())
+
+        buttons = ttk.Frame(self)
+        buttons.pack(fill="x", padx=12, pady=12)
+        self.status_var = tk.StringVar()
+        ttk.Label(buttons, textvariable=self.status_var).pack(side="left")
+        ttk.Button(buttons, text="Alle speichern", command=self.save).pack(side="right")
+        ttk.Button(buttons, text="Neu laden", command=self.load).pack(side="right", padx=6)
+        ttk.Button(buttons, text="Aus Zwischenablage einfügen", command=self.paste_from_clipboard).pack(side="right")
+
+    # Load the rows: all catalogue modules with the student's results, or the enrolled students of the module.
+    def load(self) -> None:
+        self._cancel_edit()
+        for item_id in self.tree.get_children():
+            self.tree.delete(item_id)
+        self._rows.clear()
+        self._items_by_key.clear()
+        self._original.clear()
+
+        if self.mode == "student":
+            student = self.controller.get_student_aggregate(self.target_id)
+            results = {e.module.module_id: e for e in student.enrollments}
+            modules = sorted(self.controller.refresh_module_list(), key=lambda m: (m.title.casefold(), m.module_id))
+            for module in modules:
+                enrollment = results.get(module.module_id)
+                self._insert_row(
+                    module.module_id,
+                    f"{module.title} ({module.ects} ECTS)",
+                    enrollment.grade if enrollment else None,
+                    enrollment.date_passed if enrollment else None,
+                )
+        else:
+            for student_id, enrollment in self.controller.get_module_enrollments(self.target_id):
+                self._insert_row(student_id, self.student_names.get(student_id, ""), enrollment.grade, enrollment.date_passed)
+        self.status_var.set(f"{len(self._rows)} Zeilen geladen.")
+
+    def _insert_row(self, key: str, label: str, grade: Optional[float], passed: Optional[datetime.date]) -> str:
+        values = ("" if grade is None else f"{grade:.2f}".replace(".", ","), "" if passed is None else passed.isoformat())
+        item_id = self.tree.insert("", "end", values=(key, label, *values))
+        self._rows[item_id] = key
+        self._items_by_key[key] = item_id
+        self._original[item_id] = values
+        return item_id
+
+    def _on_double_click(self, event) -> None:
+        item_id = self.tree.identify_row(event.y)
+        column = self.tree.column(self.tree.identify_column(event.x), "id")
+        if item_id and column in ("grade", "passed"):
+            self._begin_edit(item_id, column)
+
+    # Show an entry over the cell; Enter commits and moves down, Tab commits and moves to the next cell.
+    def _begin_edit(self, item_id: str, column: str) -> None:
+        self._finish_edit()
+        if not item_id:
+            return
+        self.tree.see(item_id)
+        self.tree.update_idletasks()
+        bbox = self.tree.bbox(item_id, column)
+        if not bbox:
+            return
+        x, y, width, height = bbox
+        editor = ttk.Entry(self.tree)
+        editor.insert(0, self.tree.set(item_id, column))
+        editor.select_range(0, "end")
+        editor.place(x=x, y=y, width=width, height=height)
+        editor.focus_set()
+        editor.bind("<Return>", lambda _evt: self._move_edit(item_id, column, down=True))
+        editor.bind("<Tab>", lambda _evt: self._move_edit(item_id, column, down=False))
+        editor.bind("<Escape>", lambda _evt: self._cancel_edit())
+        editor.bind("<FocusOut>", lambda _evt: self._finish_edit())
+        self._editor = editor
+        self._editing = (item_id, column)
+
+    def _move_edit(self, item_id: str, column: str, down: bool) -> str:
+        self._finish_edit()
+        if not down and column == "grade":
+            self._begin_edit(item_id, "passed")
+        else:
+            following = self.tree.next(item_id)
+            if following:
+                self.tree.selection_set(following)
+                self.tree.focus(following)
+                self._begin_edit(following, column if down else "grade")
+        return "break"
+
+    def _finish_edit(self) -> None:
+        if self._editor is None:
+            return
+        item_id, column = self._editing
+        value = self._editor.get().strip()
+        self._cancel_edit()
+        self._set_cell(item_id, column, value)
+
+    def _cancel_edit(self) -> None:
+        if self._editor is not None:
+            editor, self._editor = self._editor, None
+            editor.destroy()
+            self.tree.focus_set()
+
+    def _set_cell(self, item_id: str, column: str, value: str) -> None:
+        self.tree.set(item_id, column, value)
+        changed = (self.tree.set(item_id, "grade"), self.tree.set(item_id, "passed")) != self._original[item_id]
+        self.tree.item(item_id, tags=("changed",) if changed else ())
+
+    # Paste tab- or semicolon-separated lines: "Note[Tab]Datum" fills the rows from the selected one
+    # downwards, "ID[Tab]Note[Tab]Datum" fills the row with that ID (module mode: added if missing).
+    def paste_from_clipboard(self) -> str:
+        self._finish_edit()
+        try:
+            text = self.clipboard_get()
+        except tk.TclError:
+            return "break"
+        lines = [line for line in text.splitlines() if line.strip()]
+        item_id = self.tree.focus() or next(iter(self.tree.get_children()), "")
+        filled = 0
+        skipped: List[str] = []
+        for line in lines:
+            fields = [f.strip() for f in (line.split("\t") if "\t" in line else line.split(";"))]
+            if len(fields) >= 2 and self._is_row_key(fields[0]):
+                target = self._items_by_key.get(fields[0])
+                if target is None and self.mode == "module":
+                    target = self._insert_row(fields[0], self.student_names.get(fields[0], ""), None, None)
+                if target is None:
+                    skipped.append(fields[0])
+                    continue
+                values = fields[1:3]
+            else:
+                if not item_id:
+                    skipped.append(fields[0])
+                    continue
+                target, item_id = item_id, self.tree.next(item_id)
+                values = fields[:2]
+            self._set_cell(target, "grade", values[0])
+            if len(values) > 1:
+                self._set_cell(target, "passed", values[1])
+            filled += 1
+        message = f"{filled} Zeilen eingefügt."
+        if skipped:
+            message += f" Übersprungen (unbekannte ID oder keine Zeile mehr): {', '.join(skipped[:5])}"
+        self.status_var.set(message)
+        return "break"
+
+    # A first field that is neither empty nor a grade is taken as the row ID.
+    def _is_row_key(self, text: str) -> bool:
+        if text in self._items_by_key:
+            return True
+        try:
+            parse_grade(text)
+        except ValueError:
+            return bool(text)
+        return False
+
+    # Validate all changed rows and save them in one transaction; nothing is saved if a cell is invalid.
+    def save(self) -> None:
+        self._finish_edit()
+        rows: List[tuple[str, str, Optional[float], Optional[datetime.date]]] = []
+        invalid: List[str] = []
+        for item_id, key in self._rows.items():
+            values = (self.tree.set(item_id, "grade"), self.tree.set(item_id, "passed"))
+            if values == self._original[item_id]:
+                continue
+            try:
+                grade = parse_grade(values[0])
+                passed = parse_user_date(values[1])
+            except ValueError:
+                invalid.append(key)
+                self.tree.item(item_id, tags=("invalid",))
+                continue
+            student_id, module_id = (self.target_id, key) if self.mode == "student" else (key, self.target_id)
+            rows.append((student_id, module_id, grade, passed))
+
+        if invalid:
+            messagebox.showerror(
+                "Eingabefehler",
+                f"Ungültige Note oder ungültiges Datum bei: {', '.join(invalid[:10])}{' …' if len(invalid) > 10 else ''}\n\n"
+                "Beispiele: Note 3,3 oder 3.3, Datum 17.02.2026 oder 2026-02-17. Es wurde nichts gespeichert.",
+                parent=self,
+            )
+            return
+        if not rows:
+            self.status_var.set("Keine Änderungen.")
+            return
+
+        try:
+            self.controller.process_enrollment_batch(rows)
+        except sqlite3.IntegrityError as e:
+            messagebox.showerror("DB-Fehler", f"Speichern fehlgeschlagen (FK). Existieren alle Studenten und Module?\n\n{e}", parent=self)
+            return
+        except ConcurrentModificationError as e:
+            messagebox.showerror(
+                "Speichern fehlgeschlagen",
+                f"Leistung {' / '.join(map(str, e.key))} wurde zwischenzeitlich von einem anderen Benutzer geändert. "
+                "Bitte neu laden und erneut speichern. Es wurde nichts gespeichert.",
+                parent=self,
+            )
+            return
+
+        for item_id in self._rows:
+            self._original[item_id] = (self.tree.set(item_id, "grade"), self.tree.set(item_id, "passed"))
+            self.tree.item(item_id, tags=())
+        self.status_var.set(f"{len(rows)} Leistungen gespeichert.")
+        if self._on_saved:
+            self._on_saved(rows)
+
 @dataclass
 # --- Main Dashboard View with Tabs for Overview and Data Collection ---
 class DashboardGUI(tk.Frame):
@@ -571,6 +1035,7 @@ class DashboardGUI(tk.Frame):
         super().__init__(self.master)
         self.master.protocol("WM_DELETE_WINDOW", self.on_window_close)
         self.create_widgets()
+        self.after(WRITE_FLUSH_POLL_MS, self._flush_pending_writes)
 
     def create_widgets(self) -> None:
         self.notebook = ttk.Notebook(self)
@@ -609,8 +1074,32 @@ class DashboardGUI(tk.Frame):
         data = self.controller.refresh_dashboard_stats(student)
         self.target_monitoring.update_overview(data)
 
+    # Periodically write queued form saves once they are due (see WriteBehindQueue)
+    # and reload the lists if another instance changed the shared database
+    def _flush_pending_writes(self) -> None:
+        try:
+            self.data_collection.on_writes_flushed(self.controller.flush_pending_writes())
+        except Exception as e:
+            logging.error(f"Flushing pending writes failed: {e}")
+        try:
+            if self.controller.check_external_changes():
+                self._reload_after_external_change()
+        except Exception as e:
+            logging.error(f"Checking for external changes failed: {e}")
+        self.after(WRITE_FLUSH_POLL_MS, self._flush_pending_writes)
+
+    def _reload_after_external_change(self) -> None:
+        self.target_monitoring.refresh_student_dropdown()
+        self.target_monitoring.on_student_selected()
+        self.data_collection.refresh_student_list()
+        self.data_collection.refresh_module_dropdown()
+        logging.info("Views reloaded after a change by another instance.")
+
     def on_window_close(self) -> None:
         try:
+            result = self.controller.flush_pending_writes(force=True)
+            if result.failures:
+                self.data_collection.on_writes_flushed(result)
             self.controller.shutdown()
         finally:
             self.master.destroy()
@@ -0,0 +1,115 @@
+# write_behind.py
+# Write-behind queue for UI-originated upserts: writes are accepted immediately, repeated writes
+# to the same key are coalesced, and everything pending is flushed in one transaction.
+
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+from database import Database, is_busy_error
+
+@dataclass(frozen=True)
+# A queued write: `apply` performs the repository call, `row` is kept for error reporting.
+class PendingWrite:
+    kind: str
+    key: tuple
+    row: Any
+    apply: Callable[[], None]
+
+@dataclass(frozen=True)
+# A write that could not be persisted, reported back to the UI with the offending row.
+class WriteFailure:
+    kind: str
+    key: tuple
+    row: Any
+    error: Exception
+
+@dataclass(frozen=True)
+# Outcome of a flush: the kinds of data that were written, the rejected writes and the number of
+# writes put back into the queue because the database was busy (they are retried with the next flush).
+class FlushResult:
+    written: frozenset[str] = frozenset()
+    failures: tuple[WriteFailure, ...] = ()
+    deferred: int = 0
+
+@dataclass
+# Coalescing write-behind queue. A coalesced write keeps the position of the first write to its
+# key, so a student queued before its enrollments is still written before them (foreign keys).
+class WriteBehindQueue:
+    database: Database
+    # Seconds after the first pending write before a flush is due
+    flush_interval: float = 2.0
+    # Number of pending writes that makes a flush due immediately
+    max_pending: int = 200
+    _pending: "OrderedDict[tuple, PendingWrite]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _first_pending_at: Optional[float] = field(default=None, init=False, repr=False)
+
+    def enqueue(self, kind: str, key: tuple, row: Any, apply: Callable[[], None]) -> None:
+        if not self._pending:
+            self._first_pending_at = time.monotonic()
+        self._pending[(kind, *key)] = PendingWrite(kind=kind, key=key, row=row, apply=apply)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def is_due(self) -> bool:
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.max_pending:
+            return True
+        return time.monotonic() - (self._first_pending_at or 0.0) >= self.flush_interval
+
+    # Write all pending entries in one transaction. An entry whose own write fails (e.g. a
+    # compare-and-swap conflict with another dashboard instance or a foreign key error) rolls the
+    # transaction back, is reported as WriteFailure and the remaining entries are written again
+    # without it. If the database stays busy or the commit fails, no entry is to blame: the whole
+    # batch is put back into the queue and reported as deferred.
+    def flush(self) -> FlushResult:
+        pending = list(self._pending.values())
+        self._pending.clear()
+        self._first_pending_at = None
+        if not pending:
+            return FlushResult()
+
+        failures: List[WriteFailure] = []
+        while pending:
+            failed: Optional[int] = None
+
+            def write_all() -> None:
+                nonlocal failed
+                failed = None
+                with self.database.transaction():
+                    for index, write in enumerate(pending):
+                        try:
+                            write.apply()
+                        except Exception:
+                            failed = index
+                            raise
+
+            try:
+                # The whole transaction is retried if another instance holds the database lock
+                self.database.run_with_retry(write_all)
+            except Exception as e:
+                if failed is None or (isinstance(e, sqlite3.OperationalError) and is_busy_error(e)):
+                    self._requeue(pending)
+                    logging.warning(f"Write-behind: {len(pending)} writes deferred, database not writable: {e}.")
+                    return FlushResult(failures=tuple(failures), deferred=len(pending))
+                bad = pending.pop(failed)
+                failures.append(WriteFailure(kind=bad.kind, key=bad.key, row=bad.row, error=e))
+                logging.error(f"Write-behind: {bad.kind} {bad.key} rejected: {e}.")
+                continue
+            break
+
+        logging.info("Write-behind flushed: %d written, %d failed.", len(pending), len(failures))
+        return FlushResult(written=frozenset(w.kind for w in pending), failures=tuple(failures))
+
+    # Put writes back in front of the queue, keeping their order; the flush is due again after
+    # flush_interval.
+    def _requeue(self, writes: List[PendingWrite]) -> None:
+        queued = self._pending
+        self._pending = OrderedDict(((w.kind, *w.key), w) for w in writes)
+        self._pending.update(queued)
+        self._first_pending_at = time.monotonic()